@@ -5,10 +5,15 @@ ringbuffer_ext = Extension(
     sources=["src/vocals/ringbuffer/ringbuffer.c"],
 )
 
+kernels_ext = Extension(
+    "vocals.kernels",
+    sources=["src/vocals/kernels/kernels.c"],
+)
+
 setup(
     name="vocals",
     version="0.1.0",
     packages=["vocals"],
     package_dir={"": "src"},
-    ext_modules=[ringbuffer_ext],
+    ext_modules=[ringbuffer_ext, kernels_ext],
 )
@@ -1,15 +1,47 @@
 """Vocals recording package."""
 
-from .multitrack import MultiTrackRecorder
-from .utils import estimate_pitch, freq_to_note, note_to_freq, pitch_range
+import importlib
+from typing import TYPE_CHECKING
 
 __version__ = "0.1.0"
 
 __all__ = [
     "MultiTrackRecorder",
+    "AutosaveService",
     "estimate_pitch",
     "pitch_range",
     "note_to_freq",
     "freq_to_note",
     "__version__",
 ]
+
+# public names and the submodule defining them; they are imported on first
+# access so that ``import vocals`` and the command line tools do not load
+# NumPy or PortAudio before they need them
+_LAZY = {
+    "MultiTrackRecorder": ".multitrack",
+    "AutosaveService": ".autosave",
+    "estimate_pitch": ".utils",
+    "pitch_range": ".utils",
+    "note_to_freq": ".utils",
+    "freq_to_note": ".utils",
+}
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .autosave import AutosaveService
+    from .multitrack import MultiTrackRecorder
+    from .utils import estimate_pitch, freq_to_note, note_to_freq, pitch_range
+
+
+def __getattr__(name: str):
+    try:
+        module = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
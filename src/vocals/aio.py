@@ -0,0 +1,181 @@
+"""Awaitable audio streams for asyncio applications.
+
+Audio runs in stream callbacks on the backend's own threads; completion and
+captured blocks are handed to the event loop with
+``loop.call_soon_threadsafe``. Awaiting a stream therefore blocks neither the
+loop nor a worker thread, and many sessions can run concurrently in one
+process. Cancelling the awaiting task aborts the stream.
+"""
+
+import asyncio
+from typing import Callable
+
+import numpy as np
+
+from .backend import Transfer
+from .stats import Stats
+
+__all__ = ["BlockStream", "play", "playrec", "rec", "run_stream"]
+
+
+async def run_stream(factory: Callable, **kwargs) -> None:
+    """Run the stream returned by ``factory(**kwargs)`` until it finishes.
+
+    ``factory`` is a backend's ``InputStream``, ``OutputStream`` or
+    ``Stream`` and the callback passed in ``kwargs`` ends the stream by
+    raising ``CallbackStop``.
+    """
+    loop = asyncio.get_running_loop()
+    finished = loop.create_future()
+
+    def resolve() -> None:
+        if not finished.done():
+            finished.set_result(None)
+
+    def finished_callback() -> None:
+        loop.call_soon_threadsafe(resolve)
+
+    stream = factory(finished_callback=finished_callback, **kwargs)
+    with stream:
+        try:
+            await finished
+        except asyncio.CancelledError:
+            stream.abort()
+            raise
+
+
+async def playrec(
+    audio,
+    frames: int,
+    samplerate: int,
+    channels: int = 1,
+    playback: np.ndarray | None = None,
+    blocksize: int = 0,
+    stats: Stats | None = None,
+) -> np.ndarray:
+    """Record ``frames`` frames from ``audio``, playing ``playback`` if given.
+
+    ``audio`` is any ``vocals.backend.AudioBackend`` or ``sounddevice``.
+    Return the ``(frames, channels)`` float32 recording; with ``channels`` of
+    0 nothing is recorded and ``playback`` is only played. Callbacks are
+    reported to ``stats`` if given.
+    """
+    transfer = Transfer(audio, frames, channels, playback, stats)
+    if frames:
+        await run_stream(transfer.open, samplerate=samplerate, blocksize=blocksize)
+    return transfer.recorded
+
+
+async def rec(
+    audio, frames: int, samplerate: int, channels: int = 1, stats: Stats | None = None
+) -> np.ndarray:
+    """Record ``frames`` frames of ``channels`` channels from ``audio``."""
+    return await playrec(audio, frames, samplerate, channels, stats=stats)
+
+
+async def play(
+    audio, data: np.ndarray, samplerate: int, stats: Stats | None = None
+) -> None:
+    """Play ``data`` through ``audio`` until it has finished."""
+    await playrec(audio, len(data), samplerate, 0, data, stats=stats)
+
+
+class BlockStream:
+    """Async iterator over blocks captured from an input stream.
+
+    The stream starts on the first iteration, or on entering ``async with``,
+    and stops after ``frames`` frames, if given, or when :meth:`aclose` is
+    called. Each block is a ``(frames, channels)`` float32 copy. When the
+    consumer falls more than ``queue_size`` blocks behind, further blocks are
+    dropped rather than stalling the audio thread; they are counted in
+    :attr:`dropped` and as overflows in ``stats``.
+    """
+
+    _END = object()
+
+    def __init__(
+        self,
+        audio,
+        samplerate: int,
+        channels: int = 1,
+        blocksize: int = 1024,
+        frames: int | None = None,
+        queue_size: int = 64,
+        stats: Stats | None = None,
+    ):
+        self.audio = audio
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.frames = frames
+        self.queue_size = queue_size
+        self.stats = stats
+        self.dropped = 0
+        self._queue: asyncio.Queue | None = None
+        self._stream = None
+        self._remaining = frames
+
+    def _start(self) -> None:
+        loop = asyncio.get_running_loop()
+        queue = self._queue = asyncio.Queue()
+
+        def put(block) -> None:
+            if block is self._END or queue.qsize() < self.queue_size:
+                queue.put_nowait(block)
+            else:
+                self.dropped += 1
+                if self.stats is not None:
+                    self.stats.overflow()
+
+        def callback(indata, nframes, time_info, status):
+            n = nframes
+            if self._remaining is not None:
+                n = min(nframes, self._remaining)
+                self._remaining -= n
+            if n:
+                loop.call_soon_threadsafe(put, indata[:n].copy())
+            if self._remaining is not None and self._remaining <= 0:
+                raise self.audio.CallbackStop
+
+        def finished_callback() -> None:
+            loop.call_soon_threadsafe(put, self._END)
+
+        self._stream = self.audio.InputStream(
+            samplerate=self.samplerate,
+            blocksize=self.blocksize,
+            channels=self.channels,
+            dtype="float32",
+            callback=callback,
+            finished_callback=finished_callback,
+        )
+        self._stream.start()
+
+    def __aiter__(self) -> "BlockStream":
+        return self
+
+    async def __anext__(self) -> np.ndarray:
+        if self._queue is None:
+            if self.frames is not None and self.frames <= 0:
+                raise StopAsyncIteration
+            self._start()
+        block = await self._queue.get()
+        if block is self._END:
+            # keep returning the end to later calls
+            self._queue.put_nowait(block)
+            await self.aclose()
+            raise StopAsyncIteration
+        return block
+
+    async def aclose(self) -> None:
+        """Stop and close the stream."""
+        if self._stream is not None:
+            stream, self._stream = self._stream, None
+            stream.close()
+
+    async def __aenter__(self) -> "BlockStream":
+        if self._queue is None:
+            self._start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
@@ -0,0 +1,302 @@
+"""Incremental background autosave for ``MultiTrackRecorder`` sessions."""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterator, List
+
+import numpy as np
+
+__all__ = ["AutosaveService", "SaveMetrics"]
+
+MANIFEST = "session.json"
+
+
+@dataclass
+class SaveMetrics:
+    """Timing and size of a single autosave."""
+
+    timestamp: float
+    latency: float
+    bytes_written: int
+
+
+def _merge_ranges(ranges: List[tuple[int, int]]) -> List[tuple[int, int]]:
+    merged: List[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _zero_runs(samples: np.ndarray, block: int = 4096) -> List[tuple[int, int, bool]]:
+    """Split ``samples`` into ``(start, end, silent)`` runs of whole blocks.
+
+    A run is silent when all its samples are exactly zero.
+    """
+    frames = len(samples)
+    count = -(-frames // block)
+    active = samples.reshape(frames, -1).any(axis=1)
+    padded = np.zeros(count * block, dtype=bool)
+    padded[:frames] = active
+    silent = ~padded.reshape(count, block).any(axis=1)
+    edges = np.flatnonzero(np.diff(silent)) + 1
+    starts = np.concatenate([[0], edges])
+    ends = np.concatenate([edges, [count]])
+    return [
+        (int(a) * block, min(int(b) * block, frames), bool(silent[a]))
+        for a, b in zip(starts, ends)
+    ]
+
+
+def _write_atomic(path: str, payload) -> int:
+    """Write the chunks of ``payload`` to ``path`` and return their size."""
+    tmp = path + ".tmp"
+    written = 0
+    with open(tmp, "wb") as f:
+        for chunk in payload:
+            f.write(chunk)
+            written += len(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return written
+
+
+class AutosaveService:
+    """Persist the ranges changed in a recorder on a background thread.
+
+    The service registers its own journal with the recorder, to which every
+    edit appends the sample ranges it touches. Each save drains the journal
+    and takes the track arrays and lengths while holding ``recorder.lock``.
+    It then copies the touched ranges into a new immutable segment file,
+    ``chunk_bytes`` at a time, taking the lock again only for each chunk so
+    edits are never blocked for long. Edits that change a track's length
+    replace its array and leave the one being saved untouched; a range
+    edited in place while it is saved is journaled again and rewritten by
+    the next save. Finally the session manifest listing the segments is
+    replaced atomically. An interrupted save
+    therefore always leaves the previous snapshot readable. The first save of
+    a service, and the next save once ``max_segments`` have accumulated,
+    writes all tracks in full and drops the older segments. When the
+    recorder's ``sparse_silence`` is set, spans of digital silence are listed
+    in the segment without writing their samples.
+    """
+
+    def __init__(
+        self,
+        recorder,
+        directory: str,
+        interval: float = 30.0,
+        max_segments: int = 64,
+        history: int = 100,
+        chunk_bytes: int = 4 * 1024 * 1024,
+    ):
+        self.recorder = recorder
+        self.directory = directory
+        self.interval = interval
+        self.max_segments = max_segments
+        self.chunk_bytes = chunk_bytes
+        self.metrics: deque[SaveMetrics] = deque(maxlen=history)
+        self._segments: List[dict] = []
+        self._full_next = True
+        self._shapes: List[list] | None = None
+        self._next_segment = 0
+        self._save_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.startswith("seg-") and name.endswith(".bin"):
+                self._next_segment = max(self._next_segment, int(name[4:-4]) + 1)
+        self._journal: deque[tuple[int, int, int]] = deque()
+        recorder.journals.append(self._journal)
+
+    # Lifecycle --------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start saving every ``interval`` seconds on a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and flush pending changes."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.save()
+
+    def close(self) -> None:
+        """Stop saving and detach the journal from the recorder."""
+        self.stop()
+        if self._journal in self.recorder.journals:
+            self.recorder.journals.remove(self._journal)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.save()
+
+    # Saving -----------------------------------------------------------------
+
+    def _drain(self) -> dict[int, List[tuple[int, int]]]:
+        journal = self._journal
+        dirty: dict[int, List[tuple[int, int]]] = {}
+        while journal:
+            t, start, end = journal.popleft()
+            dirty.setdefault(t, []).append((start, end))
+        return dirty
+
+    def save(self) -> SaveMetrics | None:
+        """Write pending changes to disk and return the save's metrics."""
+        with self._save_lock:
+            began = time.perf_counter()
+            with self.recorder.lock:
+                dirty = self._drain()
+                tracks = list(self.recorder.tracks)
+                shapes = [list(track.shape[1:]) for track in tracks]
+                # segments are decoded with the manifest's track shapes, so a
+                # track changing its channel count needs a full save
+                full = (
+                    self._full_next
+                    or len(self._segments) >= self.max_segments
+                    or shapes != self._shapes
+                )
+                if not dirty and not full:
+                    return None
+                if full:
+                    dirty = {i: [(0, len(track))] for i, track in enumerate(tracks)}
+                lengths = [len(track) for track in tracks]
+            self._full_next = False
+            self._shapes = shapes
+
+            ranges: List[list] = []
+            name = f"seg-{self._next_segment:06d}.bin"
+            self._next_segment += 1
+            written = _write_atomic(
+                os.path.join(self.directory, name),
+                self._copy_ranges(tracks, lengths, dirty, ranges),
+            )
+            segment = {
+                "file": name,
+                "lengths": lengths,
+                "ranges": ranges,
+            }
+            stale = self._segments if full else []
+            self._segments = [segment] if full else self._segments + [segment]
+            manifest = {
+                "version": 1,
+                "samplerate": self.recorder.samplerate,
+                "channels": self.recorder.channels,
+                "shapes": shapes,
+                "segments": self._segments,
+            }
+            data = json.dumps(manifest).encode()
+            _write_atomic(os.path.join(self.directory, MANIFEST), [data])
+            for old in stale:
+                try:
+                    os.remove(os.path.join(self.directory, old["file"]))
+                except OSError:
+                    pass
+
+            metrics = SaveMetrics(
+                timestamp=time.time(),
+                latency=time.perf_counter() - began,
+                bytes_written=written + len(data),
+            )
+            self.metrics.append(metrics)
+            return metrics
+
+    def _copy_ranges(
+        self,
+        tracks: List[np.ndarray],
+        lengths: List[int],
+        dirty: dict[int, List[tuple[int, int]]],
+        ranges: List[list],
+    ) -> Iterator[memoryview]:
+        """Yield copies of the dirty ranges and list them in ``ranges``.
+
+        Each ``[track, start, end, offset]`` entry gives the byte offset of
+        its samples in the segment, or -1 for a span of zeros.
+        """
+        lock = self.recorder.lock
+        sparse = getattr(self.recorder, "sparse_silence", False)
+        offset = 0
+        for t in sorted(dirty):
+            track = tracks[t]
+            frame_bytes = max(track[:1].nbytes, 4)
+            # whole blocks of ``_zero_runs`` per chunk
+            step = max(self.chunk_bytes // frame_bytes // 4096, 1) * 4096
+            for start, end in _merge_ranges(dirty[t]):
+                for first in range(start, min(end, lengths[t]), step):
+                    last = min(first + step, end, lengths[t])
+                    with lock:
+                        chunk = np.array(track[first:last], dtype=np.float32)
+                    if sparse:
+                        runs = _zero_runs(chunk)
+                    else:
+                        runs = [(0, last - first, False)]
+                    for a, b, silent in runs:
+                        if silent:
+                            ranges.append([t, first + a, first + b, -1])
+                            continue
+                        ranges.append([t, first + a, first + b, offset])
+                        data = memoryview(chunk[a:b]).cast("B")
+                        offset += len(data)
+                        yield data
+
+    # Loading ----------------------------------------------------------------
+
+    def restore(self) -> None:
+        """Load the last saved snapshot into the recorder."""
+        with open(os.path.join(self.directory, MANIFEST), "rb") as f:
+            manifest = json.load(f)
+        if manifest["samplerate"] != self.recorder.samplerate:
+            raise ValueError("samplerate mismatch")
+        shapes = [tuple(shape) for shape in manifest["shapes"]]
+        tracks = [np.zeros((0,) + shape, dtype=np.float32) for shape in shapes]
+        for segment in manifest["segments"]:
+            for t, length in enumerate(segment["lengths"]):
+                track = tracks[t]
+                if len(track) > length:
+                    tracks[t] = track[:length]
+                elif len(track) < length:
+                    pad = np.zeros((length - len(track),) + shapes[t], np.float32)
+                    tracks[t] = np.concatenate([track, pad])
+            path = os.path.join(self.directory, segment["file"])
+            blob = np.fromfile(path, dtype=np.float32)
+            for t, start, end, offset in segment["ranges"]:
+                if offset < 0:
+                    tracks[t][start:end] = 0
+                    continue
+                count = (end - start) * int(np.prod(shapes[t], dtype=int))
+                first = offset // 4
+                values = blob[first : first + count]
+                tracks[t][start:end] = values.reshape((end - start,) + shapes[t])
+        if len(tracks) != len(self.recorder.tracks):
+            raise ValueError("track count mismatch")
+        with self.recorder.lock:
+            self.recorder.tracks = tracks
+            self.recorder.position = 0
+            # edits in the history and cached renders belong to the replaced
+            # arrays and must not be applied to the restored ones
+            self.recorder.history.clear()
+            self.recorder._renders = [None] * len(tracks)
+            for journal in self.recorder.journals:
+                if journal is not self._journal:
+                    # other consumers must write the restored session
+                    journal.extend((i, 0, len(t)) for i, t in enumerate(tracks))
+            self._journal.clear()
+        self._segments = manifest["segments"]
+        self._shapes = [list(shape) for shape in shapes]
+        self._full_next = False
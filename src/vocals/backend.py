@@ -0,0 +1,532 @@
+"""Pluggable audio backends.
+
+The recorder talks to audio hardware through the small subset of the
+``sounddevice`` module API listed in :class:`AudioBackend`, so the
+``sounddevice`` module itself is the default backend. :class:`VirtualBackend`
+implements the same API without any device: input comes from arrays, files or
+generated signals, output is captured to buffers and stream callbacks are
+simulated at a configurable block size as fast as the CPU allows.
+"""
+
+import abc
+import math
+import threading
+import time
+import wave
+from types import SimpleNamespace
+from typing import Callable, Iterable, List
+
+import numpy as np
+
+from . import pcm
+from .stats import Stats
+
+__all__ = [
+    "AudioBackend",
+    "CallbackFlags",
+    "Transfer",
+    "VirtualBackend",
+    "default_backend",
+    "sine_source",
+]
+
+
+def default_backend():
+    """Return the ``sounddevice`` module, or ``None`` if it cannot be loaded.
+
+    Importing ``sounddevice`` initializes PortAudio, so modules call this on
+    their first audio I/O rather than at import time.
+    """
+    try:
+        import sounddevice
+    except Exception:  # pragma: no cover - dependency missing in tests
+        return None
+    return sounddevice
+
+
+class AudioBackend(abc.ABC):
+    """Interface of an audio backend, mirroring ``sounddevice``.
+
+    Streams accept the same keyword arguments as their ``sounddevice``
+    counterparts and call ``callback`` with ``(indata, frames, time, status)``,
+    ``(outdata, frames, time, status)`` or
+    ``(indata, outdata, frames, time, status)``.
+    """
+
+    class CallbackStop(Exception):
+        """Raised by a callback to stop its stream after the current block."""
+
+    class CallbackAbort(Exception):
+        """Raised by a callback to stop its stream, discarding pending output."""
+
+    @abc.abstractmethod
+    def rec(self, frames, samplerate=None, channels=None, dtype=None, **kwargs):
+        """Record ``frames`` frames and return them as an array."""
+
+    @abc.abstractmethod
+    def playrec(self, data, samplerate=None, channels=None, dtype=None, **kwargs):
+        """Play ``data`` while recording the same number of frames."""
+
+    @abc.abstractmethod
+    def play(self, data, samplerate=None, **kwargs):
+        """Play ``data``."""
+
+    @abc.abstractmethod
+    def wait(self):
+        """Wait for ``rec``, ``playrec`` or ``play`` to finish."""
+
+    @abc.abstractmethod
+    def stop(self):
+        """Stop all playback and recording."""
+
+    @abc.abstractmethod
+    def sleep(self, msec):
+        """Sleep for ``msec`` milliseconds while streams keep running."""
+
+    @abc.abstractmethod
+    def query_devices(self):
+        """Return a list of device description dictionaries."""
+
+    @abc.abstractmethod
+    def InputStream(self, **kwargs):
+        """Return an input stream."""
+
+    @abc.abstractmethod
+    def OutputStream(self, **kwargs):
+        """Return an output stream."""
+
+    @abc.abstractmethod
+    def Stream(self, **kwargs):
+        """Return a duplex stream."""
+
+
+class CallbackFlags:
+    """Status passed to stream callbacks, like ``sounddevice.CallbackFlags``."""
+
+    __slots__ = (
+        "input_overflow",
+        "input_underflow",
+        "output_overflow",
+        "output_underflow",
+    )
+
+    def __init__(self, xrun: bool = False):
+        self.input_overflow = xrun
+        self.input_underflow = False
+        self.output_overflow = False
+        self.output_underflow = xrun
+
+    def __bool__(self) -> bool:
+        return any(getattr(self, name) for name in self.__slots__)
+
+    def __str__(self) -> str:
+        return ", ".join(
+            n.replace("_", " ") for n in self.__slots__ if getattr(self, n)
+        )
+
+
+class Transfer:
+    """Stream callback recording ``frames`` frames while playing ``playback``.
+
+    :meth:`open` returns the matching stream of ``audio``, which the callback
+    stops once ``frames`` frames have passed, and :meth:`run` plays it to the
+    end. With ``channels`` of 0 nothing is recorded. When ``stats`` is given
+    every callback reports its duration, block size and status to it, which
+    the blocking ``rec``, ``playrec`` and ``play`` functions cannot do.
+    """
+
+    def __init__(
+        self,
+        audio,
+        frames: int,
+        channels: int = 1,
+        playback: np.ndarray | None = None,
+        stats: Stats | None = None,
+    ):
+        self.audio = audio
+        self.frames = frames
+        self.channels = channels
+        if playback is not None:
+            playback = np.asarray(playback, dtype=np.float32)
+            playback = playback.reshape(len(playback), -1)
+        self.playback = playback
+        self.stats = stats
+        self.recorded = np.zeros((frames, channels), dtype=np.float32)
+        self.position = 0
+
+    def open(self, **kwargs):
+        """Return an unstarted stream of ``audio`` running this callback."""
+        if self.channels and self.playback is not None:
+            factory = self.audio.Stream
+            channels = (self.channels, self.playback.shape[1])
+        elif self.channels:
+            factory, channels = self.audio.InputStream, self.channels
+        else:
+            factory, channels = self.audio.OutputStream, self.playback.shape[1]
+        return factory(channels=channels, dtype="float32", callback=self, **kwargs)
+
+    def run(self, **kwargs) -> np.ndarray:
+        """Run the stream until it finishes and return the recording."""
+        if self.frames:
+            done = threading.Event()
+            with self.open(finished_callback=done.set, **kwargs):
+                while not done.is_set():
+                    self.audio.sleep(20)
+        return self.recorded
+
+    def __call__(self, *args) -> None:
+        if self.stats is not None:
+            began = time.perf_counter()
+        *buffers, nframes, _time, status = args
+        pos = self.position
+        n = min(nframes, self.frames - pos)
+        if self.channels:
+            self.recorded[pos : pos + n] = buffers[0][:n]
+        if self.playback is not None:
+            out = buffers[-1]
+            out[:n] = self.playback[pos : pos + n]
+            out[n:] = 0
+        self.position = pos + n
+        if self.stats is not None:
+            self.stats.callback(time.perf_counter() - began, nframes, status)
+        if self.position >= self.frames:
+            raise self.audio.CallbackStop
+
+
+def sine_source(
+    frequency: float, amplitude: float = 0.5, samplerate: int = 44100
+) -> Callable[[int, int], np.ndarray]:
+    """Return a phase-continuous sine generator usable as a virtual input."""
+
+    step = 2 * np.pi * frequency / samplerate
+
+    def generate(offset: int, frames: int) -> np.ndarray:
+        n = np.arange(offset, offset + frames)
+        return (amplitude * np.sin(step * n)).astype(np.float32)
+
+    return generate
+
+
+def _channels(channels, index: int) -> int:
+    if isinstance(channels, (tuple, list)):
+        return channels[index]
+    return channels
+
+
+class _VirtualStream:
+    def __init__(
+        self,
+        backend: "VirtualBackend",
+        kind: str,
+        samplerate=None,
+        blocksize=None,
+        channels=1,
+        dtype="float32",
+        callback=None,
+        finished_callback=None,
+        free_run=None,
+        count_blocks=True,
+        **kwargs,
+    ):
+        self.backend = backend
+        self.free_run = backend.free_run if free_run is None else free_run
+        # blocking playback such as beeps does not take part in xrun injection
+        self.count_blocks = count_blocks
+        self.kind = kind
+        self.samplerate = samplerate or backend.samplerate
+        self.blocksize = blocksize or backend.blocksize
+        self.in_channels = _channels(channels, 0) if kind != "output" else 0
+        self.out_channels = _channels(channels, -1) if kind != "input" else 0
+        self.callback = callback
+        self.finished_callback = finished_callback
+        self.frames = 0
+        self.active = False
+        self.closed = False
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def time(self) -> float:
+        return self.frames / self.samplerate
+
+    def start(self) -> None:
+        if self.active or self.closed:
+            return
+        self.active = True
+        with self.backend._lock:
+            self.backend._streams.append(self)
+        if self.free_run:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if not self.active:
+            return
+        self.active = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._finish()
+
+    abort = stop
+
+    def close(self) -> None:
+        self.stop()
+        self.closed = True
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _run(self) -> None:
+        while self.active:
+            self.step()
+
+    def _finish(self) -> None:
+        with self.backend._lock:
+            if self in self.backend._streams:
+                self.backend._streams.remove(self)
+                if self.finished_callback is not None:
+                    self.finished_callback()
+
+    def step(self) -> bool:
+        """Process one block. Return ``False`` once the stream has stopped."""
+        with self._lock:
+            if not self.active:
+                return False
+            frames = self.blocksize
+            xrun = self.count_blocks and self.backend._next_block_is_xrun()
+            status = CallbackFlags(xrun)
+            time_info = SimpleNamespace(
+                currentTime=self.time,
+                inputBufferAdcTime=self.time,
+                outputBufferDacTime=self.time,
+            )
+            args: list = []
+            if self.in_channels:
+                indata = self.backend._read_input(frames, self.in_channels)
+                if status.input_overflow:
+                    indata[:] = 0
+                args.append(indata)
+            if self.out_channels:
+                outdata = np.zeros((frames, self.out_channels), dtype=np.float32)
+                args.append(outdata)
+            stopped = aborted = False
+            try:
+                self.callback(*args, frames, time_info, status)
+            except self.backend.CallbackStop:
+                stopped = True
+            except self.backend.CallbackAbort:
+                stopped = aborted = True
+            if self.out_channels and not aborted:
+                self.backend._capture(outdata)
+            self.frames += frames
+        if stopped:
+            self.active = False
+            self._finish()
+        return not stopped
+
+
+class VirtualBackend(AudioBackend):
+    """Device-free backend that simulates streams as fast as possible.
+
+    ``source`` provides the input signal and may be an array of shape
+    ``(frames,)`` or ``(frames, channels)``, the filename of a 16, 24 or 32 bit
+    WAV file at the backend's ``samplerate`` or a callable
+    ``source(offset, frames)`` such as :func:`sine_source`. Input past the end
+    of a finite source is silence unless ``loop`` is set. Everything written
+    to output streams is appended to :attr:`output`.
+
+    Callbacks run ``blocksize`` frames at a time. Blocks whose global index is
+    in ``xruns`` report an input overflow and output underflow and deliver
+    silent input, to exercise error handling. By default streams only advance
+    inside :meth:`sleep`, which makes runs deterministic; with
+    ``free_run=True`` every stream processes blocks on a worker thread from
+    ``start`` until it is stopped.
+    """
+
+    def __init__(
+        self,
+        source=None,
+        samplerate: int = 44100,
+        blocksize: int = 512,
+        xruns: Iterable[int] = (),
+        loop: bool = False,
+        free_run: bool = False,
+    ):
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.xruns = set(xruns)
+        self.loop = loop
+        self.free_run = free_run
+        self.output: List[np.ndarray] = []
+        self.blocks = 0
+        self.xrun_count = 0
+        self._source = self._load_source(source)
+        self._offset = 0
+        self._streams: List[_VirtualStream] = []
+        self._lock = threading.RLock()
+
+    # Signal sources -----------------------------------------------------------
+
+    def _load_source(self, source):
+        if source is None or callable(source):
+            return source
+        if isinstance(source, str):
+            with wave.open(source, "rb") as wf:
+                if wf.getframerate() != self.samplerate:
+                    raise ValueError(
+                        f"source is sampled at {wf.getframerate()} Hz, "
+                        f"not {self.samplerate} Hz"
+                    )
+                raw = wf.readframes(wf.getnframes())
+                # 16, 24 and 32 bit PCM; other widths raise ValueError
+                data = pcm.decode(raw, bits=8 * wf.getsampwidth())
+                return data.reshape(-1, wf.getnchannels())
+        data = np.asarray(source, dtype=np.float32)
+        return data.reshape(len(data), -1)
+
+    def _read_input(self, frames: int, channels: int) -> np.ndarray:
+        block = np.zeros((frames, channels), dtype=np.float32)
+        source = self._source
+        if source is None:
+            pass
+        elif callable(source):
+            data = np.asarray(source(self._offset, frames), dtype=np.float32)
+            block[:] = data.reshape(frames, -1)[:, :channels]
+        elif len(source):
+            filled = 0
+            while filled < frames:
+                pos = self._offset + filled
+                if self.loop:
+                    pos %= len(source)
+                elif pos >= len(source):
+                    break
+                n = min(frames - filled, len(source) - pos)
+                chunk = source[pos : pos + n]
+                if chunk.shape[1] == 1:
+                    block[filled : filled + n] = chunk
+                else:
+                    width = min(channels, chunk.shape[1])
+                    block[filled : filled + n, :width] = chunk[:, :width]
+                filled += n
+        self._offset += frames
+        return block
+
+    def _capture(self, outdata: np.ndarray) -> None:
+        self.output.append(outdata)
+
+    def _next_block_is_xrun(self) -> bool:
+        with self._lock:
+            xrun = self.blocks in self.xruns
+            self.blocks += 1
+            self.xrun_count += xrun
+            return xrun
+
+    def captured(self) -> np.ndarray:
+        """Return all captured output as one ``(frames, channels)`` array."""
+        if not self.output:
+            return np.zeros((0, 1), dtype=np.float32)
+        return np.concatenate(self.output)
+
+    # Streams ----------------------------------------------------------------
+
+    def InputStream(self, **kwargs):
+        return _VirtualStream(self, "input", **kwargs)
+
+    def OutputStream(self, **kwargs):
+        return _VirtualStream(self, "output", **kwargs)
+
+    def Stream(self, **kwargs):
+        return _VirtualStream(self, "duplex", **kwargs)
+
+    def sleep(self, msec) -> None:
+        """Advance every active stream by ``msec`` milliseconds of audio."""
+        with self._lock:
+            streams = list(self._streams)
+        for stream in streams:
+            target = stream.frames + math.ceil(msec * stream.samplerate / 1000)
+            if stream._thread is not None:
+                event = threading.Event()
+                while stream.active and stream.frames < target:
+                    event.wait(0.001)
+            else:
+                while stream.frames < target and stream.step():
+                    pass
+
+    def stop(self) -> None:
+        with self._lock:
+            streams = list(self._streams)
+        for stream in streams:
+            stream.stop()
+
+    def wait(self) -> None:
+        pass
+
+    def query_devices(self):
+        return [
+            {
+                "name": "virtual",
+                "max_input_channels": 32,
+                "max_output_channels": 32,
+                "default_samplerate": float(self.samplerate),
+            }
+        ]
+
+    # Blocking convenience functions -----------------------------------------
+
+    def _run_blocking(
+        self, frames, samplerate, in_channels, playback, count_blocks=True
+    ) -> np.ndarray:
+        out_channels = playback.shape[1] if playback is not None else 0
+        recorded = np.zeros((frames, in_channels), dtype=np.float32)
+        pos = 0
+
+        def callback(*args):
+            nonlocal pos
+            *buffers, n, _time, _status = args
+            n = min(n, frames - pos)
+            if in_channels:
+                recorded[pos : pos + n] = buffers[0][:n]
+            if playback is not None:
+                buffers[-1][:n] = playback[pos : pos + n]
+            pos += n
+            if pos >= frames:
+                raise self.CallbackStop
+
+        if in_channels and out_channels:
+            kind, channels = "duplex", (in_channels, out_channels)
+        elif in_channels:
+            kind, channels = "input", in_channels
+        else:
+            kind, channels = "output", out_channels
+        stream = _VirtualStream(
+            self,
+            kind,
+            samplerate=samplerate,
+            channels=channels,
+            callback=callback,
+            free_run=False,
+            count_blocks=count_blocks,
+        )
+        if frames:
+            stream.start()
+            while stream.step():
+                pass
+        return recorded
+
+    def rec(self, frames, samplerate=None, channels=1, dtype="float32", **kwargs):
+        return self._run_blocking(int(frames), samplerate, channels, None)
+
+    def playrec(self, data, samplerate=None, channels=1, dtype="float32", **kwargs):
+        playback = np.asarray(data, dtype=np.float32)
+        playback = playback.reshape(len(playback), -1)
+        return self._run_blocking(len(playback), samplerate, channels, playback)
+
+    def play(self, data, samplerate=None, **kwargs) -> None:
+        playback = np.asarray(data, dtype=np.float32)
+        playback = playback.reshape(len(playback), -1)
+        self._run_blocking(len(playback), samplerate, 0, playback, count_blocks=False)
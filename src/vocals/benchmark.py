@@ -0,0 +1,435 @@
+"""Benchmarks for startup, recording, editing, mixing, DSP, pitch and I/O.
+
+Run ``python -m vocals.benchmark`` to time every case on synthetic audio. Use
+``--save`` to store the results as a JSON baseline and ``--compare`` to check a
+later run against it; the command exits with status 1 when a case got slower
+than the baseline by more than ``--threshold``, or when importing the package
+or starting a command line tool takes longer than ``--startup-budget`` on top
+of the bare interpreter.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List
+
+import numpy as np
+
+from . import __version__, utils
+from .multitrack import MultiTrackRecorder
+
+__all__ = [
+    "Regression",
+    "compare",
+    "load_results",
+    "over_budget",
+    "run",
+    "save_results",
+]
+
+SAMPLERATE = 44100
+
+# seconds that importing the package or starting a command line tool may add
+# to the startup of the bare interpreter
+STARTUP_BUDGET = 0.075
+
+# startup case timing the interpreter alone, which the others are measured
+# against
+STARTUP_BASELINE = "startup.python"
+
+# Cases are built lazily: a factory prepares its inputs and returns the
+# callable that is timed.
+Case = Callable[[], Callable[[], object]]
+
+
+@dataclass
+class Regression:
+    """A benchmark that became slower than its baseline."""
+
+    name: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline
+
+
+def _signal(seconds: float, freq: float = 220.0) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLERATE)) / SAMPLERATE
+    return (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _ringbuffer(blocksize: int, seconds: float) -> Case:
+    def make():
+        from . import ringbuffer
+
+        rb = ringbuffer.RingBuffer(4 * blocksize)
+        block = _signal(blocksize / SAMPLERATE)
+        blocks = int(seconds * SAMPLERATE) // blocksize
+
+        def bench():
+            for _ in range(blocks):
+                rb.write(block)
+                rb.read(blocksize)
+
+        return bench
+
+    return make
+
+
+def _record_multi(channels: int, seconds: float) -> Case:
+    def make():
+        from . import ringbuffer  # noqa: F401 - skip the case when missing
+        from .backend import VirtualBackend
+
+        source = np.tile(_signal(1.0)[:, None], (1, channels))
+        backend = VirtualBackend(source, samplerate=96000, blocksize=256, loop=True)
+        rec = MultiTrackRecorder(num_tracks=channels, samplerate=96000)
+        rec.backend = backend
+
+        def bench():
+            rec.position = 0
+            rec.record_multi(range(channels), duration=seconds)
+
+        return bench
+
+    return make
+
+
+def _recorder(seconds: float, num_tracks: int = 1) -> MultiTrackRecorder:
+    rec = MultiTrackRecorder(num_tracks=num_tracks, samplerate=SAMPLERATE)
+    for t in range(num_tracks):
+        rec.tracks[t] = _signal(seconds, freq=110.0 * (t + 1))[:, None]
+    return rec
+
+
+def _ensure_length(seconds: float) -> Case:
+    def make():
+        rec = _recorder(seconds)
+        base = rec.tracks[0]
+
+        def bench():
+            rec.tracks[0] = base
+            rec._ensure_length(0, len(base) + SAMPLERATE)
+
+        return bench
+
+    return make
+
+
+def _cut_paste(seconds: float) -> Case:
+    def make():
+        rec = _recorder(seconds)
+
+        def bench():
+            rec.select_range(seconds / 2, seconds / 2 + 1)
+            rec.cut()
+            rec.paste()
+
+        return bench
+
+    return make
+
+
+def _mix(num_tracks: int, seconds: float) -> Case:
+    def make():
+        rec = _recorder(seconds, num_tracks=num_tracks)
+        return rec.mix_tracks
+
+    return make
+
+
+def _effects(seconds: float, blocksize: int) -> Case:
+    def make():
+        from .effects import Biquad, Compressor, EffectChain
+
+        chain = EffectChain(
+            [
+                Biquad("highpass", 80, SAMPLERATE),
+                Biquad("peaking", 3000, SAMPLERATE, q=1.0, gain_db=3.0),
+                Compressor(samplerate=SAMPLERATE),
+            ],
+            blocksize=blocksize,
+        )
+        samples = _signal(seconds)[:, None]
+        return lambda: chain.render(samples)
+
+    return make
+
+
+def _vocoder(seconds: float, shift: bool) -> Case:
+    def make():
+        from . import vocoder
+
+        samples = _signal(seconds)
+        if shift:
+            return lambda: vocoder.pitch_shift(samples, 3)
+        return lambda: vocoder.time_stretch(samples, 0.8)
+
+    return make
+
+
+def _harmony(num_tracks: int, seconds: float) -> Case:
+    def make():
+        rec = _recorder(seconds, num_tracks=num_tracks)
+        return rec.harmony
+
+    return make
+
+
+def _warmup(octaves: int) -> Case:
+    def make():
+        from . import warmup
+
+        exercise = warmup.Exercise(tuple(range(12 * octaves + 1)), root=110.0)
+
+        def bench():
+            # time the synthesis rather than the cache
+            warmup._render.cache_clear()
+            warmup.render(exercise)
+
+        return bench
+
+    return make
+
+
+def _estimate_pitch(frame_size: int) -> Case:
+    def make():
+        frame = _signal(frame_size / SAMPLERATE)
+        return lambda: utils.estimate_pitch(frame, samplerate=SAMPLERATE)
+
+    return make
+
+
+def _pitch_range(seconds: float) -> Case:
+    def make():
+        samples = _signal(seconds)
+        return lambda: utils.pitch_range(samples, samplerate=SAMPLERATE)
+
+    return make
+
+
+def _wav(seconds: float, export: bool, workdir: str) -> Case:
+    def make():
+        rec = _recorder(seconds)
+        path = os.path.join(workdir, f"{seconds}-{export}.wav")
+        rec.export_audio(path)
+        if export:
+            return lambda: rec.export_audio(path)
+        return lambda: rec.import_audio(path)
+
+    return make
+
+
+def _startup(args: List[str]) -> Case:
+    def make():
+        # time this copy of the package whether or not it is installed
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+        command = [sys.executable, *args]
+
+        def bench():
+            subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+
+        return bench
+
+    return make
+
+
+def _cases(quick: bool, workdir: str) -> Iterator[tuple[str, Case]]:
+    # ``quick`` shrinks the inputs so a full run takes a fraction of a second
+    scale = 0.05 if quick else 1.0
+    yield STARTUP_BASELINE, _startup(["-c", "pass"])
+    yield "startup.import[vocals]", _startup(["-c", "import vocals"])
+    yield "startup.cli[record --version]", _startup(
+        ["-m", "vocals.record", "--version"]
+    )
+    yield "startup.cli[warmup --help]", _startup(["-m", "vocals.warmup", "--help"])
+    for blocksize in (64, 512, 4096):
+        yield f"ringbuffer.write_read[block={blocksize}]", _ringbuffer(
+            blocksize, 10 * scale
+        )
+    for channels in (2, 8, 16):
+        yield f"capture.record_multi[channels={channels}]", _record_multi(
+            channels, 10 * scale
+        )
+    for seconds in (10, 60, 600):
+        yield f"edit.ensure_length[seconds={seconds}]", _ensure_length(
+            max(seconds * scale, 2)
+        )
+        yield f"edit.cut_paste[seconds={seconds}]", _cut_paste(max(seconds * scale, 2))
+    for num_tracks in (2, 8, 32):
+        yield f"mix.mix_tracks[tracks={num_tracks}]", _mix(num_tracks, 60 * scale)
+    for blocksize in (64, 1024):
+        yield f"effects.render[block={blocksize}]", _effects(10 * scale, blocksize)
+    for seconds in (10, 60):
+        yield f"vocoder.time_stretch[seconds={seconds}]", _vocoder(
+            seconds * scale, False
+        )
+        yield f"vocoder.pitch_shift[seconds={seconds}]", _vocoder(seconds * scale, True)
+    for num_tracks in (1, 4, 16):
+        yield f"harmony.session[tracks={num_tracks}]", _harmony(num_tracks, 600 * scale)
+    for octaves in (1, 3):
+        yield f"warmup.render[octaves={octaves}]", _warmup(octaves)
+    for frame_size in (1024, 2048, 4096):
+        yield f"pitch.estimate_pitch[frame={frame_size}]", _estimate_pitch(frame_size)
+    for seconds in (1, 10, 60):
+        yield f"pitch.pitch_range[seconds={seconds}]", _pitch_range(seconds * scale)
+    for seconds in (10, 60):
+        yield f"io.export_wav[seconds={seconds}]", _wav(seconds * scale, True, workdir)
+        yield f"io.import_wav[seconds={seconds}]", _wav(seconds * scale, False, workdir)
+
+
+def _best_time(bench: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        began = time.perf_counter()
+        bench()
+        best = min(best, time.perf_counter() - began)
+    return best
+
+
+def run(
+    pattern: str | None = None, repeat: int = 5, quick: bool = False
+) -> Dict[str, float]:
+    """Run the benchmarks whose name contains ``pattern``.
+
+    Return the best of ``repeat`` timings in seconds for each case. Cases whose
+    optional components, such as the ring buffer extension, are unavailable
+    are skipped.
+    """
+    results: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory(prefix="vocals-bench-") as workdir:
+        for name, make in _cases(quick, workdir):
+            if pattern is not None and pattern not in name:
+                continue
+            try:
+                bench = make()
+            except ImportError:
+                continue
+            results[name] = _best_time(bench, repeat)
+    return results
+
+
+def save_results(path: str, results: Dict[str, float]) -> None:
+    """Write ``results`` and a description of the environment to ``path``."""
+    payload = {
+        "version": 1,
+        "vocals": __version__,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> Dict[str, float]:
+    """Return the results stored in ``path`` by ``save_results``."""
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(
+    baseline: Dict[str, float], current: Dict[str, float], threshold: float = 0.25
+) -> List[Regression]:
+    """Return the cases of ``current`` slower than ``baseline`` by ``threshold``.
+
+    ``threshold`` is relative, so the default flags cases that take more than
+    25% longer. Cases missing from either run are ignored.
+    """
+    regressions = []
+    for name, seconds in current.items():
+        base = baseline.get(name)
+        if base is not None and base > 0 and seconds > base * (1 + threshold):
+            regressions.append(Regression(name, base, seconds))
+    return regressions
+
+
+def over_budget(
+    results: Dict[str, float], budget: float = STARTUP_BUDGET
+) -> Dict[str, float]:
+    """Return the startup cases taking ``budget`` seconds longer than the
+    bare interpreter, mapped to the time they add.
+
+    Nothing is checked unless ``results`` include the interpreter baseline.
+    """
+    base = results.get(STARTUP_BASELINE)
+    if base is None:
+        return {}
+    added = {
+        name: seconds - base
+        for name, seconds in results.items()
+        if name.startswith("startup.") and name != STARTUP_BASELINE
+    }
+    return {name: extra for name, extra in added.items() if extra > budget}
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the vocals hot paths")
+    parser.add_argument(
+        "-k", "--filter", default=None, help="Only run cases containing this text"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Timings per case, the best is kept"
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="Use small inputs for a fast check"
+    )
+    parser.add_argument("--save", default=None, help="Write results to this JSON")
+    parser.add_argument(
+        "--compare", default=None, help="Compare against a saved JSON baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Relative slowdown reported as a regression",
+    )
+    parser.add_argument(
+        "--startup-budget",
+        type=float,
+        default=STARTUP_BUDGET,
+        help="Seconds startup cases may add to the bare interpreter",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.filter, repeat=args.repeat, quick=args.quick)
+    baseline = load_results(args.compare) if args.compare else {}
+    for name, seconds in results.items():
+        line = f"{name:<45} {seconds * 1000:10.3f} ms"
+        if name in baseline:
+            change = (seconds / baseline[name] - 1) * 100
+            line += f" {change:+7.1f}%"
+        print(line)
+    if args.save:
+        save_results(args.save, results)
+
+    regressions = compare(baseline, results, args.threshold)
+    for r in regressions:
+        print(
+            f"REGRESSION {r.name}: {r.baseline * 1000:.3f} ms -> "
+            f"{r.current * 1000:.3f} ms ({r.ratio:.2f}x)",
+            file=sys.stderr,
+        )
+    slow = over_budget(results, args.startup_budget)
+    for name, extra in slow.items():
+        print(
+            f"OVER BUDGET {name}: {extra * 1000:.1f} ms over the interpreter "
+            f"(budget {args.startup_budget * 1000:.1f} ms)",
+            file=sys.stderr,
+        )
+    return 1 if regressions or slow else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""Block-based effects with state carried between blocks.
+
+Effects process ``(frames, channels)`` float32 blocks in place and return
+them, so a chain can run inside an audio callback one block at a time or over
+a whole track with :meth:`EffectChain.render`. Filter and envelope recursions
+run in the ``vocals.kernels`` C extension; equivalent NumPy code is used when
+it is not built.
+"""
+
+import abc
+import math
+from typing import Iterable, List
+
+import numpy as np
+
+try:
+    from . import kernels as _kernels
+except ImportError:  # pragma: no cover - extension not built
+    _kernels = None
+
+__all__ = ["Biquad", "Compressor", "Effect", "EffectChain", "Gain"]
+
+
+def _db_to_gain(db: float) -> float:
+    return 10 ** (db / 20)
+
+
+class Effect(abc.ABC):
+    """Base class of effects processing blocks of samples."""
+
+    @abc.abstractmethod
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Process a C-contiguous float32 ``(frames, channels)`` block in place."""
+
+    def reset(self) -> None:
+        """Forget the state kept from previous blocks."""
+
+
+class Gain(Effect):
+    """Constant gain of ``db`` decibels."""
+
+    def __init__(self, db: float = 0.0):
+        self.db = db
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        block *= _db_to_gain(self.db)
+        return block
+
+
+class Biquad(Effect):
+    """Second order IIR filter for equalization.
+
+    ``kind`` is one of ``"lowpass"``, ``"highpass"``, ``"peaking"``,
+    ``"lowshelf"`` and ``"highshelf"``, with coefficients from the Audio EQ
+    Cookbook. ``gain_db`` only applies to the peaking and shelving kinds.
+    """
+
+    KINDS = ("lowpass", "highpass", "peaking", "lowshelf", "highshelf")
+
+    def __init__(
+        self,
+        kind: str,
+        frequency: float,
+        samplerate: int = 44100,
+        q: float = 0.7071,
+        gain_db: float = 0.0,
+    ):
+        if kind not in self.KINDS:
+            raise ValueError(f"unknown filter kind {kind!r}")
+        if not 0 < frequency < samplerate / 2:
+            raise ValueError("frequency must be below the Nyquist frequency")
+        self.kind = kind
+        self.coeffs = self._design(kind, frequency, samplerate, q, gain_db)
+        self._state: np.ndarray | None = None
+
+    @staticmethod
+    def _design(kind, frequency, samplerate, q, gain_db) -> tuple:
+        a = 10 ** (gain_db / 40)
+        w0 = 2 * math.pi * frequency / samplerate
+        cos, alpha = math.cos(w0), math.sin(w0) / (2 * q)
+        if kind == "lowpass":
+            b = ((1 - cos) / 2, 1 - cos, (1 - cos) / 2)
+            den = (1 + alpha, -2 * cos, 1 - alpha)
+        elif kind == "highpass":
+            b = ((1 + cos) / 2, -(1 + cos), (1 + cos) / 2)
+            den = (1 + alpha, -2 * cos, 1 - alpha)
+        elif kind == "peaking":
+            b = (1 + alpha * a, -2 * cos, 1 - alpha * a)
+            den = (1 + alpha / a, -2 * cos, 1 - alpha / a)
+        else:
+            shelf = 2 * math.sqrt(a) * alpha
+            sign = 1 if kind == "lowshelf" else -1
+            b = (
+                a * ((a + 1) - sign * (a - 1) * cos + shelf),
+                sign * 2 * a * ((a - 1) - sign * (a + 1) * cos),
+                a * ((a + 1) - sign * (a - 1) * cos - shelf),
+            )
+            den = (
+                (a + 1) + sign * (a - 1) * cos + shelf,
+                -sign * 2 * ((a - 1) + sign * (a + 1) * cos),
+                (a + 1) + sign * (a - 1) * cos - shelf,
+            )
+        return (
+            b[0] / den[0],
+            b[1] / den[0],
+            b[2] / den[0],
+            den[1] / den[0],
+            den[2] / den[0],
+        )
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        channels = block.shape[1]
+        if self._state is None or len(self._state) != channels:
+            self._state = np.zeros((channels, 2))
+        if _kernels is not None:
+            _kernels.biquad(block, self._state, channels, self.coeffs)
+            return block
+        b0, b1, b2, a1, a2 = self.coeffs
+        z1, z2 = self._state[:, 0].copy(), self._state[:, 1].copy()
+        # the recursion runs sample by sample, vectorized over channels
+        for frame in block:
+            x = frame.astype(np.float64)
+            y = b0 * x + z1
+            z1 = b1 * x - a1 * y + z2
+            z2 = b2 * x - a2 * y
+            frame[:] = y
+        self._state[:, 0], self._state[:, 1] = z1, z2
+        return block
+
+    def reset(self) -> None:
+        self._state = None
+
+
+class Compressor(Effect):
+    """Feed-forward peak compressor with channels linked.
+
+    Levels above ``threshold_db`` are reduced by ``ratio``, following the
+    peak envelope with ``attack`` and ``release`` times in seconds, and
+    ``makeup_db`` is applied afterwards.
+    """
+
+    def __init__(
+        self,
+        threshold_db: float = -18.0,
+        ratio: float = 4.0,
+        attack: float = 0.005,
+        release: float = 0.1,
+        makeup_db: float = 0.0,
+        samplerate: int = 44100,
+    ):
+        if ratio < 1:
+            raise ValueError("ratio must be at least 1")
+        self.threshold_db = threshold_db
+        self.ratio = ratio
+        self.makeup_db = makeup_db
+        self.attack = math.exp(-1 / (attack * samplerate)) if attack > 0 else 0.0
+        self.release = math.exp(-1 / (release * samplerate)) if release > 0 else 0.0
+        self._envelope = np.zeros(1)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        if not len(block):
+            return block
+        levels = np.abs(block).max(axis=1)
+        if _kernels is not None:
+            _kernels.follow(levels, self._envelope, self.attack, self.release)
+        else:
+            env = self._envelope[0]
+            for i, level in enumerate(levels):
+                coeff = self.attack if level > env else self.release
+                env = coeff * env + (1 - coeff) * level
+                levels[i] = env
+            self._envelope[0] = env
+        over = 20 * np.log10(np.maximum(levels, 1e-9)) - self.threshold_db
+        gain_db = np.maximum(over, 0) * (1 / self.ratio - 1) + self.makeup_db
+        block *= np.power(10, gain_db / 20, dtype=np.float32)[:, None]
+        return block
+
+    def reset(self) -> None:
+        self._envelope[:] = 0
+
+
+class EffectChain(Effect):
+    """Effects applied in order to fixed-size blocks."""
+
+    def __init__(self, effects: Iterable[Effect] = (), blocksize: int = 1024):
+        self.effects: List[Effect] = list(effects)
+        self.blocksize = blocksize
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        for effect in self.effects:
+            block = effect.process(block)
+        return block
+
+    def reset(self) -> None:
+        for effect in self.effects:
+            effect.reset()
+
+    def render(self, samples: np.ndarray) -> np.ndarray:
+        """Return ``samples`` processed from a reset state, block by block."""
+        out = np.array(samples, dtype=np.float32, order="C")
+        if out.ndim == 1:
+            out = out[:, None]
+        self.reset()
+        for start in range(0, len(out), self.blocksize):
+            block = out[start : start + self.blocksize]
+            processed = self.process(block)
+            if processed is not block:
+                block[:] = processed
+        return out
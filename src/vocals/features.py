@@ -0,0 +1,145 @@
+"""Per-take feature index for ranking takes of the same region."""
+
+from typing import Hashable, List, NamedTuple
+
+import numpy as np
+
+from . import utils
+
+__all__ = ["FeatureIndex", "TakeFeatures", "take_features"]
+
+
+class TakeFeatures(NamedTuple):
+    """Compact analysis of one take."""
+
+    rms: np.ndarray  # per-frame RMS envelope
+    pitch: np.ndarray  # per-frame pitch in Hz, ``nan`` where unvoiced
+    stability: float  # std of frame-to-frame pitch change in cents
+    tuning: float  # mean distance from the nearest semitone in cents
+    clipped: int  # number of samples at or beyond full scale
+
+
+def _cents(pitch: np.ndarray) -> np.ndarray:
+    return 1200 * np.log2(pitch / 440.0)
+
+
+def take_features(
+    samples: np.ndarray, samplerate: int = 44100, frame_size: int = 2048
+) -> TakeFeatures:
+    """Analyse ``samples`` into a :class:`TakeFeatures` record."""
+
+    mono = utils.downmix(samples)
+    frames = utils.frame_signal(mono, frame_size, frame_size // 2)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    pitch = utils.pitch_contour(mono, samplerate=samplerate, frame_size=frame_size)
+    cents = _cents(pitch)
+    voiced = cents[~np.isnan(cents)]
+    if voiced.size:
+        tuning = float(np.mean(np.abs(voiced - 100 * np.round(voiced / 100))))
+    else:
+        tuning = np.nan
+    steps = np.diff(cents)
+    steps = steps[~np.isnan(steps)]
+    stability = float(np.std(steps)) if steps.size else np.nan
+    clipped = int(np.count_nonzero(np.abs(samples) >= 0.999))
+    return TakeFeatures(rms.astype(np.float32), pitch, stability, tuning, clipped)
+
+
+class FeatureIndex:
+    """Features of every take, stacked per region for vectorized queries.
+
+    Features are computed once per distinct take content when the take is
+    stored. Queries operate on ``(takes, frames)`` matrices so ranking hundreds
+    of takes is a handful of NumPy reductions.
+    """
+
+    def __init__(self, samplerate: int = 44100, frame_size: int = 2048):
+        self.samplerate = samplerate
+        self.frame_size = frame_size
+        self._features: dict[str, TakeFeatures] = {}
+        self._entries: dict[Hashable, List[str]] = {}
+        self._stacked: dict[Hashable, dict[str, np.ndarray]] = {}
+
+    def add(self, key: Hashable, digest: str, samples: np.ndarray) -> None:
+        """Index take ``samples`` with content hash ``digest`` under ``key``."""
+        if digest not in self._features:
+            self._features[digest] = take_features(
+                samples, samplerate=self.samplerate, frame_size=self.frame_size
+            )
+        self._entries.setdefault(key, []).append(digest)
+        self._stacked.pop(key, None)
+
+    def remove(self, key: Hashable, index: int | None = None) -> None:
+        """Forget take ``index`` of ``key``, or all of its takes."""
+        digests = self._entries.get(key, [])
+        if index is None:
+            removed, digests[:] = list(digests), []
+        else:
+            removed = [digests.pop(index)]
+        if not digests:
+            self._entries.pop(key, None)
+        self._stacked.pop(key, None)
+        for digest in removed:
+            if not any(digest in d for d in self._entries.values()):
+                self._features.pop(digest, None)
+
+    def features(self, key: Hashable) -> List[TakeFeatures]:
+        """Return the features of all takes for ``key`` in take order."""
+        return [self._features[d] for d in self._entries.get(key, [])]
+
+    def _matrices(self, key: Hashable) -> dict[str, np.ndarray]:
+        stacked = self._stacked.get(key)
+        if stacked is None:
+            feats = self.features(key)
+            if not feats:
+                raise ValueError("no takes for region")
+            stacked = {
+                "rms": np.stack([f.rms for f in feats]),
+                "pitch": np.stack([f.pitch for f in feats]),
+                "stability": np.array([f.stability for f in feats]),
+                "tuning": np.array([f.tuning for f in feats]),
+                "clipped": np.array([f.clipped for f in feats]),
+            }
+            self._stacked[key] = stacked
+        return stacked
+
+    def rank(self, key: Hashable, by: str = "tuning") -> np.ndarray:
+        """Return take indices for ``key`` ordered best first.
+
+        ``by`` is ``"tuning"`` (most in tune), ``"stability"`` (steadiest
+        pitch), ``"clipped"`` (fewest clipped samples) or ``"loudness"``
+        (highest average RMS). Takes without a detectable pitch rank last.
+        """
+        m = self._matrices(key)
+        if by in ("tuning", "stability"):
+            score = np.where(np.isnan(m[by]), np.inf, m[by])
+        elif by == "clipped":
+            score = m["clipped"]
+        elif by == "loudness":
+            score = -m["rms"].mean(axis=1)
+        else:
+            raise ValueError(f"unknown ranking {by!r}")
+        return np.argsort(score, kind="stable")
+
+    def closest(
+        self, key: Hashable, reference: np.ndarray, pitch_weight: float = 1.0
+    ) -> np.ndarray:
+        """Return take indices for ``key`` ordered by similarity to ``reference``.
+
+        The distance combines the mean pitch difference in semitones over
+        frames voiced in both and the mean difference of the RMS envelopes
+        relative to the reference level.
+        """
+        m = self._matrices(key)
+        ref = take_features(
+            reference, samplerate=self.samplerate, frame_size=self.frame_size
+        )
+        n = min(m["rms"].shape[1], len(ref.rms))
+        level = max(float(ref.rms[:n].mean()) if n else 0.0, 1e-6)
+        rms_dist = np.abs(m["rms"][:, :n] - ref.rms[:n]).mean(axis=1) / level
+        diff = np.abs(_cents(m["pitch"][:, :n]) - _cents(ref.pitch[:n])) / 100
+        both = ~np.isnan(diff)
+        counts = both.sum(axis=1)
+        pitch_dist = np.where(both, diff, 0).sum(axis=1) / np.maximum(counts, 1)
+        pitch_dist = np.where(counts > 0, pitch_dist, 0.0)
+        return np.argsort(rms_dist + pitch_weight * pitch_dist, kind="stable")
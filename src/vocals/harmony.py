@@ -0,0 +1,202 @@
+"""Harmony analysis across the tracks of a session.
+
+Chroma features of every track are computed together: each chunk of frames
+from all tracks is transformed with one batched FFT and folded into the
+twelve pitch classes with a matrix product. The per-track chroma is then
+combined into a timeline of chords, the strongest note of every track and the
+intervals between them.
+"""
+
+from typing import List, NamedTuple, Sequence
+
+import numpy as np
+
+from . import utils
+
+__all__ = [
+    "INTERVAL_NAMES",
+    "PITCH_CLASSES",
+    "HarmonySegment",
+    "analyse",
+    "chord_timeline",
+    "chroma",
+]
+
+PITCH_CLASSES = ("C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B")
+
+INTERVAL_NAMES = (
+    "unison",
+    "minor second",
+    "major second",
+    "minor third",
+    "major third",
+    "perfect fourth",
+    "tritone",
+    "perfect fifth",
+    "minor sixth",
+    "major sixth",
+    "minor seventh",
+    "major seventh",
+)
+
+# chord suffix and pitch classes above the root
+_QUALITIES = (("", (0, 4, 7)), ("m", (0, 3, 7)))
+
+
+class HarmonySegment(NamedTuple):
+    """A stretch of time with the same chord and notes."""
+
+    start: float  # seconds
+    end: float  # seconds
+    chord: str | None  # such as ``"C"`` or ``"F#m"``, ``None`` if unclear
+    notes: tuple  # strongest pitch class name of each track, ``None`` if silent
+    intervals: tuple  # semitones of each note above the first one sounding
+
+
+def _fold_matrix(
+    frame_size: int, samplerate: int, fmin: float, fmax: float
+) -> np.ndarray:
+    """Return the ``(bins, 12)`` matrix summing FFT bins into pitch classes."""
+    freqs = np.fft.rfftfreq(frame_size, 1 / samplerate)
+    band = np.flatnonzero((freqs >= fmin) & (freqs <= fmax))
+    classes = (np.round(12 * np.log2(freqs[band] / 440.0)).astype(int) + 9) % 12
+    matrix = np.zeros((len(freqs), 12), dtype=np.float32)
+    matrix[band, classes] = 1
+    return matrix
+
+
+def _templates() -> tuple[np.ndarray, List[str]]:
+    names = []
+    rows = []
+    for suffix, intervals in _QUALITIES:
+        for root in range(12):
+            row = np.zeros(12, dtype=np.float32)
+            row[[(root + i) % 12 for i in intervals]] = 1
+            rows.append(row / np.linalg.norm(row))
+            names.append(PITCH_CLASSES[root] + suffix)
+    return np.array(rows), names
+
+
+def chroma(
+    tracks: Sequence[np.ndarray],
+    samplerate: int = 44100,
+    frame_size: int = 4096,
+    hop: int = 2048,
+    chunk: int = 64,
+    fmin: float = 60.0,
+    fmax: float = 2000.0,
+) -> np.ndarray:
+    """Return the ``(tracks, frames, 12)`` chroma energy of ``tracks``.
+
+    Frames of ``frame_size`` samples start every ``hop`` samples; shorter
+    tracks are silent after their end. Only frequencies from ``fmin`` to
+    ``fmax`` are counted. ``chunk`` frames of every track are transformed at
+    once, which bounds the memory used.
+    """
+    mono = [utils.downmix(track).astype(np.float32, copy=False) for track in tracks]
+    counts = [max((len(m) - frame_size) // hop + 1, 0) for m in mono]
+    total = max(counts, default=0)
+    out = np.zeros((len(mono), total, 12), dtype=np.float32)
+    if not total:
+        return out
+    # nothing above ``fmax`` is counted, so frames are averaged down by the
+    # largest power of two keeping the band well below the Nyquist frequency
+    factor = 1
+    while (
+        samplerate / (2 * factor) >= 2 * fmax
+        and frame_size % (2 * factor) == 0
+        and hop % (2 * factor) == 0
+    ):
+        factor *= 2
+    size, step = frame_size // factor, hop // factor
+    window = np.hanning(size).astype(np.float32)
+    fold = _fold_matrix(size, samplerate / factor, fmin, fmax)
+    block = np.empty((len(mono), chunk, size), dtype=np.float32)
+    for first in range(0, total, chunk):
+        n = min(chunk, total - first)
+        for i, samples in enumerate(mono):
+            k = min(max(counts[i] - first, 0), n)
+            if k:
+                begin = first * hop
+                span = samples[begin : begin + (k - 1) * hop + frame_size]
+                reduced = span.reshape(-1, factor).mean(axis=1)
+                frames = np.lib.stride_tricks.sliding_window_view(reduced, size)
+                np.multiply(frames[::step], window, out=block[i, :k])
+            block[i, k:n] = 0
+        spectrum = np.fft.rfft(block[:, :n], axis=-1)
+        power = spectrum.real**2 + spectrum.imag**2
+        out[:, first : first + n] = power @ fold
+    return out
+
+
+def chord_timeline(
+    features: np.ndarray,
+    samplerate: int = 44100,
+    hop: int = 2048,
+    silence_db: float = -40.0,
+    min_score: float = 0.8,
+) -> List[HarmonySegment]:
+    """Combine ``(tracks, frames, 12)`` chroma into a list of segments.
+
+    A track sounds in frames whose energy is within ``silence_db`` of its
+    loudest frame. The chord of a frame is the major or minor triad whose
+    template is closest to the sum of the normalized chroma of the sounding
+    tracks, if its cosine similarity reaches ``min_score``. Consecutive frames
+    with the same chord and notes form one segment.
+    """
+    tracks, frames, _ = features.shape
+    if not frames:
+        return []
+    energy = features.sum(axis=2)
+    peak = energy.max(axis=1, keepdims=True)
+    active = (energy > peak * 10 ** (silence_db / 10)) & (energy > 0)
+    notes = np.where(active, features.argmax(axis=2), -1)
+
+    normalized = features / np.maximum(energy, 1e-20)[:, :, None]
+    combined = (normalized * active[:, :, None]).sum(axis=0)
+    templates, names = _templates()
+    norms = np.maximum(np.linalg.norm(combined, axis=1), 1e-20)
+    scores = combined @ templates.T / norms[:, None]
+    chords = np.where(scores.max(axis=1) >= min_score, scores.argmax(axis=1), -1)
+
+    # intervals are measured from the first track sounding in each frame
+    first = np.argmax(active, axis=0)
+    reference = notes[first, np.arange(frames)]
+    intervals = np.where(active, (notes - reference) % 12, -1)
+
+    keys = np.vstack([chords, notes])
+    changes = np.flatnonzero((keys[:, 1:] != keys[:, :-1]).any(axis=0)) + 1
+    starts = np.concatenate([[0], changes])
+    ends = np.concatenate([changes, [frames]])
+    segments = []
+    for start, end in zip(starts, ends):
+        chord = int(chords[start])
+        segments.append(
+            HarmonySegment(
+                start=float(start * hop / samplerate),
+                end=float(end * hop / samplerate),
+                chord=names[chord] if chord >= 0 else None,
+                notes=tuple(
+                    PITCH_CLASSES[n] if n >= 0 else None for n in notes[:, start]
+                ),
+                intervals=tuple(
+                    int(i) if i >= 0 else None for i in intervals[:, start]
+                ),
+            )
+        )
+    return segments
+
+
+def analyse(
+    tracks: Sequence[np.ndarray],
+    samplerate: int = 44100,
+    frame_size: int = 4096,
+    hop: int = 2048,
+    **kwargs,
+) -> List[HarmonySegment]:
+    """Return the chord timeline of ``tracks`` played together.
+
+    Keyword arguments are passed on to :func:`chord_timeline`.
+    """
+    features = chroma(tracks, samplerate, frame_size=frame_size, hop=hop)
+    return chord_timeline(features, samplerate, hop=hop, **kwargs)
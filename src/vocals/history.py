@@ -0,0 +1,122 @@
+"""Undo and redo history for ``MultiTrackRecorder`` edits."""
+
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, List, NamedTuple
+
+import numpy as np
+
+__all__ = ["EditHistory", "Splice"]
+
+
+class Splice(NamedTuple):
+    """Replacement of ``removed`` by ``inserted`` at ``start`` of a track.
+
+    A splice is its own inverse description: swapping ``removed`` and
+    ``inserted`` undoes it. Both arrays hold only the samples involved in the
+    edit: ``removed`` is copied out of the track unless the whole track array
+    was replaced, and ``inserted`` is the caller's data. Neither is a snapshot
+    of the rest of the track.
+    """
+
+    track: int
+    start: int
+    removed: np.ndarray
+    inserted: np.ndarray
+
+    def inverse(self) -> "Splice":
+        return Splice(self.track, self.start, self.inserted, self.removed)
+
+    @property
+    def nbytes(self) -> int:
+        return _nbytes(self.removed) + _nbytes(self.inserted)
+
+
+def _nbytes(array: np.ndarray) -> int:
+    # broadcast zero padding has a zero stride and owns no memory
+    if array.ndim and array.strides[0] == 0:
+        return 0
+    return array.nbytes
+
+
+class EditHistory:
+    """Undo and redo stacks of splices bounded by ``max_bytes``.
+
+    Each entry is the list of splices made by one edit operation. When the
+    referenced samples exceed ``max_bytes`` the oldest entries are evicted
+    first, starting with the undo stack.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._undo: deque[List[Splice]] = deque()
+        self._redo: List[List[Splice]] = []
+        self._pending: List[Splice] | None = None
+        self._depth = 0
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    @contextmanager
+    def group(self) -> Iterator[None]:
+        """Combine all splices recorded inside the block into one entry."""
+        if self._depth == 0:
+            self._pending = []
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                pending, self._pending = self._pending, None
+                if pending:
+                    self._push_undo(pending, clear_redo=True)
+
+    def record(self, splice: Splice) -> None:
+        """Add ``splice`` as a new edit, discarding the redo stack."""
+        if self._pending is not None:
+            self._pending.append(splice)
+        else:
+            self._push_undo([splice], clear_redo=True)
+
+    def clear(self) -> None:
+        self._undo.clear()
+        self._redo.clear()
+        self.nbytes = 0
+
+    def pop_undo(self) -> List[Splice] | None:
+        """Remove the newest undo entry and move it to the redo stack."""
+        if not self._undo:
+            return None
+        entry = self._undo.pop()
+        self._redo.append(entry)
+        return entry
+
+    def pop_redo(self) -> List[Splice] | None:
+        """Remove the newest redo entry and move it back to the undo stack."""
+        if not self._redo:
+            return None
+        entry = self._redo.pop()
+        self._undo.append(entry)
+        return entry
+
+    def _push_undo(self, entry: List[Splice], clear_redo: bool) -> None:
+        if clear_redo:
+            for old in self._redo:
+                self.nbytes -= _entry_bytes(old)
+            self._redo.clear()
+        self._undo.append(entry)
+        self.nbytes += _entry_bytes(entry)
+        while self.nbytes > self.max_bytes and (self._undo or self._redo):
+            old = self._undo.popleft() if self._undo else self._redo.pop(0)
+            self.nbytes -= _entry_bytes(old)
+
+
+def _entry_bytes(entry: List[Splice]) -> int:
+    return sum(splice.nbytes for splice in entry)
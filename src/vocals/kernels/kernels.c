@@ -0,0 +1,305 @@
+#include <Python.h>
+#include <math.h>
+#include <stdint.h>
+#include <string.h>
+
+/* Sample conversion and filter kernels. Every function reads from and writes
+ * into caller-provided buffers in a single pass, without temporaries, and
+ * releases the GIL while processing. Integer samples are little endian as in
+ * WAV files and scale to full range at +/-1.0. */
+
+static int width_for(int bits) {
+  if (bits == 16 || bits == 24 || bits == 32)
+    return bits / 8;
+  PyErr_SetString(PyExc_ValueError, "bits must be 16, 24 or 32");
+  return 0;
+}
+
+static double scale_for(int bits) { return (double)((1LL << (bits - 1)) - 1); }
+
+static uint32_t xorshift32(uint32_t *state) {
+  uint32_t x = *state;
+  x ^= x << 13;
+  x ^= x >> 17;
+  x ^= x << 5;
+  return *state = x;
+}
+
+/* uniform in [-0.5, 0.5); the sum of two gives triangular (TPDF) dither of
+ * +/-1 LSB */
+static double uniform(uint32_t *state) {
+  return xorshift32(state) / 4294967296.0 - 0.5;
+}
+
+static Py_ssize_t encode(const float *src, unsigned char *dst,
+                         Py_ssize_t count, int bits, int clip, int dither,
+                         uint32_t seed) {
+  const int width = bits / 8;
+  const double scale = scale_for(bits);
+  const double limit = 4611686018427387904.0; /* 2**62 */
+  uint32_t state = seed ? seed : 0x9E3779B9u;
+  Py_ssize_t clipped = 0;
+  for (Py_ssize_t i = 0; i < count; i++) {
+    double v = src[i];
+    if (v != v)
+      v = 0.0;
+    if (v > 1.0 || v < -1.0) {
+      clipped++;
+      if (clip)
+        v = v > 0 ? 1.0 : -1.0;
+    }
+    v *= scale;
+    if (dither)
+      v += uniform(&state) + uniform(&state);
+    v = nearbyint(v);
+    if (clip) {
+      if (v > scale)
+        v = scale;
+      else if (v < -scale - 1.0)
+        v = -scale - 1.0;
+    } else if (v > limit || v < -limit) {
+      v = v > 0 ? limit : -limit;
+    }
+    /* without clipping out of range values wrap like a C integer cast */
+    uint32_t u = (uint32_t)(int64_t)v;
+    unsigned char *out = dst + i * width;
+    for (int b = 0; b < width; b++)
+      out[b] = (unsigned char)(u >> (8 * b));
+  }
+  return clipped;
+}
+
+static void decode(const unsigned char *src, float *dst, Py_ssize_t count,
+                   int bits) {
+  const int width = bits / 8;
+  const double scale = scale_for(bits);
+  for (Py_ssize_t i = 0; i < count; i++) {
+    const unsigned char *in = src + i * width;
+    uint32_t u = 0;
+    for (int b = 0; b < width; b++)
+      u |= (uint32_t)in[b] << (8 * b);
+    int32_t s;
+    if (width == 2)
+      s = (int16_t)u;
+    else if (width == 3)
+      s = (int32_t)((u & 0x800000u) ? (u | 0xFF000000u) : u);
+    else
+      s = (int32_t)u;
+    dst[i] = (float)(s / scale);
+  }
+}
+
+// Python wrappers
+
+static PyObject *py_encode(PyObject *self, PyObject *args, PyObject *kwds) {
+  static char *kwlist[] = {"src", "dst", "bits", "clip", "dither", "seed",
+                           NULL};
+  Py_buffer src, dst;
+  int bits = 16, clip = 1, dither = 0;
+  unsigned int seed = 0;
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "y*w*|ippI", kwlist, &src, &dst,
+                                   &bits, &clip, &dither, &seed))
+    return NULL;
+  PyObject *result = NULL;
+  int width = width_for(bits);
+  Py_ssize_t count = src.len / (Py_ssize_t)sizeof(float);
+  if (!width) {
+    goto done;
+  }
+  if (dst.len < count * width) {
+    PyErr_SetString(PyExc_ValueError, "destination buffer too small");
+    goto done;
+  }
+  Py_ssize_t clipped;
+  Py_BEGIN_ALLOW_THREADS
+  clipped = encode((const float *)src.buf, (unsigned char *)dst.buf, count,
+                   bits, clip, dither, seed);
+  Py_END_ALLOW_THREADS
+  result = PyLong_FromSsize_t(clipped);
+done:
+  PyBuffer_Release(&src);
+  PyBuffer_Release(&dst);
+  return result;
+}
+
+static PyObject *py_decode(PyObject *self, PyObject *args, PyObject *kwds) {
+  static char *kwlist[] = {"src", "dst", "bits", NULL};
+  Py_buffer src, dst;
+  int bits = 16;
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "y*w*|i", kwlist, &src, &dst,
+                                   &bits))
+    return NULL;
+  PyObject *result = NULL;
+  int width = width_for(bits);
+  Py_ssize_t count = width ? src.len / width : 0;
+  if (!width) {
+    goto done;
+  }
+  if (dst.len < count * (Py_ssize_t)sizeof(float)) {
+    PyErr_SetString(PyExc_ValueError, "destination buffer too small");
+    goto done;
+  }
+  Py_BEGIN_ALLOW_THREADS
+  decode((const unsigned char *)src.buf, (float *)dst.buf, count, bits);
+  Py_END_ALLOW_THREADS
+  result = PyLong_FromSsize_t(count);
+done:
+  PyBuffer_Release(&src);
+  PyBuffer_Release(&dst);
+  return result;
+}
+
+/* Convert between interleaved (frame major) and planar (channel major)
+ * float32 layouts. */
+static PyObject *transpose(PyObject *args, int to_planar) {
+  Py_buffer src, dst;
+  int channels;
+  if (!PyArg_ParseTuple(args, "y*w*i", &src, &dst, &channels))
+    return NULL;
+  PyObject *result = NULL;
+  Py_ssize_t count = src.len / (Py_ssize_t)sizeof(float);
+  if (channels < 1 || count % channels) {
+    PyErr_SetString(PyExc_ValueError,
+                    "sample count must be a multiple of channels");
+    goto done;
+  }
+  if (dst.len < count * (Py_ssize_t)sizeof(float)) {
+    PyErr_SetString(PyExc_ValueError, "destination buffer too small");
+    goto done;
+  }
+  Py_ssize_t frames = count / channels;
+  const float *in = (const float *)src.buf;
+  float *out = (float *)dst.buf;
+  Py_BEGIN_ALLOW_THREADS
+  for (int c = 0; c < channels; c++) {
+    for (Py_ssize_t f = 0; f < frames; f++) {
+      if (to_planar)
+        out[c * frames + f] = in[f * channels + c];
+      else
+        out[f * channels + c] = in[c * frames + f];
+    }
+  }
+  Py_END_ALLOW_THREADS
+  result = PyLong_FromSsize_t(frames);
+done:
+  PyBuffer_Release(&src);
+  PyBuffer_Release(&dst);
+  return result;
+}
+
+static PyObject *py_interleave(PyObject *self, PyObject *args) {
+  return transpose(args, 0);
+}
+
+static PyObject *py_deinterleave(PyObject *self, PyObject *args) {
+  return transpose(args, 1);
+}
+
+/* Biquad filter in transposed direct form II, run in place over interleaved
+ * float32 frames. ``coeffs`` are b0, b1, b2, a1, a2 normalized by a0 and
+ * ``state`` holds the two float64 delay values of every channel. */
+static PyObject *py_biquad(PyObject *self, PyObject *args) {
+  Py_buffer samples, state;
+  int channels;
+  double b0, b1, b2, a1, a2;
+  if (!PyArg_ParseTuple(args, "w*w*i(ddddd)", &samples, &state, &channels, &b0,
+                        &b1, &b2, &a1, &a2))
+    return NULL;
+  PyObject *result = NULL;
+  Py_ssize_t count = samples.len / (Py_ssize_t)sizeof(float);
+  if (channels < 1 || count % channels) {
+    PyErr_SetString(PyExc_ValueError,
+                    "sample count must be a multiple of channels");
+    goto done;
+  }
+  if (state.len < 2 * channels * (Py_ssize_t)sizeof(double)) {
+    PyErr_SetString(PyExc_ValueError, "state buffer too small");
+    goto done;
+  }
+  Py_ssize_t frames = count / channels;
+  float *x = (float *)samples.buf;
+  double *z = (double *)state.buf;
+  Py_BEGIN_ALLOW_THREADS
+  for (int c = 0; c < channels; c++) {
+    double z1 = z[2 * c], z2 = z[2 * c + 1];
+    for (Py_ssize_t f = 0; f < frames; f++) {
+      double in = x[f * channels + c];
+      double out = b0 * in + z1;
+      z1 = b1 * in - a1 * out + z2;
+      z2 = b2 * in - a2 * out;
+      x[f * channels + c] = (float)out;
+    }
+    z[2 * c] = z1;
+    z[2 * c + 1] = z2;
+  }
+  Py_END_ALLOW_THREADS
+  result = PyLong_FromSsize_t(frames);
+done:
+  PyBuffer_Release(&samples);
+  PyBuffer_Release(&state);
+  return result;
+}
+
+/* One-pole envelope follower run in place over float32 levels, rising with
+ * the ``attack`` and falling with the ``release`` coefficient. ``state``
+ * holds the float64 envelope between calls. */
+static PyObject *py_follow(PyObject *self, PyObject *args) {
+  Py_buffer levels, state;
+  double attack, release;
+  if (!PyArg_ParseTuple(args, "w*w*dd", &levels, &state, &attack, &release))
+    return NULL;
+  PyObject *result = NULL;
+  if (state.len < (Py_ssize_t)sizeof(double)) {
+    PyErr_SetString(PyExc_ValueError, "state buffer too small");
+    goto done;
+  }
+  Py_ssize_t count = levels.len / (Py_ssize_t)sizeof(float);
+  float *x = (float *)levels.buf;
+  double *env = (double *)state.buf;
+  Py_BEGIN_ALLOW_THREADS
+  double e = *env;
+  for (Py_ssize_t i = 0; i < count; i++) {
+    double coeff = x[i] > e ? attack : release;
+    e = coeff * e + (1.0 - coeff) * x[i];
+    x[i] = (float)e;
+  }
+  *env = e;
+  Py_END_ALLOW_THREADS
+  result = PyLong_FromSsize_t(count);
+done:
+  PyBuffer_Release(&levels);
+  PyBuffer_Release(&state);
+  return result;
+}
+
+static PyMethodDef kernels_methods[] = {
+    {"encode", (PyCFunction)(void (*)(void))py_encode,
+     METH_VARARGS | METH_KEYWORDS,
+     "encode(src, dst, bits=16, clip=True, dither=False, seed=0)\n"
+     "Convert float32 samples to little endian integers, returning the number "
+     "of samples outside [-1, 1]"},
+    {"decode", (PyCFunction)(void (*)(void))py_decode,
+     METH_VARARGS | METH_KEYWORDS,
+     "decode(src, dst, bits=16)\n"
+     "Convert little endian integer samples to float32"},
+    {"interleave", py_interleave, METH_VARARGS,
+     "interleave(src, dst, channels)\nConvert planar to interleaved float32"},
+    {"deinterleave", py_deinterleave, METH_VARARGS,
+     "deinterleave(src, dst, channels)\nConvert interleaved to planar float32"},
+    {"biquad", py_biquad, METH_VARARGS,
+     "biquad(samples, state, channels, coeffs)\n"
+     "Filter interleaved float32 frames in place"},
+    {"follow", py_follow, METH_VARARGS,
+     "follow(levels, state, attack, release)\n"
+     "Replace float32 levels in place by their smoothed envelope"},
+    {NULL, NULL, 0, NULL}};
+
+static PyModuleDef kernelsmodule = {
+    PyModuleDef_HEAD_INIT,
+    .m_name = "kernels",
+    .m_doc = "Sample conversion and filter kernels",
+    .m_size = -1,
+    .m_methods = kernels_methods,
+};
+
+PyMODINIT_FUNC PyInit_kernels(void) { return PyModule_Create(&kernelsmodule); }
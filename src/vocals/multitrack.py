@@ -1,31 +1,209 @@
+import asyncio
+import threading
 import time
-from typing import List
+from collections import deque
+from typing import Iterable, List, Sequence
 
 import numpy as np
 
-from . import utils
+from . import aio, harmony, pcm, utils, vocoder
+from .backend import Transfer, default_backend
+from .effects import EffectChain
+from .features import FeatureIndex
+from .history import EditHistory, Splice
+from .stats import Stats, timed
+from .takes import TakeStore
 
-try:
-    import sounddevice as sd
-except Exception as e:  # pragma: no cover - dependency missing in tests
-    sd = None
+# ``sounddevice``, loaded by ``_sounddevice`` on the first audio I/O because
+# importing it initializes PortAudio
+sd = None
+
+
+def _sounddevice():
+    global sd
+    if sd is None:
+        sd = default_backend()
+    return sd
+
+
+def _silence(frames: int, shape: tuple) -> np.ndarray:
+    """Return ``frames`` of silence as a zero-stride view owning no memory."""
+    zero = np.zeros((1,) + shape, dtype=np.float32)
+    return np.broadcast_to(zero, (frames,) + shape)
+
+
+def _sparse(data: np.ndarray) -> np.ndarray:
+    """Return ``data``, or a zero-stride view of it when it is all zeros."""
+    if data.size and not data.any():
+        return _silence(len(data), data.shape[1:])
+    return data
 
 
 class MultiTrackRecorder:
-    """Simple multi track recorder supporting seek and punch-in recording."""
+    """Simple multi track recorder supporting seek and punch-in recording.
 
-    def __init__(self, num_tracks: int = 2, samplerate: int = 44100, channels: int = 1):
+    Tracks are contiguous ``(frames, channels)`` float32 arrays. A track has
+    either ``channels`` channels or a single one, such as a mono file imported
+    into a stereo session, which is upmixed by broadcasting when mixed.
+    """
+
+    def __init__(
+        self,
+        num_tracks: int = 2,
+        samplerate: int = 44100,
+        channels: int = 1,
+        history_bytes: int = 64 * 1024 * 1024,
+        take_budget: int = 256 * 1024 * 1024,
+        backend=None,
+        sparse_silence: bool = False,
+    ):
         self.samplerate = samplerate
+        # object implementing the ``vocals.backend.AudioBackend`` API; the
+        # ``sounddevice`` module is used when this is ``None``
+        self.backend = backend
         self.channels = channels
         self.tracks: List[np.ndarray] = [
-            np.zeros(0, dtype=np.float32) for _ in range(num_tracks)
+            np.zeros((0, channels), dtype=np.float32) for _ in range(num_tracks)
         ]
+        # balance of each track from -1 (left) to 1 (right)
+        self.pans: List[float] = [0.0] * num_tracks
+        # effect chain of each track, applied when mixing and monitoring
+        self.effects: List[EffectChain | None] = [None] * num_tracks
+        # frozen tracks mix from a cached render of their chain, kept as the
+        # (source track, rendered) pair until the track changes
+        self.frozen: List[bool] = [False] * num_tracks
+        self._renders: List[tuple[np.ndarray, np.ndarray] | None] = [None] * num_tracks
         self.selected_track = 0
         self.position = 0  # current play/record position in samples
         self.selection: tuple[int, int, int] | None = None
-        self.clipboard: np.ndarray = np.zeros(0, dtype=np.float32)
-        # map (track_index, start, end) -> List[np.ndarray]
-        self.take_library: dict[tuple[int, int, int], List[np.ndarray]] = {}
+        self.clipboard: np.ndarray = np.zeros((0, channels), dtype=np.float32)
+        # takes per (track_index, start, end), spilled to disk over budget
+        self.take_library = TakeStore(
+            memory_budget=take_budget, index=FeatureIndex(samplerate)
+        )
+        # one journal of changed (track_index, start, end) ranges per consumer
+        # such as autosave; track changes and journal appends happen under
+        # ``lock`` so consumers can drain and snapshot consistently
+        self.journals: List[deque[tuple[int, int, int]]] = []
+        self.lock = threading.RLock()
+        self.history = EditHistory(max_bytes=history_bytes)
+        # keep spans of digital silence out of the undo history and autosave
+        # segments instead of storing their zeros
+        self.sparse_silence = sparse_silence
+        # set to a ``vocals.stats.Stats`` to collect callback, mixing,
+        # analysis and file write timings
+        self.stats: Stats | None = None
+        # samples lost per input channel by the last ``record_multi``
+        self.input_overflows: List[int] = []
+        # round-trip delay in frames from playback to input, measured by
+        # ``calibrate_latency``; takes recorded against playback are shifted
+        # back by it
+        self.latency = 0
+
+    def _audio(self):
+        """Return the audio backend, raising if none is available."""
+        audio = self.backend if self.backend is not None else _sounddevice()
+        if audio is None:
+            raise RuntimeError("sounddevice is not available")
+        return audio
+
+    def _beep(self, frequency: float) -> None:
+        if self.backend is None:
+            utils.beep(frequency, samplerate=self.samplerate)
+        else:
+            utils.beep(frequency, samplerate=self.samplerate, backend=self.backend)
+
+    def _countdown(self, countdown: int) -> None:
+        for i in range(countdown, 0, -1):
+            print(i)
+            self._beep(880 if (countdown - i) % 2 == 0 else 660)
+            if self.backend is None:
+                time.sleep(1)
+            else:
+                self.backend.sleep(1000)
+
+    async def _abeep(self, frequency: float) -> None:
+        await utils.abeep(frequency, samplerate=self.samplerate, backend=self.backend)
+
+    async def _acountdown(self, countdown: int) -> None:
+        for i in range(countdown, 0, -1):
+            print(i)
+            await self._abeep(880 if (countdown - i) % 2 == 0 else 660)
+            await asyncio.sleep(1)
+
+    def set_pan(self, track_index: int, pan: float) -> None:
+        """Set the balance of ``track_index`` from -1 (left) to 1 (right)."""
+        if not 0 <= track_index < len(self.tracks):
+            raise ValueError("invalid track index")
+        if not -1 <= pan <= 1:
+            raise ValueError("pan must be between -1 and 1")
+        self.pans[track_index] = pan
+
+    def set_effects(self, track_index: int, chain: EffectChain | None) -> None:
+        """Set the effect chain of ``track_index``, or remove it with ``None``."""
+        if not 0 <= track_index < len(self.tracks):
+            raise ValueError("invalid track index")
+        self.effects[track_index] = chain
+        self._renders[track_index] = None
+
+    def freeze_track(self, track_index: int) -> None:
+        """Render the effects of ``track_index`` once and mix from the result.
+
+        The render is redone the next time the track is mixed after it was
+        edited, so heavy chains only cost time when their input changes.
+        """
+        if not 0 <= track_index < len(self.tracks):
+            raise ValueError("invalid track index")
+        self.frozen[track_index] = True
+        self._rendered(track_index, 0, 0)
+
+    def unfreeze_track(self, track_index: int) -> None:
+        """Process ``track_index`` live again and drop its cached render."""
+        if not 0 <= track_index < len(self.tracks):
+            raise ValueError("invalid track index")
+        self.frozen[track_index] = False
+        self._renders[track_index] = None
+
+    def _rendered(self, track_index: int, start: int, end: int) -> np.ndarray:
+        """Return samples ``start:end`` of ``track_index`` after its effects."""
+        track = self.tracks[track_index]
+        chain = self.effects[track_index]
+        if chain is None:
+            return track[start:end]
+        if not self.frozen[track_index]:
+            return chain.render(track[start:end])
+        cached = self._renders[track_index]
+        if cached is None or cached[0] is not track:
+            with timed(self.stats, "freeze"):
+                cached = (track, chain.render(track))
+            self._renders[track_index] = cached
+        return cached[1][start:end]
+
+    def _gains(self, track_index: int) -> np.ndarray:
+        """Return the ``(channels,)`` gains applied when mixing a track.
+
+        Multiplying a ``(frames, 1)`` or ``(frames, channels)`` track by them
+        both pans and upmixes it. Panning attenuates the opposite side of a
+        stereo mix and has no effect on other channel counts.
+        """
+        gains = np.ones(self.channels, dtype=np.float32)
+        pan = self.pans[track_index]
+        if self.channels == 2 and pan:
+            gains[:] = (min(1.0, 1.0 - pan), min(1.0, 1.0 + pan))
+        return gains
+
+    def _conform(self, data: np.ndarray, track_index: int) -> np.ndarray:
+        """Return ``data`` with the channel count of ``track_index``."""
+        if data.ndim == 1:
+            data = data[:, None]
+        channels = self.tracks[track_index].shape[1]
+        if data.shape[1] == channels:
+            return data
+        if data.shape[1] == 1:
+            return np.repeat(data, channels, axis=1)
+        if channels == 1:
+            return data.mean(axis=1, keepdims=True, dtype=np.float32)
+        raise ValueError("channel count mismatch")
 
     def select_track(self, index: int) -> None:
         """Select track index for recording and playback."""
@@ -41,11 +219,108 @@ class MultiTrackRecorder:
         self.position = int(seconds * self.samplerate)
         self._ensure_length(self.selected_track, self.position)
 
-    def _ensure_length(self, track_index: int, length: int) -> None:
-        track = self.tracks[track_index]
-        if len(track) < length:
-            pad = np.zeros(length - len(track), dtype=np.float32)
-            self.tracks[track_index] = np.concatenate([track, pad])
+    def _ensure_length(
+        self, track_index: int, length: int, undoable: bool = False
+    ) -> None:
+        """Pad ``track_index`` with silence up to ``length`` samples.
+
+        Padding done by edits is ``undoable`` and recorded in the history;
+        padding from seeking or selecting is not.
+        """
+        with self.lock:
+            track = self.tracks[track_index]
+            if len(track) < length and undoable:
+                pad = _silence(length - len(track), track.shape[1:])
+                self._splice(track_index, len(track), len(track), pad)
+            elif len(track) < length:
+                shape = (length - len(track),) + track.shape[1:]
+                pad = np.zeros(shape, dtype=np.float32)
+                self.tracks[track_index] = np.concatenate([track, pad])
+                self._mark_dirty(track_index, len(track), length)
+
+    def _mark_dirty(self, track_index: int, start: int, end: int) -> None:
+        """Record that samples ``start:end`` of ``track_index`` changed."""
+        self._renders[track_index] = None
+        for journal in self.journals:
+            journal.append((track_index, start, end))
+
+    def _splice(
+        self,
+        track_index: int,
+        start: int,
+        end: int,
+        data: np.ndarray,
+        conform: bool = True,
+    ) -> np.ndarray:
+        """Replace samples ``start:end`` of ``track_index`` with ``data``.
+
+        The edit is recorded in the undo history and the change journal. The
+        replaced samples are returned. ``data`` is up- or downmixed to the
+        channel count of the track unless ``conform`` is false, which is only
+        allowed when replacing the whole track.
+        """
+        if conform:
+            data = self._conform(data, track_index)
+        if data.base is not None and data.base.nbytes >= 2 * data.nbytes:
+            # don't let the history keep a much larger buffer alive, such as
+            # all inputs of a recording, when only a view of it is inserted
+            if data.strides and data.strides[0] != 0:
+                data = data.copy()
+        removed = self._apply_splice(track_index, start, end, data)
+        if self.sparse_silence:
+            splice = Splice(track_index, start, _sparse(removed), _sparse(data))
+        else:
+            splice = Splice(track_index, start, removed, data)
+        self.history.record(splice)
+        return removed
+
+    def _apply_splice(
+        self, t: int, start: int, end: int, data: np.ndarray
+    ) -> np.ndarray:
+        with self.lock:
+            track = self.tracks[t]
+            same_layout = data.shape[1:] == track.shape[1:]
+            if len(data) == end - start and same_layout:
+                removed = track[start:end].copy()
+                track[start:end] = data
+                self._mark_dirty(t, start, end)
+            elif start == 0 and end >= len(track):
+                # the whole track is replaced, possibly changing its channels
+                removed = track
+                self.tracks[t] = np.array(data, dtype=np.float32, order="C")
+                self._mark_dirty(t, 0, len(data))
+            else:
+                removed = track[start:end].copy()
+                self.tracks[t] = np.concatenate([track[:start], data, track[end:]])
+                self._mark_dirty(t, start, len(self.tracks[t]))
+            return removed
+
+    # Undo/redo ---------------------------------------------------------------
+
+    def _replay(self, splice: Splice) -> None:
+        end = splice.start + len(splice.removed)
+        self._apply_splice(splice.track, splice.start, end, splice.inserted)
+
+    def undo(self) -> bool:
+        """Revert the most recent edit. Return ``False`` if there is none."""
+        entry = self.history.pop_undo()
+        if entry is None:
+            return False
+        for splice in reversed(entry):
+            self._replay(splice.inverse())
+        self.position = entry[0].start
+        return True
+
+    def redo(self) -> bool:
+        """Reapply the most recently undone edit."""
+        entry = self.history.pop_redo()
+        if entry is None:
+            return False
+        for splice in entry:
+            self._replay(splice)
+        last = entry[-1]
+        self.position = last.start + len(last.inserted)
+        return True
 
     def record(
         self,
@@ -67,92 +342,350 @@ class MultiTrackRecorder:
         ``reference_freq`` is given a short beep at that frequency is played
         before recording starts so singers can match pitch.
         """
-        if sd is None:
-            raise RuntimeError("sounddevice is not available")
+        audio = self._audio()
+        self._countdown(countdown)
 
-        if countdown > 0:
-            for i in range(countdown, 0, -1):
-                print(i)
-                freq = 880 if (countdown - i) % 2 == 0 else 660
-                utils.beep(freq, samplerate=self.samplerate)
-                time.sleep(1)
+        if reference_freq is not None:
+            self._beep(reference_freq)
+
+        start, end, lag, playback = self._prepare_record(
+            duration, punch_in, play_tracks, metronome_bpm
+        )
+        if self.stats is not None:
+            recorded = self._transfer(end - start + lag, self.channels, playback)
+        elif playback is not None:
+            recorded = audio.playrec(
+                playback,
+                samplerate=self.samplerate,
+                channels=self.channels,
+                dtype="float32",
+            )
+        else:
+            recorded = audio.rec(
+                end - start,
+                samplerate=self.samplerate,
+                channels=self.channels,
+                dtype="float32",
+            )
+
+        audio.wait()
+        self._commit_record(start, end, recorded[lag:])
+
+    async def arecord(
+        self,
+        duration: float,
+        countdown: int = 0,
+        punch_in: bool = False,
+        play_tracks: List[int] | None = None,
+        metronome_bpm: int | None = None,
+        reference_freq: float | None = None,
+    ) -> None:
+        """Awaitable :meth:`record` for use from asyncio code.
+
+        Audio runs in stream callbacks and the event loop stays free while
+        recording. Cancelling the task stops the stream and leaves the tracks
+        unchanged.
+        """
+        audio = self._audio()
+        await self._acountdown(countdown)
 
         if reference_freq is not None:
-            utils.beep(reference_freq, samplerate=self.samplerate)
+            await self._abeep(reference_freq)
+
+        start, end, lag, playback = self._prepare_record(
+            duration, punch_in, play_tracks, metronome_bpm
+        )
+        recorded = await aio.playrec(
+            audio,
+            end - start + lag,
+            self.samplerate,
+            self.channels,
+            playback,
+            stats=self.stats,
+        )
+        self._commit_record(start, end, recorded[lag:])
 
+    def _prepare_record(
+        self,
+        duration: float,
+        punch_in: bool,
+        play_tracks: List[int] | None,
+        metronome_bpm: int | None,
+    ) -> tuple[int, int, int, np.ndarray | None]:
+        """Return the ``(start, end, lag, playback)`` of a new recording."""
         frames = int(duration * self.samplerate)
         start = self.position
         end = start + frames
-        self._ensure_length(self.selected_track, end)
+        # input heard against playback arrives ``latency`` frames late, so
+        # record that much longer and drop the head instead of shifting
+        lag = self.latency if play_tracks is not None or metronome_bpm else 0
 
         playback = None
         if play_tracks is not None:
-            playback = np.zeros((frames, self.channels), dtype=np.float32)
-            for t in play_tracks:
-                if not 0 <= t < len(self.tracks):
-                    raise ValueError("invalid track index")
-                track = self.tracks[t]
-                if start < len(track):
-                    seg = track[start:end]
-                    if t == self.selected_track and punch_in:
-                        seg = np.zeros_like(seg)
-                    playback[: len(seg), 0] += seg
+            muted = self.selected_track if punch_in else None
+            playback = self._playback_mix(start, end + lag, play_tracks, muted)
 
         if metronome_bpm is not None:
             if playback is None:
-                playback = np.zeros((frames, self.channels), dtype=np.float32)
+                playback = np.zeros((frames + lag, self.channels), dtype=np.float32)
             interval = int(self.samplerate * 60 / metronome_bpm)
             click = utils.beep_sound(880, samplerate=self.samplerate, duration=0.05)
             for i in range(0, frames, interval):
                 end_idx = min(i + len(click), frames)
-                playback[i:end_idx, 0] += click[: end_idx - i]
+                playback[i:end_idx] += click[: end_idx - i, None]
+        return start, end, lag, playback
 
-        if playback is not None:
-            recorded = sd.playrec(
-                playback,
-                samplerate=self.samplerate,
-                channels=self.channels,
-                dtype="float32",
+    def _commit_record(self, start: int, end: int, recorded: np.ndarray) -> None:
+        """Write a finished recording to the selected track."""
+        with self.history.group():
+            # only a gap before the recording needs padding; the take itself
+            # replaces whatever part of the track it overlaps
+            t = self.selected_track
+            self._ensure_length(t, start, undoable=True)
+            self._splice(t, start, min(end, len(self.tracks[t])), recorded)
+        self.position = end
+
+    def calibrate_latency(self, duration: float = 1.0, max_latency: float = 0.5) -> int:
+        """Measure the round-trip latency of the audio interface.
+
+        ``duration`` seconds of noise are played and recorded back, through a
+        loopback cable or a microphone near the speakers, and their delay of
+        up to ``max_latency`` seconds is found by cross-correlation. The
+        result in frames is stored in :attr:`latency` and returned. Raise
+        ``RuntimeError`` when the test signal is not recorded.
+        """
+        audio = self._audio()
+        frames = int(duration * self.samplerate)
+        max_lag = int(max_latency * self.samplerate)
+        rng = np.random.default_rng(0)
+        noise = (0.25 * rng.standard_normal(frames)).astype(np.float32)
+        # a silent tail lets the delayed signal arrive in full
+        signal = np.zeros((frames + max_lag, self.channels), dtype=np.float32)
+        signal[:frames] = noise[:, None]
+        recorded = audio.playrec(
+            signal,
+            samplerate=self.samplerate,
+            channels=self.channels,
+            dtype="float32",
+        )
+        audio.wait()
+        lag = utils.estimate_latency(noise, recorded, max_lag)
+        if lag is None:
+            raise RuntimeError("no test signal recorded")
+        self.latency = lag
+        return lag
+
+    def record_multi(
+        self,
+        routing: Iterable[int | None],
+        duration: float,
+        play_tracks: List[int] | None = None,
+        blocksize: int = 0,
+        buffer_seconds: float = 2.0,
+        monitor: bool = False,
+    ) -> List[int]:
+        """Record several inputs at once, each into its own track.
+
+        Input channel ``i`` of a single input stream is recorded into track
+        ``routing[i]``, or dropped when that is ``None``, so all tracks share
+        one sample clock. ``play_tracks`` are mixed and played through a
+        duplex stream meanwhile. With ``monitor`` the routed inputs are also
+        played back, through the effect chain and pan of their track, while
+        the dry signal is recorded. The audio callback only splits each block
+        into per-channel ring buffers of ``buffer_seconds``; this thread
+        drains them into the tracks. Recording starts at the current
+        position and is a single undoable edit. Return the number of samples
+        each input channel lost because its ring buffer was full; the counts
+        are also kept in :attr:`input_overflows`.
+        """
+        from . import ringbuffer
+
+        audio = self._audio()
+        targets = list(routing)
+        inputs = len(targets)
+        if inputs == 0:
+            raise ValueError("no inputs routed")
+        for t in targets:
+            if t is not None and not 0 <= t < len(self.tracks):
+                raise ValueError("invalid track index")
+        used = [t for t in targets if t is not None]
+        if len(set(used)) != len(used):
+            raise ValueError("each track can record only one input")
+
+        frames = int(duration * self.samplerate)
+        start = self.position
+        end = start + frames
+        lag = 0
+        playback = None
+        if play_tracks is not None:
+            for t in play_tracks:
+                if not 0 <= t < len(self.tracks):
+                    raise ValueError("invalid track index")
+            # the inputs lag the playback by the calibrated latency
+            lag = self.latency
+            # tracks being recorded don't play back their old audio
+            backing = [t for t in play_tracks if t not in used]
+            playback = self._mix(backing, start, end + lag)
+        total = frames + lag
+        monitored = []
+        if monitor:
+            for c, t in enumerate(targets):
+                if t is not None:
+                    chain = self.effects[t]
+                    if chain is not None:
+                        chain.reset()
+                    monitored.append((c, chain, self._gains(t)))
+
+        capacity = max(int(buffer_seconds * self.samplerate), 1)
+        rings = [ringbuffer.RingBuffer(capacity) for _ in range(inputs)]
+        recorded = np.zeros((inputs, total), dtype=np.float32)
+        overflows = [0] * inputs
+        scratch = np.empty(inputs * max(blocksize, 1024), dtype=np.float32)
+        done = threading.Event()
+        stats = self.stats
+        captured = 0
+
+        def callback(*args):
+            nonlocal captured, scratch
+            if stats is not None:
+                began = time.perf_counter()
+            *buffers, nframes, time_info, status = args
+            indata = buffers[0]
+            n = min(nframes, total - captured)
+            if len(buffers) > 1:
+                outdata = buffers[1]
+                if playback is not None:
+                    outdata[:n] = playback[captured : captured + n]
+                else:
+                    outdata[:n] = 0
+                outdata[n:] = 0
+            if len(scratch) < inputs * n:
+                scratch = np.empty(inputs * n, dtype=np.float32)
+            planar = pcm.deinterleave(
+                indata[:n], scratch[: inputs * n].reshape(inputs, n)
             )
-        else:
-            recorded = sd.rec(
-                frames,
+            for c, chain, gains in monitored:
+                block = planar[c, :, None].copy()
+                if chain is not None:
+                    block = chain.process(block)
+                outdata[:n] += block * gains
+            for c, ring in enumerate(rings):
+                written = ring.write(planar[c])
+                if written < n:
+                    overflows[c] += n - written
+                    if stats is not None:
+                        stats.overflow()
+            captured += n
+            if stats is not None:
+                stats.ring(max(ring.size() for ring in rings), capacity)
+                stats.callback(time.perf_counter() - began, nframes, status)
+            if captured >= total:
+                raise audio.CallbackStop
+
+        read = [0] * inputs
+
+        def drain():
+            for c, ring in enumerate(rings):
+                data = ring.read(total - read[c])
+                count = len(data) // 4
+                recorded[c, read[c] : read[c] + count] = np.frombuffer(data, np.float32)
+                read[c] += count
+
+        if total:
+            if playback is None and not monitored:
+                stream, channels = audio.InputStream, inputs
+            else:
+                stream, channels = audio.Stream, (inputs, self.channels)
+            with stream(
                 samplerate=self.samplerate,
-                channels=self.channels,
+                blocksize=blocksize,
+                channels=channels,
                 dtype="float32",
-            )
-
-        sd.wait()
+                callback=callback,
+                finished_callback=done.set,
+            ):
+                while not done.is_set():
+                    audio.sleep(20)
+                    drain()
+            drain()
 
-        track = self.tracks[self.selected_track]
-        track[start:end] = recorded[:, 0]
+        with self.history.group():
+            for c, t in enumerate(targets):
+                if t is None:
+                    continue
+                self._ensure_length(t, start, undoable=True)
+                self._splice(t, start, min(end, len(self.tracks[t])), recorded[c, lag:])
         self.position = end
+        self.input_overflows = overflows
+        return overflows
+
+    def _transfer(
+        self, frames: int, channels: int, playback: np.ndarray | None = None
+    ) -> np.ndarray:
+        """Record and play through a callback stream reporting to ``stats``.
+
+        The blocking ``rec``, ``playrec`` and ``play`` calls hide the blocks
+        and xruns of the stream, so they are only used without ``stats``.
+        """
+        transfer = Transfer(self._audio(), frames, channels, playback, self.stats)
+        return transfer.run(samplerate=self.samplerate)
+
+    def _playback_mix(
+        self, start: int, end: int, play_tracks: List[int], muted: int | None
+    ) -> np.ndarray:
+        """Return a ``(frames, channels)`` mix of ``play_tracks`` for playback."""
+        for t in play_tracks:
+            if not 0 <= t < len(self.tracks):
+                raise ValueError("invalid track index")
+        tracks = [t for t in play_tracks if t != muted]
+        return self._mix(tracks, start, end)
+
+    def _mix(self, track_indices: List[int], start: int, end: int) -> np.ndarray:
+        """Return the panned ``(end - start, channels)`` mix of the tracks."""
+        mix = np.zeros((end - start, self.channels), dtype=np.float32)
+        with timed(self.stats, "mix"):
+            for t in track_indices:
+                seg = self._rendered(t, start, end)
+                if len(seg):
+                    # broadcasting applies the pan and upmixes mono tracks
+                    mix[: len(seg)] += seg * self._gains(t)
+        return mix
 
     def play(self, duration: float | None = None) -> None:
         """Play from current position for ``duration`` seconds if given."""
-        if sd is None:
-            raise RuntimeError("sounddevice is not available")
-        max_len = max(len(t) for t in self.tracks)
-        if duration is None:
-            end = max_len
+        audio = self._audio()
+        end = self._play_end(duration)
+        if end <= self.position:
+            return
+        mix = self._mix(range(len(self.tracks)), self.position, end)
+        if self.stats is not None:
+            self._transfer(len(mix), 0, mix)
         else:
-            end = min(self.position + int(duration * self.samplerate), max_len)
+            audio.play(mix, samplerate=self.samplerate)
+            audio.wait()
+        self.position = end
+
+    async def aplay(self, duration: float | None = None) -> None:
+        """Awaitable :meth:`play`; cancelling it stops playback."""
+        audio = self._audio()
+        end = self._play_end(duration)
         if end <= self.position:
             return
-        length = end - self.position
-        mix = np.zeros(length, dtype=np.float32)
-        for track in self.tracks:
-            if self.position < len(track):
-                segment = track[self.position : end]
-                mix[: len(segment)] += segment
-        sd.play(mix, samplerate=self.samplerate)
-        sd.wait()
+        mix = self._mix(range(len(self.tracks)), self.position, end)
+        await aio.play(audio, mix, self.samplerate, self.stats)
         self.position = end
 
+    def _play_end(self, duration: float | None) -> int:
+        max_len = max(len(t) for t in self.tracks)
+        if duration is None:
+            return max_len
+        return min(self.position + int(duration * self.samplerate), max_len)
+
     def pause(self) -> None:
         """Stop playback or recording."""
-        if sd is not None:
-            sd.stop()
+        audio = self.backend if self.backend is not None else sd
+        if audio is not None:
+            audio.stop()
 
     # Editing functionality -------------------------------------------------
 
@@ -187,9 +720,8 @@ class MultiTrackRecorder:
         if self.selection is None:
             raise RuntimeError("nothing selected")
         t, start, end = self.selection
-        self.clipboard = self.tracks[t][start:end].copy()
-        track = self.tracks[t]
-        self.tracks[t] = np.concatenate([track[:start], track[end:]])
+        empty = np.zeros((0,) + self.tracks[t].shape[1:], dtype=np.float32)
+        self.clipboard = self._splice(t, start, end, empty)
         self.position = start
         self.selection = None
 
@@ -201,20 +733,45 @@ class MultiTrackRecorder:
             track_index = self.selected_track
         if not 0 <= track_index < len(self.tracks):
             raise ValueError("invalid track index")
-        track = self.tracks[track_index]
-        self._ensure_length(track_index, self.position)
-        self.tracks[track_index] = np.concatenate(
-            [track[: self.position], self.clipboard, track[self.position :]]
-        )
+        with self.history.group():
+            self._ensure_length(track_index, self.position, undoable=True)
+            self._splice(track_index, self.position, self.position, self.clipboard)
         self.position += len(self.clipboard)
 
     def move(self, to_track_index: int, position_seconds: float | None = None) -> None:
         """Move selected audio to ``to_track_index`` at ``position_seconds``."""
-        self.cut()
-        if position_seconds is not None:
-            self.position = int(position_seconds * self.samplerate)
-        self.selected_track = to_track_index
-        self.paste()
+        with self.history.group():
+            self.cut()
+            if position_seconds is not None:
+                self.position = int(position_seconds * self.samplerate)
+            self.selected_track = to_track_index
+            self.paste()
+
+    def time_stretch(self, rate: float) -> None:
+        """Play the selection ``rate`` times faster without changing its pitch.
+
+        The selected audio is replaced by the stretched result, moving what
+        follows on the track, and the selection is resized to cover it. The
+        edit is undoable.
+        """
+        if self.selection is None:
+            raise RuntimeError("nothing selected")
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        t, start, end = self.selection
+        with timed(self.stats, "vocoder"):
+            stretched = vocoder.time_stretch(self.tracks[t][start:end], rate)
+        self._splice(t, start, end, stretched)
+        self.selection = (t, start, start + len(stretched))
+
+    def pitch_shift(self, semitones: float) -> None:
+        """Shift the selection by ``semitones`` without changing its length."""
+        if self.selection is None:
+            raise RuntimeError("nothing selected")
+        t, start, end = self.selection
+        with timed(self.stats, "vocoder"):
+            shifted = vocoder.pitch_shift(self.tracks[t][start:end], semitones)
+        self._splice(t, start, end, shifted)
 
     # Import/Export ---------------------------------------------------------
 
@@ -231,15 +788,13 @@ class MultiTrackRecorder:
         ext = os.path.splitext(filename)[1].lower()
         if ext == ".wav":
             with wave.open(filename, "rb") as wf:
-                if wf.getnchannels() != self.channels:
+                channels = wf.getnchannels()
+                if channels not in (1, self.channels):
                     raise ValueError("channel count mismatch")
                 if wf.getframerate() != self.samplerate:
                     raise ValueError("samplerate mismatch")
                 frames = wf.getnframes()
-                data = (
-                    np.frombuffer(wf.readframes(frames), dtype="<i2").astype(np.float32)
-                    / 32767.0
-                )
+                data = pcm.decode(wf.readframes(frames), bits=8 * wf.getsampwidth())
         else:
             try:
                 from pydub import AudioSegment
@@ -249,29 +804,44 @@ class MultiTrackRecorder:
             audio = AudioSegment.from_file(filename)
             if audio.frame_rate != self.samplerate:
                 audio = audio.set_frame_rate(self.samplerate)
-            if audio.channels != self.channels:
+            if audio.channels not in (1, self.channels):
                 audio = audio.set_channels(self.channels)
-            samples = audio.get_array_of_samples()
-            data = np.array(samples, dtype=np.float32) / 32767.0
+            channels = audio.channels
+            if audio.sample_width == 1:
+                audio = audio.set_sample_width(2)
+            data = pcm.decode(audio.raw_data, bits=8 * audio.sample_width)
 
-        self.tracks[track_index] = data
+        # interleaved frames reshape without copying; the track takes the
+        # file's channel layout, so mono files stay mono
+        data = data.reshape(-1, channels)
+        end = len(self.tracks[track_index])
+        self._splice(track_index, 0, end, data, conform=False)
         self.position = 0
 
     def export_audio(
-        self, filename: str, track_indices: List[int] | None = None
+        self,
+        filename: str,
+        track_indices: List[int] | None = None,
+        bits: int = 16,
+        dither: bool = False,
     ) -> None:
-        """Mix ``track_indices`` and export to a WAV or MP3 file."""
+        """Mix ``track_indices`` and export to a WAV or MP3 file.
+
+        WAV files are written with ``bits`` per sample, MP3 files are encoded
+        from 16 bit samples. Samples beyond full scale are clipped and
+        ``dither`` adds triangular dither before quantizing.
+        """
         import os
         import wave
 
         mix = self.mix_tracks(track_indices)
         ext = os.path.splitext(filename)[1].lower()
         if ext == ".wav":
-            with wave.open(filename, "wb") as wf:
+            with timed(self.stats, "write"), wave.open(filename, "wb") as wf:
                 wf.setnchannels(self.channels)
-                wf.setsampwidth(2)
+                wf.setsampwidth(bits // 8)
                 wf.setframerate(self.samplerate)
-                wf.writeframes((mix * 32767).astype("<i2").tobytes())
+                wf.writeframes(pcm.encode(mix, bits=bits, dither=dither))
         else:
             try:
                 from pydub import AudioSegment
@@ -279,7 +849,7 @@ class MultiTrackRecorder:
                 raise RuntimeError("pydub required for mp3 export") from e
 
             segment = AudioSegment(
-                (mix * 32767).astype("<i2").tobytes(),
+                pcm.encode(mix, dither=dither).tobytes(),
                 frame_rate=self.samplerate,
                 sample_width=2,
                 channels=self.channels,
@@ -293,11 +863,7 @@ class MultiTrackRecorder:
         max_len = (
             max(len(self.tracks[i]) for i in track_indices) if track_indices else 0
         )
-        mix = np.zeros(max_len, dtype=np.float32)
-        for i in track_indices:
-            track = self.tracks[i]
-            mix[: len(track)] += track
-        return mix
+        return self._mix(track_indices, 0, max_len)
 
     # Take library -----------------------------------------------------------
 
@@ -306,27 +872,41 @@ class MultiTrackRecorder:
         if self.selection is None:
             raise RuntimeError("nothing selected")
         t, start, end = self.selection
-        take = self.tracks[t][start:end].copy()
-        key = (t, start, end)
-        self.take_library.setdefault(key, []).append(take)
+        self.take_library.add((t, start, end), self.tracks[t][start:end])
 
-    def list_takes(self) -> List[np.ndarray]:
-        """Return all takes for the currently selected region."""
+    def list_takes(self) -> Sequence[np.ndarray]:
+        """Return all takes for the currently selected region.
+
+        The takes are loaded from the library as they are accessed.
+        """
         if self.selection is None:
             raise RuntimeError("nothing selected")
-        key = self.selection
-        return self.take_library.get(key, [])
+        return self.take_library.takes(self.selection)
 
     def apply_take(self, index: int) -> None:
         """Replace the selected region with the take at ``index``."""
         if self.selection is None:
             raise RuntimeError("nothing selected")
-        key = self.selection
-        takes = self.take_library.get(key)
-        if not takes or not 0 <= index < len(takes):
-            raise ValueError("invalid take index")
-        t, start, end = key
-        self.tracks[t][start:end] = takes[index]
+        take = self.take_library.take(self.selection, index)
+        t, start, end = self.selection
+        self._splice(t, start, end, take)
+
+    def rank_takes(self, by: str = "tuning") -> List[int]:
+        """Return take indices for the selected region ordered best first.
+
+        See :meth:`vocals.features.FeatureIndex.rank` for the criteria.
+        """
+        if self.selection is None:
+            raise RuntimeError("nothing selected")
+        return self.take_library.index.rank(self.selection, by=by).tolist()
+
+    def closest_takes(self) -> List[int]:
+        """Return take indices ordered by similarity to the current audio."""
+        if self.selection is None:
+            raise RuntimeError("nothing selected")
+        t, start, end = self.selection
+        current = self.tracks[t][start:end]
+        return self.take_library.index.closest(self.selection, current).tolist()
 
     def record_take(
         self,
@@ -345,6 +925,230 @@ class MultiTrackRecorder:
         )
         self.add_selection_to_library()
 
+    async def arecord_take(
+        self,
+        countdown: int = 0,
+        play_tracks: List[int] | None = None,
+    ) -> None:
+        """Awaitable :meth:`record_take`."""
+        if self.selection is None:
+            raise RuntimeError("nothing selected")
+        t, start, end = self.selection
+        duration = (end - start) / self.samplerate
+        self.selected_track = t
+        self.position = start
+        await self.arecord(
+            duration, countdown=countdown, punch_in=True, play_tracks=play_tracks
+        )
+        self.add_selection_to_library()
+
+    def ablocks(
+        self,
+        duration: float | None = None,
+        blocksize: int = 1024,
+        queue_size: int = 64,
+    ) -> aio.BlockStream:
+        """Return an async iterator over blocks captured from the input.
+
+        Blocks are ``(frames, channels)`` float32 arrays. Capture stops after
+        ``duration`` seconds, or when the iterator is closed if no duration is
+        given. Blocks are dropped when the consumer falls ``queue_size``
+        blocks behind, see :class:`vocals.aio.BlockStream`.
+        """
+        frames = None if duration is None else int(duration * self.samplerate)
+        return aio.BlockStream(
+            self._audio(),
+            self.samplerate,
+            channels=self.channels,
+            blocksize=blocksize,
+            frames=frames,
+            queue_size=queue_size,
+            stats=self.stats,
+        )
+
+    def loop_record(
+        self,
+        passes: int,
+        play_tracks: List[int] | None = None,
+        stop: threading.Event | None = None,
+        blocksize: int = 0,
+    ) -> List[int]:
+        """Record up to ``passes`` takes of the selected region back to back.
+
+        A single duplex stream stays open while the region is cycled without
+        gaps: ``play_tracks`` are looped as the backing and every pass is
+        captured into a preallocated buffer. The buffers are reserved from
+        the take library's memory budget and each finished pass is handed to
+        the library while the next one records, so recording stops early if
+        passes finish faster than they can be stored. Setting ``stop`` ends
+        recording at the end of the current pass. The track itself is left
+        untouched. Return the library indices of the recorded takes.
+        """
+        audio = self._audio()
+        if self.selection is None:
+            raise RuntimeError("nothing selected")
+        if passes < 1:
+            raise ValueError("passes must be positive")
+        t, start, end = self.selection
+        frames = end - start
+        if frames <= 0:
+            raise ValueError("empty selection")
+        playback = self._playback_mix(start, end, play_tracks or [], muted=t)
+        # takes have the channels of the track; a mono track keeps input 1
+        shape = (frames,) + self.tracks[t].shape[1:]
+        channels = shape[1]
+        slot_bytes = frames * channels * np.dtype(np.float32).itemsize
+        store = self.take_library
+        pool = min(passes, max(2, store.memory_budget // slot_bytes))
+        free = deque(np.empty(shape, dtype=np.float32) for _ in range(pool))
+        filled: deque[np.ndarray] = deque()
+        done = threading.Event()
+        slot = None
+        captured = 0
+        completed = 0
+        elapsed = 0
+        lag = self.latency
+        limit = passes * frames
+
+        stats = self.stats
+
+        def callback(indata, outdata, nframes, time_info, status):
+            if stats is not None:
+                began = time.perf_counter()
+                try:
+                    capture(indata, outdata, nframes)
+                finally:
+                    stats.callback(time.perf_counter() - began, nframes, status)
+            else:
+                capture(indata, outdata, nframes)
+
+        def capture(indata, outdata, nframes):
+            nonlocal slot, captured, completed, elapsed
+            now = elapsed
+            elapsed += nframes
+            # the backing loops for all passes while the input lags it by
+            # ``latency`` frames, so pass boundaries differ between the two
+            out = 0
+            while out < nframes and now + out < limit:
+                i = (now + out) % frames
+                n = min(nframes - out, frames - i, limit - now - out)
+                outdata[out : out + n] = playback[i : i + n]
+                out += n
+            outdata[out:] = 0
+            offset = min(max(lag - now, 0), nframes)
+            while offset < nframes:
+                i = captured % frames
+                if slot is None:
+                    if not free:
+                        if stats is not None:
+                            stats.overflow()
+                        outdata[max(offset - lag, 0) :] = 0
+                        raise audio.CallbackStop
+                    slot = free.popleft()
+                n = min(nframes - offset, frames - i)
+                slot[i : i + n] = indata[offset : offset + n, :channels]
+                offset += n
+                captured += n
+                if i + n == frames:
+                    filled.append(slot)
+                    slot = None
+                    completed += 1
+                    if completed == passes or (stop is not None and stop.is_set()):
+                        # silence the backing of the pass that won't be kept
+                        outdata[max(offset - lag, 0) :] = 0
+                        raise audio.CallbackStop
+
+        indices: List[int] = []
+
+        def store_filled(refill: bool = True) -> None:
+            while filled:
+                indices.append(store.add(self.selection, filled.popleft(), copy=False))
+                if refill and len(free) + (slot is not None) < passes - completed:
+                    free.append(np.empty(shape, dtype=np.float32))
+
+        store.reserve(pool * slot_bytes)
+        try:
+            with audio.Stream(
+                samplerate=self.samplerate,
+                blocksize=blocksize,
+                channels=self.channels,
+                dtype="float32",
+                callback=callback,
+                finished_callback=done.set,
+            ):
+                while not done.is_set():
+                    audio.sleep(50)
+                    store_filled()
+        finally:
+            store.release(pool * slot_bytes)
+        store_filled(refill=False)
+        self.selected_track = t
+        self.position = start
+        return indices
+
+    def harmony(
+        self,
+        track_indices: List[int] | None = None,
+        frame_size: int = 4096,
+        hop: int = 2048,
+        **kwargs,
+    ) -> List[harmony.HarmonySegment]:
+        """Return the chord and interval timeline of ``track_indices``.
+
+        All tracks are analysed together with :func:`vocals.harmony.analyse`,
+        to which keyword arguments are passed on.
+        """
+        if track_indices is None:
+            track_indices = list(range(len(self.tracks)))
+        for t in track_indices:
+            if not 0 <= t < len(self.tracks):
+                raise ValueError("invalid track index")
+        tracks = [self.tracks[t] for t in track_indices]
+        with timed(self.stats, "harmony"):
+            return harmony.analyse(
+                tracks, self.samplerate, frame_size=frame_size, hop=hop, **kwargs
+            )
+
+    def trim_silence(
+        self,
+        track_index: int | None = None,
+        threshold_db: float = -60.0,
+        min_silence: float = 0.5,
+    ) -> List[tuple[int, int]]:
+        """Replace the silent sections of a track with digital silence.
+
+        Sections found by ``utils.detect_voice`` that last at least
+        ``min_silence`` seconds are zeroed, removing noise between phrases
+        without moving them, and silence at the end of the track is cut off.
+        The trim is a single undoable edit. Return the ``(start, end)`` sample
+        ranges that were trimmed.
+        """
+        if track_index is None:
+            track_index = self.selected_track
+        if not 0 <= track_index < len(self.tracks):
+            raise ValueError("invalid track index")
+
+        track = self.tracks[track_index]
+        segments = utils.detect_voice(
+            track,
+            self.samplerate,
+            threshold_db=threshold_db,
+            min_silence=min_silence,
+        )
+        shortest = int(min_silence * self.samplerate)
+        trimmed = [
+            (start, end)
+            for start, end, voiced in segments
+            if not voiced and (end - start >= shortest or end == len(track))
+        ]
+        with self.history.group():
+            for start, end in reversed(trimmed):
+                count = 0 if end == len(self.tracks[track_index]) else end - start
+                silence = _silence(count, track.shape[1:])
+                self._splice(track_index, start, end, silence)
+        self.position = min(self.position, len(self.tracks[track_index]))
+        return trimmed
+
     def pitch_range(self, track_index: int | None = None) -> tuple[float, float] | None:
         """Return the pitch range of ``track_index`` using ``utils.pitch_range``."""
 
@@ -354,5 +1158,6 @@ class MultiTrackRecorder:
             raise ValueError("invalid track index")
 
         samples = self.tracks[track_index]
-        result = utils.pitch_range(samples, samplerate=self.samplerate)
+        with timed(self.stats, "pitch"):
+            result = utils.pitch_range(samples, samplerate=self.samplerate)
         return result
@@ -0,0 +1,147 @@
+"""Conversion between float32 samples and integer PCM data.
+
+The conversions run in the ``vocals.kernels`` C extension in a single pass
+over caller-provided buffers. When the extension is not built equivalent NumPy
+code is used instead. Integer samples are little endian as in WAV files, and
+encoding clips values outside ``[-1, 1]`` unless ``clip=False``, in which case
+they wrap around like an integer cast.
+"""
+
+import itertools
+
+import numpy as np
+
+try:
+    from . import kernels as _kernels
+except ImportError:  # pragma: no cover - extension not built
+    _kernels = None
+
+__all__ = [
+    "decode",
+    "decode_into",
+    "deinterleave",
+    "encode",
+    "encode_into",
+    "interleave",
+]
+
+_seeds = itertools.count(1)
+
+
+def _width(bits: int) -> int:
+    if bits not in (16, 24, 32):
+        raise ValueError("bits must be 16, 24 or 32")
+    return bits // 8
+
+
+def _float32(samples) -> np.ndarray:
+    return np.ascontiguousarray(samples, dtype=np.float32)
+
+
+def encode_into(
+    samples: np.ndarray,
+    out,
+    bits: int = 16,
+    clip: bool = True,
+    dither: bool = False,
+) -> int:
+    """Encode ``samples`` into the writable buffer ``out``.
+
+    ``dither`` adds triangular dither of one least significant bit before
+    rounding. Return the number of samples outside ``[-1, 1]``.
+    """
+    width = _width(bits)
+    samples = _float32(samples)
+    seed = next(_seeds) & 0xFFFFFFFF if dither else 0
+    if _kernels is not None:
+        return _kernels.encode(samples, out, bits, clip, dither, seed)
+
+    flat = samples.reshape(-1).astype(np.float64)
+    flat[np.isnan(flat)] = 0.0
+    clipped = int(np.count_nonzero(np.abs(flat) > 1.0))
+    scale = float(2 ** (bits - 1) - 1)
+    if clip:
+        np.clip(flat, -1.0, 1.0, out=flat)
+    flat *= scale
+    if dither:
+        rng = np.random.default_rng(seed)
+        flat += rng.random(len(flat)) - rng.random(len(flat))
+    np.rint(flat, out=flat)
+    if clip:
+        np.clip(flat, -scale - 1, scale, out=flat)
+    else:
+        np.clip(flat, -(2.0**62), 2.0**62, out=flat)
+    words = flat.astype(np.int64).astype("<u4")
+    packed = words.view(np.uint8).reshape(-1, 4)[:, :width]
+    dst = np.frombuffer(out, dtype=np.uint8)
+    if len(dst) < packed.size:
+        raise ValueError("destination buffer too small")
+    dst[: packed.size] = packed.reshape(-1)
+    return clipped
+
+
+def encode(
+    samples: np.ndarray, bits: int = 16, clip: bool = True, dither: bool = False
+) -> np.ndarray:
+    """Return ``samples`` encoded as a ``uint8`` array of PCM bytes."""
+    samples = _float32(samples)
+    out = np.empty(samples.size * _width(bits), dtype=np.uint8)
+    encode_into(samples, out, bits=bits, clip=clip, dither=dither)
+    return out
+
+
+def decode_into(data, out: np.ndarray, bits: int = 16) -> int:
+    """Decode PCM bytes ``data`` into the float32 array ``out``.
+
+    Return the number of samples decoded.
+    """
+    width = _width(bits)
+    if _kernels is not None:
+        return _kernels.decode(data, out, bits)
+
+    raw = np.frombuffer(data, dtype=np.uint8)
+    count = len(raw) // width
+    dst = out.reshape(-1)
+    if len(dst) < count:
+        raise ValueError("destination buffer too small")
+    if width == 3:
+        raw = raw[: count * 3].reshape(-1, 3)
+        words = raw[:, 0] | (raw[:, 1].astype("<i4") << 8)
+        words = words | (raw[:, 2].astype(np.int8).astype("<i4") << 16)
+    else:
+        words = raw[: count * width].view(f"<i{width}")
+    np.divide(words, float(2 ** (bits - 1) - 1), out=dst[:count], casting="unsafe")
+    return count
+
+
+def decode(data, bits: int = 16) -> np.ndarray:
+    """Return PCM bytes ``data`` decoded to a float32 array."""
+    out = np.empty(len(memoryview(data).cast("B")) // _width(bits), np.float32)
+    decode_into(data, out, bits=bits)
+    return out
+
+
+def interleave(planar: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """Return ``(channels, frames)`` samples as a ``(frames, channels)`` array."""
+    planar = _float32(planar)
+    channels, frames = planar.shape
+    if out is None:
+        out = np.empty((frames, channels), dtype=np.float32)
+    if _kernels is not None:
+        _kernels.interleave(planar, out, channels)
+    else:
+        out.reshape(frames, channels)[:] = planar.T
+    return out
+
+
+def deinterleave(frames: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+    """Return ``(frames, channels)`` samples as a ``(channels, frames)`` array."""
+    frames = _float32(frames)
+    count, channels = frames.shape
+    if out is None:
+        out = np.empty((channels, count), dtype=np.float32)
+    if _kernels is not None:
+        _kernels.deinterleave(frames, out, channels)
+    else:
+        out.reshape(channels, count)[:] = frames.T
+    return out
@@ -1,28 +1,56 @@
 import argparse
+import importlib
 import logging
 import time
 from pathlib import Path
 
-import numpy as np
+from . import __version__
+from .stats import Stats, timed
 
-from . import __version__, utils
-
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-try:
-    import sounddevice as sd
-except Exception as e:  # pragma: no cover - system dependency missing
-    raise SystemExit(
-        "The 'sounddevice' package is required. Install it with 'pip install sounddevice'."
-    ) from e
+# NumPy, the ring buffer extension and ``sounddevice``, which initializes
+# PortAudio, are imported on first use so that ``--help`` and ``--version``
+# start quickly. They stay available as attributes of this module.
+_LAZY = {
+    "np": "numpy",
+    "pcm": ".pcm",
+    "utils": ".utils",
+    "ringbuffer": ".ringbuffer",
+}
+
+# ``sounddevice``, loaded by ``_sounddevice`` unless assigned beforehand
+sd = None
+
+
+def _sounddevice():
+    global sd
+    if sd is None:
+        try:
+            import sounddevice
+        except Exception as e:  # pragma: no cover - system dependency missing
+            raise SystemExit(
+                "The 'sounddevice' package is required. Install it with 'pip install sounddevice'."
+            ) from e
+        sd = sounddevice
+    return sd
+
+
+def _import(name: str):
+    try:
+        return importlib.import_module(_LAZY[name], __package__)
+    except ImportError as e:  # pragma: no cover - extension not built
+        if name == "ringbuffer":
+            raise SystemExit(
+                "The ringbuffer extension is not built. Run 'python setup.py build_ext --inplace' first."
+            ) from e
+        raise
+
 
-try:
-    from . import ringbuffer
-except Exception as e:  # pragma: no cover - extension not built
-    raise SystemExit(
-        "The ringbuffer extension is not built. Run 'python setup.py build_ext --inplace' first."
-    ) from e
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return _import(name)
 
 
 def _parse_reference(value):
@@ -31,6 +59,8 @@ def _parse_reference(value):
     try:
         return float(value)
     except ValueError:
+        from . import utils
+
         return utils.note_to_freq(value)
 
 
@@ -43,31 +73,72 @@ def record_to_file(
     metronome_bpm=None,
     show_range=False,
     reference_freq=None,
+    backend=None,
+    stats=None,
 ):
-    """Record audio from the default microphone and save to a WAV file."""
-    buffer = ringbuffer.RingBuffer(int(samplerate * channels))
+    """Record audio from the default microphone and save to a WAV file.
+
+    ``backend`` may be a ``vocals.backend.AudioBackend`` such as
+    ``VirtualBackend`` to record without a real audio device. Callback
+    timings, ring buffer levels, dropped audio and the time spent writing and
+    analysing are collected into ``stats`` when a ``vocals.stats.Stats`` is
+    given.
+    """
+    import numpy as np
+
+    from . import pcm, utils
+
+    audio = backend if backend is not None else _sounddevice()
+    buffer = _import("ringbuffer").RingBuffer(int(samplerate * channels))
     recorded = []
 
+    def beep(freq, **kwargs):
+        if backend is not None:
+            kwargs["backend"] = backend
+        utils.beep(freq, samplerate=samplerate, **kwargs)
+
     if countdown > 0:
         for i in range(countdown, 0, -1):
             logger.info(i)
-            freq = 880 if (countdown - i) % 2 == 0 else 660
-            utils.beep(freq, samplerate=samplerate)
-            time.sleep(1)
+            beep(880 if (countdown - i) % 2 == 0 else 660)
+            if backend is None:
+                time.sleep(1)
+            else:
+                backend.sleep(1000)
 
     if reference_freq is not None:
-        utils.beep(reference_freq, samplerate=samplerate)
+        beep(reference_freq)
 
     def callback(indata, frames, time_info, status):
+        if stats is not None:
+            began = time.perf_counter()
         written = buffer.write(indata.astype("float32").ravel())
         if written < len(indata.ravel()):
             logger.warning("buffer overflow")
+            if stats is not None:
+                stats.overflow()
+        if stats is not None:
+            stats.ring(buffer.size(), buffer.capacity())
         out = buffer.read(frames * channels)
         if out:
             recorded.append(np.frombuffer(out, dtype=np.float32))
+        if stats is not None:
+            stats.callback(time.perf_counter() - began, frames, status)
 
     stop = None
-    if metronome_bpm:
+    if metronome_bpm and backend is not None:
+        # a virtual clock only advances in sleep(), so click between sleeps
+        # instead of running a real-time metronome thread
+        remaining = duration * 1000
+        with audio.InputStream(
+            channels=channels, samplerate=samplerate, callback=callback
+        ):
+            while remaining > 0:
+                beep(880, duration=0.05)
+                step = min(60000 / metronome_bpm, remaining)
+                audio.sleep(step)
+                remaining -= step
+    elif metronome_bpm:
         import threading
 
         stop = threading.Event()
@@ -75,34 +146,39 @@ def record_to_file(
         def metro():
             interval = 60.0 / metronome_bpm
             while not stop.is_set():
-                utils.beep(880, samplerate=samplerate, duration=0.05)
+                beep(880, duration=0.05)
                 time.sleep(interval)
 
         thread = threading.Thread(target=metro)
         thread.start()
 
-    with sd.InputStream(channels=channels, samplerate=samplerate, callback=callback):
-        sd.sleep(int(duration * 1000))
+    if not (metronome_bpm and backend is not None):
+        with audio.InputStream(
+            channels=channels, samplerate=samplerate, callback=callback
+        ):
+            audio.sleep(int(duration * 1000))
 
     if stop is not None:
         stop.set()
         thread.join()
 
     if recorded:
-        data = np.concatenate(recorded)
+        # the last callback block may run past the requested duration
+        data = np.concatenate(recorded)[: int(duration * samplerate) * channels]
     else:
         data = np.array([], dtype=np.float32)
 
     import wave
 
-    with wave.open(filename, "wb") as wf:
+    with timed(stats, "write"), wave.open(filename, "wb") as wf:
         wf.setnchannels(channels)
         wf.setsampwidth(2)
         wf.setframerate(samplerate)
-        wf.writeframes((data * 32767).astype("<i2").tobytes())
+        wf.writeframes(pcm.encode(data))
 
     if show_range and len(data) > 0:
-        result = utils.pitch_range(data, samplerate=samplerate)
+        with timed(stats, "pitch"):
+            result = utils.pitch_range(data, samplerate=samplerate)
         if result is not None:
             low, high = result
             logger.info("Pitch range: %.1f Hz - %.1f Hz", low, high)
@@ -150,21 +226,28 @@ def main():
         action="store_true",
         help="List available audio devices and exit",
     )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print callback timings and dropped audio after recording",
+    )
     parser.add_argument(
         "--version",
         action="version",
         version=f"%(prog)s {__version__}",
     )
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
 
     if args.list_devices:
-        for idx, info in enumerate(sd.query_devices()):
+        for idx, info in enumerate(_sounddevice().query_devices()):
             print(f"{idx}: {info['name']}")
         return
 
     outpath = args.outfile
     if not Path(outpath).is_absolute():
         outpath = args.output_dir / outpath
+    stats = Stats() if args.stats else None
     record_to_file(
         str(outpath),
         args.duration,
@@ -173,7 +256,10 @@ def main():
         metronome_bpm=args.bpm,
         show_range=args.show_range,
         reference_freq=_parse_reference(args.reference),
+        stats=stats,
     )
+    if stats is not None:
+        print(stats.report())
 
 
 if __name__ == "__main__":
@@ -110,11 +110,25 @@ static PyObject *PyRingBuffer_read(PyRingBuffer *self, PyObject *args) {
   return array;
 }
 
+static PyObject *PyRingBuffer_size(PyRingBuffer *self,
+                                   PyObject *Py_UNUSED(ignored)) {
+  return PyLong_FromSize_t(self->rb->size);
+}
+
+static PyObject *PyRingBuffer_capacity(PyRingBuffer *self,
+                                       PyObject *Py_UNUSED(ignored)) {
+  return PyLong_FromSize_t(self->rb->capacity);
+}
+
 static PyMethodDef PyRingBuffer_methods[] = {
     {"write", (PyCFunction)PyRingBuffer_write, METH_O,
      "Write floats to the buffer"},
     {"read", (PyCFunction)PyRingBuffer_read, METH_VARARGS,
      "Read floats from the buffer"},
+    {"size", (PyCFunction)PyRingBuffer_size, METH_NOARGS,
+     "Number of floats waiting to be read"},
+    {"capacity", (PyCFunction)PyRingBuffer_capacity, METH_NOARGS,
+     "Maximum number of floats the buffer holds"},
     {NULL, NULL, 0, NULL}};
 
 static PyTypeObject PyRingBufferType = {
@@ -0,0 +1,161 @@
+"""Low-overhead instrumentation of the capture, playback and analysis paths."""
+
+import time
+from contextlib import nullcontext
+from typing import Dict, List
+
+__all__ = ["Stats", "timed"]
+
+# callback durations are bucketed by powers of two microseconds: bucket ``i``
+# holds durations below ``2**i`` µs, the last one everything longer
+BUCKETS = 24
+
+_NULL = nullcontext()
+
+
+class _Timer:
+    __slots__ = ("stats", "name", "began")
+
+    def __init__(self, stats: "Stats", name: str):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.began = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self.stats.add_time(self.name, time.perf_counter() - self.began)
+
+
+class Stats:
+    """Counters and timings collected while recording and playing.
+
+    Audio callbacks report their duration and block size with
+    :meth:`callback`, the fill level of their ring buffer with :meth:`ring`
+    and dropped audio with :meth:`overflow` and :meth:`underrun`. Other work
+    such as mixing, pitch analysis and file writes is timed by name with
+    :meth:`timer`. Updates are plain integer and float arithmetic so they are
+    cheap enough for the audio thread; readers on other threads may see a
+    snapshot that is one update behind.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.callbacks = 0
+        self.callback_time = 0.0
+        self.callback_max = 0.0
+        self.histogram: List[int] = [0] * BUCKETS
+        self.block_sizes: Dict[int, int] = {}
+        self.ring_fill = 0
+        self.ring_max = 0
+        self.ring_capacity = 0
+        self.overflows = 0
+        self.underruns = 0
+        # name -> [calls, total seconds, max seconds]
+        self.timings: Dict[str, List[float]] = {}
+
+    # Recording --------------------------------------------------------------
+
+    def callback(self, seconds: float, frames: int, status=None) -> None:
+        """Record one callback taking ``seconds`` for ``frames`` frames.
+
+        Overflow and underflow flags in ``status`` are counted as well.
+        """
+        self.callbacks += 1
+        self.callback_time += seconds
+        if seconds > self.callback_max:
+            self.callback_max = seconds
+        bucket = int(seconds * 1e6).bit_length()
+        self.histogram[bucket if bucket < BUCKETS else BUCKETS - 1] += 1
+        self.block_sizes[frames] = self.block_sizes.get(frames, 0) + 1
+        if status:
+            if status.input_overflow or status.output_overflow:
+                self.overflows += 1
+            if status.input_underflow or status.output_underflow:
+                self.underruns += 1
+
+    def ring(self, fill: int, capacity: int) -> None:
+        """Record the current fill level of a ring buffer."""
+        self.ring_fill = fill
+        self.ring_capacity = capacity
+        if fill > self.ring_max:
+            self.ring_max = fill
+
+    def overflow(self, count: int = 1) -> None:
+        self.overflows += count
+
+    def underrun(self, count: int = 1) -> None:
+        self.underruns += count
+
+    def add_time(self, name: str, seconds: float) -> None:
+        entry = self.timings.get(name)
+        if entry is None:
+            self.timings[name] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            if seconds > entry[2]:
+                entry[2] = seconds
+
+    def timer(self, name: str) -> _Timer:
+        """Return a context manager adding its duration to timing ``name``."""
+        return _Timer(self, name)
+
+    # Reporting --------------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        """Return the collected values as plain Python data."""
+        return {
+            "callbacks": self.callbacks,
+            "callback_time": self.callback_time,
+            "callback_max": self.callback_max,
+            "histogram": list(self.histogram),
+            "block_sizes": dict(self.block_sizes),
+            "ring_fill": self.ring_fill,
+            "ring_max": self.ring_max,
+            "ring_capacity": self.ring_capacity,
+            "overflows": self.overflows,
+            "underruns": self.underruns,
+            "timings": {
+                name: {"calls": int(c), "total": t, "max": m}
+                for name, (c, t, m) in self.timings.items()
+            },
+        }
+
+    def report(self) -> str:
+        """Return a human readable summary."""
+        lines = []
+        if self.callbacks:
+            mean = self.callback_time / self.callbacks
+            lines.append(
+                f"callbacks: {self.callbacks}, mean {mean * 1e6:.1f} us, "
+                f"max {self.callback_max * 1e6:.1f} us"
+            )
+            for i, count in enumerate(self.histogram):
+                if count:
+                    low = 0 if i == 0 else 1 << (i - 1)
+                    high = f"{1 << i} us" if i < BUCKETS - 1 else "+"
+                    lines.append(f"  {low:>8} - {high:<12} {count}")
+            sizes = ", ".join(
+                f"{size} x{count}" for size, count in sorted(self.block_sizes.items())
+            )
+            lines.append(f"block sizes: {sizes}")
+        if self.ring_capacity:
+            lines.append(
+                f"ring buffer: {self.ring_fill}/{self.ring_capacity} "
+                f"(max {self.ring_max})"
+            )
+        lines.append(f"overflows: {self.overflows}, underruns: {self.underruns}")
+        for name, (calls, total, longest) in sorted(self.timings.items()):
+            lines.append(
+                f"{name}: {int(calls)} calls, {total * 1000:.2f} ms total, "
+                f"max {longest * 1000:.2f} ms"
+            )
+        return "\n".join(lines)
+
+
+def timed(stats: Stats | None, name: str):
+    """Return ``stats.timer(name)``, or a no-op context without ``stats``."""
+    return _NULL if stats is None else stats.timer(name)
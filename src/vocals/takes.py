@@ -0,0 +1,282 @@
+"""Deduplicated take storage with an in-memory budget and disk spill."""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Hashable, Iterator, List, Sequence
+
+import numpy as np
+
+from .features import FeatureIndex
+
+__all__ = ["TakeList", "TakeStore"]
+
+
+class _Blob:
+    __slots__ = ("shape", "nbytes", "offset", "refs")
+
+    def __init__(self, shape: tuple[int, ...], nbytes: int):
+        self.shape = shape
+        self.nbytes = nbytes
+        self.offset: int | None = None  # position in the spill file
+        self.refs = 0  # number of (key, index) entries sharing the blob
+
+
+class TakeList(Sequence):
+    """Read-only sequence of the takes of one region.
+
+    Takes are paged in from the store only when indexed or iterated, so
+    holding the list does not keep spilled takes in memory.
+    """
+
+    def __init__(self, store: "TakeStore", key: Hashable):
+        self._store = store
+        self._key = key
+
+    def __len__(self) -> int:
+        return self._store.count(self._key)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("take index out of range")
+        return self._store.take(self._key, index)
+
+
+class TakeStore:
+    """Store takes per region, deduplicated by content hash.
+
+    Identical takes share one read-only array. At most ``memory_budget`` bytes
+    of take data are kept in memory; the least recently used takes beyond that
+    are written to a spill file (a temporary file unless ``spill_path`` is
+    given) and read back transparently when accessed again. When ``index`` is
+    given every new take is analysed into it as it is stored.
+
+    Indexing the store by region key returns a lazy :class:`TakeList`, so the
+    store can stand in for the ``{region: [takes]}`` dict it replaces.
+    """
+
+    def __init__(
+        self,
+        memory_budget: int = 256 * 1024 * 1024,
+        spill_path: str | None = None,
+        index: FeatureIndex | None = None,
+    ):
+        self.memory_budget = memory_budget
+        self.spill_path = spill_path
+        self.index = index
+        self.resident_bytes = 0
+        self.reserved_bytes = 0
+        self._entries: dict[Hashable, List[str]] = {}
+        self._blobs: dict[str, _Blob] = {}
+        self._resident: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._spill = None
+        self._spill_bytes = 0  # bytes of the spill file in use
+        self._dead_bytes = 0  # bytes of removed takes still in the spill file
+        self._lock = threading.RLock()
+
+    # Mapping-like access ----------------------------------------------------
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, key: Hashable) -> TakeList:
+        if key not in self._entries:
+            raise KeyError(key)
+        return TakeList(self, key)
+
+    def get(self, key: Hashable, default=None) -> TakeList | None:
+        """Return the takes of ``key``, or ``default`` if it has none."""
+        return TakeList(self, key) if key in self._entries else default
+
+    def keys(self) -> List[Hashable]:
+        return list(self._entries)
+
+    def count(self, key: Hashable) -> int:
+        """Return the number of takes stored for ``key``."""
+        return len(self._entries.get(key, ()))
+
+    # Storing and loading ----------------------------------------------------
+
+    @staticmethod
+    def digest(samples: np.ndarray) -> str:
+        """Return the content hash used to deduplicate ``samples``."""
+        samples = np.ascontiguousarray(samples, dtype=np.float32)
+        h = hashlib.blake2b(repr(samples.shape).encode(), digest_size=20)
+        h.update(memoryview(samples).cast("B"))
+        return h.hexdigest()
+
+    def add(self, key: Hashable, samples: np.ndarray, copy: bool = True) -> int:
+        """Store ``samples`` as a take for ``key`` and return its index.
+
+        The samples are only copied when no identical take is stored yet. Adding
+        a take that already exists for ``key`` returns the existing index. With
+        ``copy=False`` a new take adopts the caller's float32 buffer instead,
+        which must not be modified afterwards.
+        """
+        with self._lock:
+            digest = self.digest(samples)
+            takes = self._entries.setdefault(key, [])
+            if digest in takes:
+                return takes.index(digest)
+            blob = self._blobs.get(digest)
+            if blob is None:
+                if copy:
+                    data = np.array(samples, dtype=np.float32, order="C")
+                else:
+                    data = np.ascontiguousarray(samples, dtype=np.float32)
+                data.flags.writeable = False
+                blob = self._blobs[digest] = _Blob(data.shape, data.nbytes)
+                self._make_resident(digest, data)
+            blob.refs += 1
+            takes.append(digest)
+            if self.index is not None:
+                self.index.add(key, digest, samples)
+            return len(takes) - 1
+
+    def take(self, key: Hashable, index: int) -> np.ndarray:
+        """Return take ``index`` of ``key``, paging it in if necessary."""
+        with self._lock:
+            takes = self._entries.get(key)
+            if not takes or not 0 <= index < len(takes):
+                raise ValueError("invalid take index")
+            return self._load(takes[index])
+
+    def takes(self, key: Hashable) -> TakeList:
+        """Return the takes stored for ``key`` without loading them."""
+        return TakeList(self, key)
+
+    def reserve(self, nbytes: int) -> None:
+        """Set aside ``nbytes`` of the memory budget for takes being captured.
+
+        Resident takes are spilled to make room. Call :meth:`release` once the
+        buffers have been added or discarded.
+        """
+        with self._lock:
+            self.reserved_bytes += nbytes
+            self._fit_budget()
+
+    def release(self, nbytes: int) -> None:
+        """Return ``nbytes`` reserved with :meth:`reserve` to the budget."""
+        with self._lock:
+            self.reserved_bytes -= nbytes
+
+    def remove(self, key: Hashable, index: int | None = None) -> None:
+        """Remove take ``index`` of ``key``, or all of its takes.
+
+        Data no longer shared with another take is released. Spilled data is
+        reclaimed by :meth:`compact`, which runs automatically once more than
+        half of the spill file belongs to removed takes.
+        """
+        with self._lock:
+            takes = self._entries.get(key)
+            if takes is None:
+                raise KeyError(key)
+            if index is None:
+                removed, takes[:] = list(takes), []
+            elif 0 <= index < len(takes):
+                removed = [takes.pop(index)]
+            else:
+                raise ValueError("invalid take index")
+            if not takes:
+                del self._entries[key]
+            if self.index is not None:
+                self.index.remove(key, index)
+            for digest in removed:
+                blob = self._blobs[digest]
+                blob.refs -= 1
+                if blob.refs:
+                    continue
+                del self._blobs[digest]
+                if self._resident.pop(digest, None) is not None:
+                    self.resident_bytes -= blob.nbytes
+                if blob.offset is not None:
+                    self._dead_bytes += blob.nbytes
+            if self._dead_bytes and 2 * self._dead_bytes > self._spill_bytes:
+                self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the spill file keeping only the data of stored takes."""
+        with self._lock:
+            if self._spill is None or not self._dead_bytes:
+                return
+            spilled = sorted(
+                (b for b in self._blobs.values() if b.offset is not None),
+                key=lambda b: b.offset,
+            )
+            new = self._open_spill(self.spill_path and self.spill_path + ".tmp")
+            offset = 0
+            for blob in spilled:
+                chunk = bytearray(blob.nbytes)
+                self._spill.seek(blob.offset)
+                self._spill.readinto(chunk)
+                new.write(chunk)
+                blob.offset = offset
+                offset += blob.nbytes
+            new.flush()
+            self._spill.close()
+            if self.spill_path is not None:
+                os.replace(self.spill_path + ".tmp", self.spill_path)
+            self._spill = new
+            self._spill_bytes = offset
+            self._dead_bytes = 0
+
+    def close(self) -> None:
+        """Close the spill file. Spilled takes become unavailable."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    @staticmethod
+    def _open_spill(path: str | None):
+        if path is None:
+            return tempfile.TemporaryFile(prefix="vocals-takes-")
+        return open(path, "w+b")
+
+    def _load(self, digest: str) -> np.ndarray:
+        data = self._resident.get(digest)
+        if data is not None:
+            self._resident.move_to_end(digest)
+            return data
+        blob = self._blobs[digest]
+        data = np.empty(blob.shape, dtype=np.float32)
+        self._spill.seek(blob.offset)
+        self._spill.readinto(memoryview(data).cast("B"))
+        data.flags.writeable = False
+        self._make_resident(digest, data)
+        return data
+
+    def _make_resident(self, digest: str, data: np.ndarray) -> None:
+        self._resident[digest] = data
+        self.resident_bytes += data.nbytes
+        self._fit_budget(keep=1)
+
+    def _fit_budget(self, keep: int = 0) -> None:
+        budget = self.memory_budget - self.reserved_bytes
+        while self.resident_bytes > budget and len(self._resident) > keep:
+            old, old_data = self._resident.popitem(last=False)
+            self._evict(old, old_data)
+
+    def _evict(self, digest: str, data: np.ndarray) -> None:
+        blob = self._blobs[digest]
+        if blob.offset is None:
+            # takes are immutable so a spilled copy never needs rewriting
+            if self._spill is None:
+                self._spill = self._open_spill(self.spill_path)
+            self._spill.seek(self._spill_bytes)
+            blob.offset = self._spill_bytes
+            self._spill.write(memoryview(data).cast("B"))
+            self._spill_bytes += blob.nbytes
+        self.resident_bytes -= blob.nbytes
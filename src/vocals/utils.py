@@ -1,9 +1,18 @@
+from typing import List
+
 import numpy as np
 
-try:
-    import sounddevice as sd
-except Exception:  # pragma: no cover - dependency missing in tests
-    sd = None
+from .backend import default_backend
+
+# ``sounddevice``, loaded by ``_sounddevice`` on the first beep
+sd = None
+
+
+def _sounddevice():
+    global sd
+    if sd is None:
+        sd = default_backend()
+    return sd
 
 
 def beep_sound(
@@ -15,15 +24,37 @@ def beep_sound(
     return np.sin(2 * np.pi * frequency * t).astype(np.float32)
 
 
-def beep(frequency: float, samplerate: int = 44100, duration: float = 0.2) -> None:
-    """Play a short beep of ``frequency`` Hz using ``sounddevice``."""
+def beep(
+    frequency: float, samplerate: int = 44100, duration: float = 0.2, backend=None
+) -> None:
+    """Play a short beep of ``frequency`` Hz using ``sounddevice``.
 
-    if sd is None:
+    ``backend`` may be any ``vocals.backend.AudioBackend`` to play through
+    instead of ``sounddevice``.
+    """
+
+    audio = backend if backend is not None else _sounddevice()
+    if audio is None:
+        return
+
+    tone = beep_sound(frequency, samplerate=samplerate, duration=duration)
+    audio.play(tone, samplerate=samplerate)
+    audio.wait()
+
+
+async def abeep(
+    frequency: float, samplerate: int = 44100, duration: float = 0.2, backend=None
+) -> None:
+    """Awaitable :func:`beep` that plays through a stream callback."""
+
+    from . import aio  # asyncio is only imported by async callers
+
+    audio = backend if backend is not None else _sounddevice()
+    if audio is None:
         return
 
     tone = beep_sound(frequency, samplerate=samplerate, duration=duration)
-    sd.play(tone, samplerate=samplerate)
-    sd.wait()
+    await aio.play(audio, tone, samplerate)
 
 
 def note_to_freq(note: str) -> float:
@@ -96,26 +127,161 @@ def estimate_pitch(samples: np.ndarray, samplerate: int = 44100) -> float | None
     return float(samplerate) / float(peak)
 
 
+def downmix(samples: np.ndarray) -> np.ndarray:
+    """Return a 1-D mono signal for ``samples`` of shape ``(frames, channels)``.
+
+    Mono input is returned as a view, other channel counts are averaged.
+    """
+
+    if samples.ndim == 1:
+        return samples
+    if samples.shape[1] == 1:
+        return samples[:, 0]
+    return samples.mean(axis=1, dtype=np.float32)
+
+
+def frame_signal(samples: np.ndarray, frame_size: int, hop: int) -> np.ndarray:
+    """Return a strided ``(frames, frame_size)`` view of overlapping frames.
+
+    Frames start every ``hop`` samples and, like ``pitch_range`` always did,
+    the final frame is only included when samples remain after it.
+    """
+
+    count = len(range(0, len(samples) - frame_size, hop))
+    if count <= 0:
+        return np.zeros((0, frame_size), dtype=samples.dtype)
+    windows = np.lib.stride_tricks.sliding_window_view(samples, frame_size)
+    return windows[: (count - 1) * hop + 1 : hop]
+
+
+def pitch_contour(
+    samples: np.ndarray,
+    samplerate: int = 44100,
+    frame_size: int = 2048,
+    chunk: int = 256,
+) -> np.ndarray:
+    """Return the pitch of each half-overlapping frame of ``samples``.
+
+    This applies the auto-correlation method of ``estimate_pitch`` to all
+    frames at once using FFTs, ``chunk`` frames at a time. Silent and unpitched
+    frames are ``nan``.
+    """
+
+    samples = downmix(samples)
+    frames = frame_signal(samples, frame_size, frame_size // 2)
+    contour = np.full(len(frames), np.nan)
+    lags = np.arange(frame_size)
+    for first in range(0, len(frames), chunk):
+        block = frames[first : first + chunk].astype(np.float64)
+        block -= block.mean(axis=1, keepdims=True)
+        spectrum = np.fft.rfft(block, n=2 * frame_size, axis=1)
+        corr = np.fft.irfft(spectrum.real**2 + spectrum.imag**2, axis=1)
+        corr = corr[:, :frame_size]
+        rising = np.diff(corr, axis=1) > 0
+        start = np.argmax(rising, axis=1)
+        peak = np.argmax(np.where(lags >= start[:, None], corr, -np.inf), axis=1)
+        voiced = (
+            (np.max(np.abs(block), axis=1) >= 1e-3) & rising.any(axis=1) & (peak > 0)
+        )
+        pitch = np.full(len(block), np.nan)
+        pitch[voiced] = float(samplerate) / peak[voiced]
+        contour[first : first + len(block)] = pitch
+    return contour
+
+
+def detect_voice(
+    samples: np.ndarray,
+    samplerate: int = 44100,
+    frame_size: int = 1024,
+    threshold_db: float = -60.0,
+    min_silence: float = 0.25,
+) -> List[tuple[int, int, bool]]:
+    """Split ``samples`` into voiced and silent segments.
+
+    Consecutive frames of ``frame_size`` samples are silent when their RMS
+    level is below ``threshold_db`` dBFS. Silent gaps shorter than
+    ``min_silence`` seconds between voiced frames count as voiced, so short
+    pauses don't split a phrase. Return ``(start, end, voiced)`` tuples
+    covering all samples in order.
+    """
+
+    samples = downmix(samples)
+    total = len(samples)
+    if total == 0:
+        return []
+    full = total // frame_size
+    count = -(-total // frame_size)
+    power = np.empty(count)
+    body = samples[: full * frame_size].reshape(full, frame_size)
+    power[:full] = np.square(body, dtype=np.float64).mean(axis=1)
+    if count > full:
+        power[full] = np.square(samples[full * frame_size :], dtype=np.float64).mean()
+    voiced = power >= 10 ** (threshold_db / 10)
+
+    # runs of equal frames, then merge short interior gaps into their phrase
+    edges = np.flatnonzero(np.diff(voiced)) + 1
+    starts = np.concatenate([[0], edges])
+    ends = np.concatenate([edges, [count]])
+    states = voiced[starts]
+    gap = int(np.ceil(min_silence * samplerate / frame_size))
+    states |= (ends - starts < gap) & (starts > 0) & (ends < count)
+    keep = np.concatenate([[True], states[1:] != states[:-1]])
+    starts, states = starts[keep], states[keep]
+    ends = np.concatenate([starts[1:], [count]])
+    return [
+        (int(s) * frame_size, min(int(e) * frame_size, total), bool(v))
+        for s, e, v in zip(starts, ends, states)
+    ]
+
+
 def pitch_range(
-    samples: np.ndarray, samplerate: int = 44100, frame_size: int = 2048
+    samples: np.ndarray,
+    samplerate: int = 44100,
+    frame_size: int = 2048,
+    threshold_db: float = -60.0,
 ) -> tuple[float, float] | None:
-    """Return estimated min and max pitch for ``samples``."""
+    """Return estimated min and max pitch for ``samples``.
 
-    if samples.ndim > 1:
-        samples = samples[:, 0]
-
-    pitches: list[float] = []
-    hop = frame_size // 2
-    for i in range(0, len(samples) - frame_size, hop):
-        frame = samples[i : i + frame_size]
-        pitch = estimate_pitch(frame, samplerate)
-        if pitch is not None:
-            pitches.append(pitch)
+    Only the voiced segments found by ``detect_voice`` are analysed.
+    """
 
-    if not pitches:
+    samples = downmix(samples)
+    segments = detect_voice(
+        samples, samplerate, frame_size=frame_size // 2, threshold_db=threshold_db
+    )
+    contours = [
+        pitch_contour(samples[start:end], samplerate=samplerate, frame_size=frame_size)
+        for start, end, voiced in segments
+        if voiced
+    ]
+    if not contours:
+        return None
+    contour = np.concatenate(contours)
+    pitches = contour[~np.isnan(contour)]
+    if pitches.size == 0:
         return None
 
-    return min(pitches), max(pitches)
+    return float(pitches.min()), float(pitches.max())
+
+
+def estimate_latency(
+    played: np.ndarray, recorded: np.ndarray, max_lag: int
+) -> int | None:
+    """Return the delay in samples of ``played`` within ``recorded``.
+
+    Both signals are cross-correlated with FFTs and the strongest peak at lags
+    from 0 to ``max_lag`` is returned, regardless of its polarity. ``None`` is
+    returned when ``recorded`` is silent.
+    """
+
+    played = downmix(played).astype(np.float64)
+    recorded = downmix(recorded).astype(np.float64)
+    if not len(played) or np.max(np.abs(recorded), initial=0.0) < 1e-6:
+        return None
+    size = 1 << (len(played) + len(recorded) - 1).bit_length()
+    spectrum = np.fft.rfft(recorded, size) * np.conj(np.fft.rfft(played, size))
+    corr = np.fft.irfft(spectrum, size)[: min(max_lag, len(recorded) - 1) + 1]
+    return int(np.argmax(np.abs(corr)))
 
 
 def freq_to_note(freq: float) -> str:
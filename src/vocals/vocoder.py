@@ -0,0 +1,252 @@
+"""Phase vocoder time stretching and pitch shifting.
+
+Frames are taken as strided views of the signal and transformed with one
+batched real FFT per chunk of frames, so a long track is processed
+``chunk`` frames at a time with memory bounded by the chunk size rather than
+the track length. Signals are ``(frames,)`` or ``(frames, channels)`` arrays
+and channels are processed independently.
+"""
+
+from typing import Iterator
+
+import numpy as np
+
+__all__ = ["istft", "pitch_shift", "stft", "stretch_blocks", "time_stretch"]
+
+
+def _window(frame_size: int) -> np.ndarray:
+    # periodic Hann, whose squares overlap-add to a constant at hops of
+    # frame_size / 4 and smaller
+    return 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame_size) / frame_size)
+
+
+def _check(frame_size: int, hop: int) -> None:
+    if hop <= 0 or frame_size % hop or frame_size // hop < 2:
+        raise ValueError("frame_size must be a multiple of hop of at least 2")
+
+
+def _frames(
+    samples: np.ndarray, first: int, count: int, frame_size: int, hop: int, pad: int
+) -> np.ndarray:
+    """Return ``(count, channels, frame_size)`` frames from frame ``first``.
+
+    Frame ``k`` starts at sample ``k * hop - pad``; samples outside the signal
+    are zero.
+    """
+    begin = first * hop - pad
+    end = (first + count - 1) * hop + frame_size - pad
+    chunk = np.zeros((end - begin, samples.shape[1]))
+    lo, hi = max(begin, 0), min(end, len(samples))
+    if hi > lo:
+        chunk[lo - begin : hi - begin] = samples[lo:hi]
+    windows = np.lib.stride_tricks.sliding_window_view(chunk, frame_size, axis=0)
+    return windows[::hop]
+
+
+def stft(samples: np.ndarray, frame_size: int = 2048, hop: int = 512) -> np.ndarray:
+    """Return the short-time Fourier transform of ``samples``.
+
+    The result has shape ``(frames, bins)`` for 1-D input and ``(frames,
+    channels, bins)`` otherwise. Frame ``k`` ends at sample ``(k + 1) * hop``
+    and the frames cover every sample with the same number of windows.
+    """
+    _check(frame_size, hop)
+    mono = samples.ndim == 1
+    samples = samples.reshape(len(samples), -1)
+    pad = frame_size - hop
+    count = (len(samples) - 1 + pad) // hop + 1
+    frames = _frames(samples, 0, count, frame_size, hop, pad)
+    spectrum = np.fft.rfft(frames * _window(frame_size), axis=-1)
+    return spectrum[:, 0] if mono else spectrum
+
+
+def istft(
+    spectrum: np.ndarray, frame_size: int = 2048, hop: int = 512, length: int = 0
+) -> np.ndarray:
+    """Invert :func:`stft`, returning ``length`` samples."""
+    _check(frame_size, hop)
+    mono = spectrum.ndim == 2
+    if mono:
+        spectrum = spectrum[:, None]
+    window = _window(frame_size)
+    frames = np.fft.irfft(spectrum, n=frame_size, axis=-1) * window
+    out = _overlap_add(frames, hop, np.zeros((frame_size - hop, frames.shape[1])))
+    out = out[:, 0] if mono else out
+    pad = frame_size - hop
+    return out[pad : pad + length].astype(np.float32)
+
+
+def _overlap_add(frames: np.ndarray, hop: int, tail: np.ndarray) -> np.ndarray:
+    """Overlap-add ``(count, channels, frame_size)`` frames after ``tail``.
+
+    Return ``count * hop`` finished samples followed by the new tail, all
+    divided by the overlapping window energy.
+    """
+    count, channels, frame_size = frames.shape
+    overlap = frame_size // hop
+    buf = np.zeros(((count - 1) * hop + frame_size, channels))
+    buf[: len(tail)] = tail
+    frames = frames.transpose(0, 2, 1)
+    # every ``overlap``-th frame starts where the previous one ends, so each
+    # of those subsets is added with one reshaped slice
+    for m in range(min(overlap, count)):
+        sub = frames[m::overlap]
+        start = m * hop
+        view = buf[start : start + len(sub) * frame_size]
+        view.reshape(len(sub), frame_size, channels)[...] += sub
+    norm = (_window(frame_size) ** 2).reshape(overlap, hop).sum(axis=0)
+    done = buf[: count * hop].reshape(count, hop, channels)
+    done /= norm[None, :, None]
+    return buf
+
+
+def _nearest_peaks(magnitude: np.ndarray) -> np.ndarray:
+    """Return the index of the nearest local maximum along the last axis.
+
+    Bins of spectra without peaks are their own peak.
+    """
+    bins = magnitude.shape[-1]
+    index = np.arange(bins)
+    inner = magnitude[..., 1:-1]
+    is_peak = np.zeros(magnitude.shape, dtype=bool)
+    is_peak[..., 1:-1] = (inner > magnitude[..., :-2]) & (inner >= magnitude[..., 2:])
+    # closest peak at or below and at or above each bin
+    below = np.maximum.accumulate(np.where(is_peak, index, -bins), axis=-1)
+    above = np.minimum.accumulate(
+        np.where(is_peak, index, 2 * bins)[..., ::-1], axis=-1
+    )[..., ::-1]
+    peak = np.where(index - below <= above - index, below, above)
+    return np.where((peak >= 0) & (peak < bins), peak, index)
+
+
+def stretch_blocks(
+    samples: np.ndarray,
+    rate: float,
+    frame_size: int = 2048,
+    hop: int = 512,
+    chunk: int = 256,
+) -> Iterator[np.ndarray]:
+    """Yield ``samples`` time stretched by ``rate`` as consecutive blocks.
+
+    ``rate`` above 1 shortens the signal and below 1 lengthens it, keeping
+    its pitch. The output has ``round(len(samples) / rate)`` frames in total
+    and each block holds the result of ``chunk`` vocoder frames. Blocks are
+    float64 ``(frames, channels)`` arrays.
+    """
+    _check(frame_size, hop)
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    if not len(samples):
+        return
+    samples = samples.reshape(len(samples), -1)
+    channels = samples.shape[1]
+    window = _window(frame_size)
+    # padding by all but one hop makes every output sample the sum of a full
+    # set of overlapping frames
+    pad = frame_size - hop
+    length = int(round(len(samples) / rate))
+    count = -(-(length + pad) // hop)
+    bins = frame_size // 2 + 1
+    advance = 2 * np.pi * hop * np.arange(bins) / frame_size
+    tail = np.zeros((frame_size - hop, channels))
+    phase = None
+    skip, remaining = pad, length
+    for first in range(0, count, chunk):
+        steps = np.arange(first, min(first + chunk, count)) * rate
+        base = int(steps[0])
+        frames = _frames(samples, base, int(steps[-1]) + 2 - base, frame_size, hop, pad)
+        spectrum = np.fft.rfft(frames * window, axis=-1)
+        index = steps.astype(int) - base
+        left, right = spectrum[index], spectrum[index + 1]
+        alpha = (steps % 1)[:, None, None]
+        magnitude = (1 - alpha) * np.abs(left) + alpha * np.abs(right)
+        # phase advances by the expected amount per hop plus each bin's
+        # wrapped deviation, accumulated across frames with one cumsum
+        deviation = np.angle(right) - np.angle(left) - advance
+        deviation -= 2 * np.pi * np.round(deviation / (2 * np.pi))
+        if phase is None:
+            phase = np.angle(spectrum[0])
+        accumulated = phase + np.cumsum(advance + deviation, axis=0)
+        phases = np.concatenate([phase[None], accumulated[:-1]])
+        phase = accumulated[-1]
+        # identity phase locking: every bin keeps its analysis phase offset
+        # from the nearest spectral peak, whose propagated phase it takes,
+        # so the bins of one partial stay coherent instead of cancelling
+        peak = _nearest_peaks(magnitude)
+        analysis = np.angle(left)
+        phases = np.take_along_axis(phases, peak, axis=-1) + (
+            analysis - np.take_along_axis(analysis, peak, axis=-1)
+        )
+
+        synthesized = np.fft.irfft(
+            magnitude * np.exp(1j * phases), n=frame_size, axis=-1
+        )
+        buf = _overlap_add(synthesized * window, hop, tail)
+        done = len(steps) * hop
+        tail = buf[done:].copy()
+        block = buf[min(skip, done) : done]
+        skip = max(skip - done, 0)
+        block = block[:remaining]
+        remaining -= len(block)
+        if len(block):
+            yield block
+
+
+def time_stretch(
+    samples: np.ndarray,
+    rate: float,
+    frame_size: int = 2048,
+    hop: int = 512,
+    chunk: int = 256,
+) -> np.ndarray:
+    """Return ``samples`` played ``rate`` times faster at the same pitch."""
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    out = np.empty((int(round(len(samples) / rate)),) + samples.shape[1:], np.float32)
+    if not len(out):
+        return out
+    flat = out.reshape(len(out), -1)
+    pos = 0
+    for block in stretch_blocks(samples, rate, frame_size, hop, chunk):
+        flat[pos : pos + len(block)] = block
+        pos += len(block)
+    return out
+
+
+def pitch_shift(
+    samples: np.ndarray,
+    semitones: float,
+    frame_size: int = 2048,
+    hop: int = 512,
+    chunk: int = 256,
+) -> np.ndarray:
+    """Return ``samples`` shifted by ``semitones`` at the same duration.
+
+    The signal is time stretched by the pitch ratio and resampled back to
+    its length, one stretched block at a time.
+    """
+    if not len(samples):
+        return np.zeros(samples.shape, dtype=np.float32)
+    factor = 2 ** (semitones / 12)
+    out = np.empty(samples.shape, dtype=np.float32)
+    flat = out.reshape(len(out), -1)
+    pos = 0
+    offset = 0  # index of the first stretched sample in ``previous``
+    previous = np.zeros((0, flat.shape[1]))
+    for block in stretch_blocks(samples, 1 / factor, frame_size, hop, chunk):
+        # keep the last sample of the previous block to interpolate across
+        # the boundary
+        joined = np.concatenate([previous, block])
+        last = offset + len(joined) - 1
+        stop = min(len(out), int(np.floor(last / factor)) + 1)
+        if stop > pos:
+            where = np.arange(pos, stop) * factor - offset
+            grid = np.arange(len(joined))
+            for c in range(flat.shape[1]):
+                flat[pos:stop, c] = np.interp(where, grid, joined[:, c])
+            pos = stop
+        offset += len(joined) - 1
+        previous = joined[-1:]
+    if pos < len(out):
+        flat[pos:] = previous[-1] if len(previous) else 0
+    return out
@@ -1,11 +1,130 @@
-"""Simple CLI utility to play a vocal warmup scale."""
+"""Vocal warm-up exercises rendered gaplessly and played in one stream.
+
+An exercise is a pattern of notes in semitones above a root note, such as a
+scale or an arpeggio, optionally sung back down. It is synthesized in one
+vectorized pass: the frequency of every sample is laid out note by note and
+integrated with a cumulative sum, so the phase of the sine runs on across note
+changes without clicks. Short fades shape the start and end of every run of
+notes between rests. Renders are cached per exercise and sample rate.
+
+NumPy is only imported when rendering, so the command line starts quickly.
+"""
 
 import argparse
-import math
+import functools
+from typing import List, NamedTuple
+
+__all__ = [
+    "ARPEGGIOS",
+    "SCALES",
+    "Exercise",
+    "arpeggio",
+    "notes",
+    "play",
+    "render",
+    "scale",
+    "warmup",
+]
+
+SCALES = {
+    "chromatic": tuple(range(13)),
+    "major": (0, 2, 4, 5, 7, 9, 11, 12),
+    "minor": (0, 2, 3, 5, 7, 8, 10, 12),
+    "pentatonic": (0, 2, 4, 7, 9, 12),
+}
+
+ARPEGGIOS = {
+    "major": (0, 4, 7, 12),
+    "minor": (0, 3, 7, 12),
+    "dominant7": (0, 4, 7, 10, 12),
+}
+
+
+class Exercise(NamedTuple):
+    """Definition of a warm-up exercise."""
+
+    pattern: tuple  # semitones above ``root`` of each note, ``None`` for a rest
+    root: float = 220.0  # Hz
+    note_duration: float = 0.5  # seconds
+    up_down: bool = True  # sing the pattern back down to the first note
+    fade: float = 0.01  # seconds faded in and out around each run of notes
+
+
+def scale(name: str = "major", root: float = 220.0, **kwargs) -> Exercise:
+    """Return an exercise singing the scale ``name`` from ``SCALES``."""
+    if name not in SCALES:
+        raise ValueError(f"unknown scale {name!r}")
+    return Exercise(SCALES[name], root, **kwargs)
+
+
+def arpeggio(name: str = "major", root: float = 220.0, **kwargs) -> Exercise:
+    """Return an exercise singing the arpeggio ``name`` from ``ARPEGGIOS``."""
+    if name not in ARPEGGIOS:
+        raise ValueError(f"unknown arpeggio {name!r}")
+    return Exercise(ARPEGGIOS[name], root, **kwargs)
+
+
+def notes(exercise: Exercise) -> List[float | None]:
+    """Return the frequency of every note of ``exercise``, ``None`` for rests."""
+    pattern = list(exercise.pattern)
+    if exercise.up_down and len(pattern) > 1:
+        pattern += pattern[-2::-1]
+    return [
+        None if step is None else exercise.root * 2 ** (step / 12) for step in pattern
+    ]
+
 
-from . import utils
+def render(exercise: Exercise, samplerate: int = 44100):
+    """Return ``exercise`` as a read-only float32 array of samples.
 
-__all__ = ["warmup"]
+    Results are cached, so playing the same exercise again costs nothing.
+    """
+    exercise = exercise._replace(pattern=tuple(exercise.pattern))
+    return _render(exercise, samplerate)
+
+
+@functools.lru_cache(maxsize=32)
+def _render(exercise: Exercise, samplerate: int):
+    import numpy as np
+
+    freqs = np.array([f or 0.0 for f in notes(exercise)], dtype=np.float64)
+    length = int(round(exercise.note_duration * samplerate))
+    per_sample = np.repeat(freqs, length)
+    # the phase before each sample is the running sum of the frequencies of
+    # the samples before it, which keeps it continuous across notes
+    phase = np.cumsum(per_sample)
+    phase -= per_sample
+    out = np.sin(phase * (2 * np.pi / samplerate))
+
+    sounding = np.concatenate([[False], freqs > 0, [False]])
+    edges = np.flatnonzero(sounding[1:] != sounding[:-1]) * length
+    gain = np.zeros(len(out))
+    for start, end in zip(edges[::2], edges[1::2]):
+        gain[start:end] = 1
+        ramp = min(int(exercise.fade * samplerate), (end - start) // 2)
+        if ramp:
+            fade = np.linspace(0, 1, ramp, endpoint=False)
+            gain[start : start + ramp] = fade
+            gain[end - ramp : end] = fade[::-1]
+    out *= gain
+    out = out.astype(np.float32)
+    out.flags.writeable = False
+    return out
+
+
+def play(exercise: Exercise, samplerate: int = 44100, backend=None) -> None:
+    """Play ``exercise`` through one output stream and wait for it to end.
+
+    ``backend`` may be any ``vocals.backend.AudioBackend`` to play through
+    instead of ``sounddevice``.
+    """
+    from .backend import default_backend
+
+    audio = backend if backend is not None else default_backend()
+    if audio is None:
+        return
+    audio.play(render(exercise, samplerate), samplerate=samplerate)
+    audio.wait()
 
 
 def warmup(
@@ -13,35 +132,54 @@ def warmup(
     steps: int = 8,
     duration: float = 0.5,
     up_down: bool = True,
+    backend=None,
 ) -> None:
-    """Play a warmup scale to help singers get ready."""
+    """Play a chromatic warmup scale to help singers get ready."""
+    play(Exercise(tuple(range(steps)), start_freq, duration, up_down), backend=backend)
+
 
-    freqs = [start_freq * math.pow(2, i / 12) for i in range(steps)]
-    if up_down and steps > 1:
-        freqs += freqs[-2::-1]
-    for f in freqs:
-        utils.beep(f, duration=duration)
+def _parse_pattern(value: str) -> tuple:
+    return tuple(None if step == "-" else float(step) for step in value.split(","))
 
 
 def main() -> None:
-    parser = argparse.ArgumentParser(description="Play a simple warmup scale")
+    parser = argparse.ArgumentParser(description="Play a vocal warmup exercise")
     parser.add_argument(
         "--start", type=float, default=220.0, help="Starting frequency in Hz"
     )
     parser.add_argument("--steps", type=int, default=8, help="Number of semitone steps")
     parser.add_argument(
-        "--duration", type=float, default=0.5, help="Beep duration in seconds"
+        "--duration", type=float, default=0.5, help="Note duration in seconds"
     )
     parser.add_argument(
         "--no-down", action="store_true", help="Don't descend back to the start"
     )
+    parser.add_argument(
+        "--fade", type=float, default=0.01, help="Fade in and out time in seconds"
+    )
+    kind = parser.add_mutually_exclusive_group()
+    kind.add_argument("--scale", choices=sorted(SCALES), help="Sing this scale")
+    kind.add_argument(
+        "--arpeggio", choices=sorted(ARPEGGIOS), help="Sing this arpeggio"
+    )
+    kind.add_argument(
+        "--pattern",
+        type=_parse_pattern,
+        help="Comma separated semitones above the start, '-' for a rest",
+    )
     args = parser.parse_args()
-    warmup(
-        start_freq=args.start,
-        steps=args.steps,
-        duration=args.duration,
-        up_down=not args.no_down,
+
+    options = dict(
+        note_duration=args.duration, up_down=not args.no_down, fade=args.fade
     )
+    if args.scale:
+        exercise = scale(args.scale, args.start, **options)
+    elif args.arpeggio:
+        exercise = arpeggio(args.arpeggio, args.start, **options)
+    else:
+        pattern = args.pattern or tuple(range(args.steps))
+        exercise = Exercise(pattern, args.start, **options)
+    play(exercise)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from vocals import aio, utils
+from vocals.backend import VirtualBackend
+from vocals.multitrack import MultiTrackRecorder
+from vocals.stats import Stats
+
+
+def _ramp(frames):
+    return (np.arange(frames, dtype=np.float32) / frames)[:, None]
+
+
+def test_playrec_records_and_plays():
+    backend = VirtualBackend(source=_ramp(100), blocksize=16, free_run=True)
+    playback = np.full((50, 1), 0.5, dtype=np.float32)
+    recorded = asyncio.run(aio.playrec(backend, 50, 44100, 1, playback))
+    assert np.allclose(recorded, _ramp(100)[:50])
+    heard = backend.captured()
+    assert np.allclose(heard[:50], 0.5) and np.allclose(heard[50:], 0)
+
+
+def test_arecord_matches_record():
+    source = _ramp(400)
+    sync = MultiTrackRecorder(
+        num_tracks=2, samplerate=100, backend=VirtualBackend(source)
+    )
+    sync.tracks[1] = np.full((200, 1), 0.25, dtype=np.float32)
+    sync.record(2, play_tracks=[1])
+
+    backend = VirtualBackend(source, free_run=True)
+    rec = MultiTrackRecorder(num_tracks=2, samplerate=100, backend=backend)
+    rec.tracks[1] = np.full((200, 1), 0.25, dtype=np.float32)
+    asyncio.run(rec.arecord(2, play_tracks=[1]))
+    assert np.array_equal(rec.tracks[0], sync.tracks[0])
+    assert rec.position == 200
+    assert np.allclose(backend.captured()[:200], 0.25)
+    assert rec.undo() and len(rec.tracks[0]) == 0
+
+
+def test_concurrent_sessions_share_the_loop():
+    async def session(value):
+        backend = VirtualBackend(np.full(1000, value), samplerate=100, free_run=True)
+        rec = MultiTrackRecorder(num_tracks=1, samplerate=100, backend=backend)
+        await rec.arecord(5)
+        await rec.aplay()
+        return rec
+
+    async def main():
+        return await asyncio.gather(*(session(v / 10) for v in range(4)))
+
+    for v, rec in enumerate(asyncio.run(main())):
+        assert rec.tracks[0].shape == (500, 1)
+        assert np.allclose(rec.tracks[0], v / 10)
+        assert np.allclose(rec.backend.captured()[:500], v / 10)
+
+
+def test_cancelled_recording_leaves_tracks_unchanged():
+    backend = VirtualBackend(np.ones(1000), samplerate=100, free_run=True)
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=100, backend=backend)
+
+    async def main():
+        task = asyncio.create_task(rec.arecord(10**6))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert len(rec.tracks[0]) == 0 and rec.position == 0
+    assert not backend._streams
+
+
+def test_countdown_is_cancellable(capsys):
+    rec = MultiTrackRecorder(
+        num_tracks=1, samplerate=100, backend=VirtualBackend(free_run=True)
+    )
+
+    async def main():
+        task = asyncio.create_task(rec.arecord(1, countdown=3))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert capsys.readouterr().out == "3\n"
+    assert len(rec.tracks[0]) == 0
+
+
+def test_arecord_take_stores_the_take():
+    backend = VirtualBackend(np.full(100, 0.5), samplerate=10, free_run=True)
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=10, backend=backend)
+    rec.tracks[0] = np.zeros((20, 1), dtype=np.float32)
+    rec.select_range(0.5, 1.5)
+    asyncio.run(rec.arecord_take())
+    assert np.allclose(rec.tracks[0][5:15], 0.5)
+    assert len(rec.list_takes()) == 1
+
+
+def test_abeep_plays_through_the_backend():
+    backend = VirtualBackend(free_run=True)
+    asyncio.run(utils.abeep(440, samplerate=8000, duration=0.1, backend=backend))
+    assert np.allclose(backend.captured()[:800, 0], utils.beep_sound(440, 8000, 0.1))
+
+
+def test_ablocks_iterates_captured_blocks():
+    backend = VirtualBackend(_ramp(100), samplerate=10, blocksize=8, free_run=True)
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=10, backend=backend)
+
+    async def main():
+        return [block async for block in rec.ablocks(duration=5, blocksize=8)]
+
+    blocks = asyncio.run(main())
+    assert [len(b) for b in blocks] == [8] * 6 + [2]
+    assert np.allclose(np.concatenate(blocks), _ramp(100)[:50])
+
+
+def test_ablocks_drops_blocks_for_a_slow_consumer():
+    backend = VirtualBackend(samplerate=10, blocksize=4, free_run=True)
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=10, backend=backend)
+    rec.stats = Stats()
+
+    async def main():
+        async with rec.ablocks(blocksize=4, queue_size=2) as blocks:
+            while blocks.dropped == 0:
+                await asyncio.sleep(0.01)
+            first = await blocks.__anext__()
+        return blocks, first
+
+    blocks, first = asyncio.run(main())
+    assert first.shape == (4, 1)
+    assert rec.stats.overflows == blocks.dropped > 0
+    assert not backend._streams
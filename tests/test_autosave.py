@@ -0,0 +1,219 @@
+import json
+
+import numpy as np
+
+from vocals.autosave import AutosaveService
+from vocals.multitrack import MultiTrackRecorder
+
+
+def _recorder():
+    rec = MultiTrackRecorder(num_tracks=2, samplerate=10)
+    rec.tracks[0] = np.arange(100, dtype=np.float32)[:, None]
+    rec.tracks[1] = np.ones(50, dtype=np.float32)[:, None]
+    return rec
+
+
+def test_save_and_restore(tmp_path):
+    rec = _recorder()
+    service = AutosaveService(rec, str(tmp_path))
+    first = service.save()
+    assert first.bytes_written > 150 * 4
+
+    rec.select_range(1, 2, track_index=0)
+    rec.cut()
+    rec.position = 0
+    rec.paste(track_index=1)
+    service.save()
+
+    restored = MultiTrackRecorder(num_tracks=2, samplerate=10)
+    AutosaveService(restored, str(tmp_path)).restore()
+    assert np.allclose(restored.tracks[0], rec.tracks[0])
+    assert np.allclose(restored.tracks[1], rec.tracks[1])
+
+
+def test_only_dirty_ranges_are_written(tmp_path):
+    rec = _recorder()
+    service = AutosaveService(rec, str(tmp_path))
+    service.save()
+    assert service.save() is None
+
+    rec.take_library.add((0, 10, 20), np.zeros(10, dtype=np.float32))
+    rec.selection = (0, 10, 20)
+    rec.apply_take(0)
+    service.save()
+
+    manifest = json.loads((tmp_path / "session.json").read_text())
+    assert manifest["segments"][-1]["ranges"] == [[0, 10, 20, 0]]
+    assert (tmp_path / manifest["segments"][-1]["file"]).stat().st_size == 40
+
+
+def test_truncation_is_restored(tmp_path):
+    rec = _recorder()
+    service = AutosaveService(rec, str(tmp_path))
+    service.save()
+    rec.select_range(0, 10, track_index=0)
+    rec.cut()
+    rec.seek(5)
+    service.save()
+
+    restored = MultiTrackRecorder(num_tracks=2, samplerate=10)
+    AutosaveService(restored, str(tmp_path)).restore()
+    assert np.allclose(restored.tracks[0][:, 0], np.zeros(50))
+
+
+def test_compaction_drops_old_segments(tmp_path):
+    rec = _recorder()
+    service = AutosaveService(rec, str(tmp_path), max_segments=2)
+    for i in range(4):
+        rec.tracks[0][i] = -1
+        rec._mark_dirty(0, i, i + 1)
+        service.save()
+    manifest = json.loads((tmp_path / "session.json").read_text())
+    assert len(manifest["segments"]) <= 2
+    files = sorted(p.name for p in tmp_path.glob("seg-*.bin"))
+    assert files == sorted(s["file"] for s in manifest["segments"])
+
+
+def test_background_thread_flushes_on_stop(tmp_path):
+    rec = _recorder()
+    service = AutosaveService(rec, str(tmp_path), interval=0.01)
+    service.start()
+    rec.tracks[1][:] = 3
+    rec._mark_dirty(1, 0, 50)
+    service.stop()
+    assert service.metrics
+    assert all(m.latency >= 0 for m in service.metrics)
+
+    restored = MultiTrackRecorder(num_tracks=2, samplerate=10)
+    AutosaveService(restored, str(tmp_path)).restore()
+    assert np.allclose(restored.tracks[1][:, 0], 3)
+
+
+def test_each_service_writes_a_full_base(tmp_path):
+    rec = _recorder()
+    first = AutosaveService(rec, str(tmp_path / "a"))
+    first.save()
+    rec.tracks[0][3] = -1
+    rec._mark_dirty(0, 3, 4)
+    first.save()
+
+    restored = MultiTrackRecorder(num_tracks=2, samplerate=10)
+    AutosaveService(restored, str(tmp_path / "a")).restore()
+    second = AutosaveService(restored, str(tmp_path / "b"))
+    second.save()
+    # the first service's journal is not drained by the second one
+    assert first.save() is None
+
+    again = MultiTrackRecorder(num_tracks=2, samplerate=10)
+    AutosaveService(again, str(tmp_path / "b")).restore()
+    assert np.allclose(again.tracks[0], rec.tracks[0])
+    assert np.allclose(again.tracks[1], rec.tracks[1])
+
+
+def test_saves_stay_consistent_during_edits(tmp_path):
+    import threading
+
+    rec = _recorder()
+    service = AutosaveService(rec, str(tmp_path), interval=0.001)
+    service.start()
+
+    def edit():
+        for i in range(200):
+            rec.selection = (0, i % 20, i % 20 + 5)
+            rec.cut()
+            rec.position = i % 30
+            rec.paste(track_index=i % 2)
+
+    editor = threading.Thread(target=edit)
+    editor.start()
+    editor.join()
+    service.stop()
+
+    restored = MultiTrackRecorder(num_tracks=2, samplerate=10)
+    AutosaveService(restored, str(tmp_path)).restore()
+    assert np.array_equal(restored.tracks[0], rec.tracks[0])
+    assert np.array_equal(restored.tracks[1], rec.tracks[1])
+
+
+def test_channel_layout_change_forces_full_save(tmp_path):
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=10, channels=2)
+    rec.tracks[0] = np.ones((20, 2), dtype=np.float32)
+    service = AutosaveService(rec, str(tmp_path))
+    service.save()
+    with rec.lock:
+        rec.tracks[0] = np.full((30, 1), 0.5, dtype=np.float32)
+        rec._mark_dirty(0, 0, 30)
+    service.save()
+    assert len(service._segments) == 1
+
+    restored = MultiTrackRecorder(num_tracks=1, samplerate=10, channels=2)
+    AutosaveService(restored, str(tmp_path)).restore()
+    assert np.array_equal(restored.tracks[0], rec.tracks[0])
+
+
+def test_sparse_silence_is_not_written(tmp_path):
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=10, sparse_silence=True)
+    track = np.zeros((20000, 1), dtype=np.float32)
+    track[:100] = 1
+    track[12000:12010] = 2
+    rec.tracks[0] = track
+    service = AutosaveService(rec, str(tmp_path))
+    first = service.save()
+    assert first.bytes_written < 2 * 4096 * 4 + 1000
+
+    rec.tracks[0][:100] = 0
+    rec._mark_dirty(0, 0, 100)
+    service.save()
+    manifest = json.loads((tmp_path / "session.json").read_text())
+    assert manifest["segments"][-1]["ranges"] == [[0, 0, 100, -1]]
+
+    restored = MultiTrackRecorder(num_tracks=1, samplerate=10)
+    AutosaveService(restored, str(tmp_path)).restore()
+    assert np.array_equal(restored.tracks[0], rec.tracks[0])
+
+
+def test_restore_clears_the_undo_history(tmp_path):
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=1)
+    rec.clipboard = np.arange(1, 7, dtype=np.float32)[:, None]
+    rec.paste(track_index=0)
+    service = AutosaveService(rec, str(tmp_path))
+    service.save()
+    rec.select_range(1, 3, track_index=0)
+    rec.cut()
+
+    service.restore()
+    assert rec.tracks[0][:, 0].tolist() == [1, 2, 3, 4, 5, 6]
+    assert not rec.undo()
+    assert rec.tracks[0][:, 0].tolist() == [1, 2, 3, 4, 5, 6]
+
+
+def test_save_copies_in_chunks_outside_the_lock(tmp_path):
+    import threading
+
+    class CountingLock:
+        def __init__(self):
+            self.lock = threading.RLock()
+            self.acquired = 0
+
+        def __enter__(self):
+            self.lock.acquire()
+            self.acquired += 1
+
+        def __exit__(self, *exc):
+            self.lock.release()
+
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=10, sparse_silence=True)
+    track = np.random.default_rng(0).standard_normal((50000, 1))
+    track[4096:8192] = 0
+    rec.tracks[0] = track.astype(np.float32)
+    rec.lock = CountingLock()
+    service = AutosaveService(rec, str(tmp_path), chunk_bytes=4096 * 4)
+    service.save()
+    # one acquisition to drain the journal and one per 4096 frame chunk
+    assert rec.lock.acquired == 1 + 13
+    manifest = json.loads((tmp_path / "session.json").read_text())
+    assert [0, 4096, 8192, -1] in manifest["segments"][-1]["ranges"]
+
+    restored = MultiTrackRecorder(num_tracks=1, samplerate=10)
+    AutosaveService(restored, str(tmp_path)).restore()
+    assert np.array_equal(restored.tracks[0], rec.tracks[0])
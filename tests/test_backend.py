@@ -0,0 +1,140 @@
+import importlib
+import sys
+import threading
+import types
+import wave
+
+import numpy as np
+import pytest
+
+from vocals import pcm
+from vocals.backend import VirtualBackend, sine_source
+from vocals.multitrack import MultiTrackRecorder
+
+
+def test_blocking_rec_and_playrec():
+    data = np.arange(10, dtype=np.float32)
+    backend = VirtualBackend(source=data, blocksize=3)
+    recorded = backend.rec(4, samplerate=10, channels=1)
+    assert np.allclose(recorded[:, 0], [0, 1, 2, 3])
+
+    play = np.ones((4, 1), dtype=np.float32)
+    recorded = backend.playrec(play, samplerate=10, channels=1)
+    assert np.allclose(recorded[:, 0], [6, 7, 8, 9])
+    assert np.allclose(backend.captured()[:4, 0], 1)
+
+
+def test_streams_advance_in_sleep_with_xruns():
+    backend = VirtualBackend(source=np.ones(100), blocksize=10, xruns={1})
+    blocks = []
+    flags = []
+
+    def callback(indata, frames, time_info, status):
+        blocks.append(indata.copy())
+        flags.append(bool(status))
+
+    with backend.InputStream(samplerate=100, channels=2, callback=callback):
+        assert blocks == []
+        backend.sleep(300)
+    assert len(blocks) == 3
+    assert blocks[0].shape == (10, 2)
+    assert flags == [False, True, False]
+    assert np.allclose(blocks[1], 0) and np.allclose(blocks[2], 1)
+    assert backend.xrun_count == 1
+
+
+def test_free_running_stream_until_callback_stop():
+    backend = VirtualBackend(source=sine_source(5, samplerate=100), free_run=True)
+    done = threading.Event()
+    seen = []
+
+    def callback(indata, outdata, frames, time_info, status):
+        outdata[:] = indata
+        seen.append(frames)
+        if len(seen) == 50:
+            raise backend.CallbackStop
+
+    with backend.Stream(
+        samplerate=100,
+        blocksize=4,
+        channels=1,
+        callback=callback,
+        finished_callback=done.set,
+    ):
+        assert done.wait(5)
+    assert len(seen) == 50
+    out = backend.captured()[:, 0]
+    assert np.allclose(
+        out, 0.5 * np.sin(2 * np.pi * 5 * np.arange(200) / 100), atol=1e-6
+    )
+
+
+def test_recorder_on_virtual_backend():
+    backend = VirtualBackend(
+        source=np.arange(8, dtype=np.float32), blocksize=2, loop=True
+    )
+    rec = MultiTrackRecorder(num_tracks=2, samplerate=4, backend=backend)
+    rec.record(duration=1)
+    assert np.allclose(rec.tracks[0][:, 0], [0, 1, 2, 3])
+    rec.select_track(1)
+    rec.record(duration=1, play_tracks=[0])
+    assert np.allclose(rec.tracks[1][:, 0], [4, 5, 6, 7])
+    assert np.allclose(backend.captured()[:4, 0], [0, 1, 2, 3])
+
+    rec.select_range(0, 1, track_index=0)
+    assert rec.loop_record(passes=2) == [0, 1]
+    assert len(rec.list_takes()) == 2
+
+
+def test_record_to_file_on_virtual_backend(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "sounddevice", types.SimpleNamespace())
+    record = importlib.import_module("vocals.record")
+    source = tmp_path / "in.wav"
+    data = (np.sin(np.arange(400) / 5) * 0.5).astype(np.float32)
+    with wave.open(str(source), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(100)
+        wf.writeframes((data * 32767).astype("<i2").tobytes())
+
+    backend = VirtualBackend(source=str(source), samplerate=100, blocksize=16)
+    out = tmp_path / "out.wav"
+    record.record_to_file(str(out), duration=2, samplerate=100, backend=backend)
+    with wave.open(str(out), "rb") as wf:
+        result = np.frombuffer(wf.readframes(wf.getnframes()), dtype="<i2") / 32767
+    assert len(result) == 200
+    assert np.allclose(result, data[:200], atol=1e-4)
+
+
+def test_record_to_file_metronome_is_virtual(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "sounddevice", types.SimpleNamespace())
+    record = importlib.import_module("vocals.record")
+    backend = VirtualBackend(source=np.ones(1000), samplerate=100, blocksize=10)
+    backend.xruns = {0}
+    out = tmp_path / "out.wav"
+    record.record_to_file(
+        str(out), duration=3, samplerate=100, metronome_bpm=120, backend=backend
+    )
+    with wave.open(str(out), "rb") as wf:
+        result = np.frombuffer(wf.readframes(wf.getnframes()), dtype="<i2") / 32767
+    assert len(result) == 300
+    # beeps are not stream blocks, so only the first input block was dropped
+    assert np.allclose(result[:10], 0) and np.allclose(result[10:], 1, atol=1e-4)
+    assert backend.xrun_count == 1
+    assert len(backend.captured()) >= 6 * 5
+
+
+@pytest.mark.parametrize("bits", [16, 24, 32])
+def test_wav_source_uses_the_file_sample_width(tmp_path, bits):
+    data = (np.sin(np.arange(200) / 5) * 0.5).astype(np.float32)
+    source = tmp_path / "in.wav"
+    with wave.open(str(source), "wb") as wf:
+        wf.setnchannels(2)
+        wf.setsampwidth(bits // 8)
+        wf.setframerate(100)
+        wf.writeframes(pcm.encode(np.repeat(data, 2), bits=bits))
+
+    backend = VirtualBackend(source=str(source), samplerate=100)
+    assert np.allclose(backend._read_input(200, 2), data[:, None], atol=1e-4)
+    with pytest.raises(ValueError, match="100 Hz"):
+        VirtualBackend(source=str(source), samplerate=44100)
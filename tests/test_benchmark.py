@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from vocals import benchmark
+
+
+def test_quick_run_times_selected_cases():
+    results = benchmark.run("mix", repeat=1, quick=True)
+    assert sorted(results) == [
+        "mix.mix_tracks[tracks=2]",
+        "mix.mix_tracks[tracks=32]",
+        "mix.mix_tracks[tracks=8]",
+    ]
+    assert all(seconds > 0 for seconds in results.values())
+
+
+def test_compare_flags_slowdowns_over_threshold():
+    baseline = {"a": 1.0, "b": 1.0, "gone": 1.0}
+    current = {"a": 1.2, "b": 1.5, "new": 9.0}
+    regressions = benchmark.compare(baseline, current, threshold=0.25)
+    assert [r.name for r in regressions] == ["b"]
+    assert regressions[0].ratio == 1.5
+
+
+def test_cli_saves_and_compares_baseline(tmp_path, capsys):
+    path = tmp_path / "baseline.json"
+    argv = ["-k", "io.import", "--quick", "--repeat", "1"]
+    assert benchmark.main(argv + ["--save", str(path)]) == 0
+    saved = json.loads(path.read_text())
+    assert set(saved["results"]) == {
+        "io.import_wav[seconds=10]",
+        "io.import_wav[seconds=60]",
+    }
+
+    saved["results"] = {name: 1e-9 for name in saved["results"]}
+    path.write_text(json.dumps(saved))
+    assert benchmark.main(argv + ["--compare", str(path)]) == 1
+    assert "REGRESSION io.import_wav" in capsys.readouterr().err
+
+
+def test_startup_budget_is_relative_to_the_interpreter():
+    results = {
+        "startup.python": 0.02,
+        "startup.import[vocals]": 0.05,
+        "startup.cli[record --version]": 0.2,
+        "mix.mix_tracks[tracks=2]": 1.0,
+    }
+    slow = benchmark.over_budget(results, budget=0.075)
+    assert list(slow) == ["startup.cli[record --version]"]
+    assert slow["startup.cli[record --version]"] == pytest.approx(0.18)
+    del results["startup.python"]
+    assert benchmark.over_budget(results) == {}
+
+
+def test_startup_cases_run_the_entry_points():
+    results = benchmark.run("startup.", repeat=1)
+    assert set(results) == {
+        "startup.python",
+        "startup.import[vocals]",
+        "startup.cli[record --version]",
+        "startup.cli[warmup --help]",
+    }
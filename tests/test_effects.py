@@ -0,0 +1,127 @@
+import numpy as np
+import pytest
+
+from vocals import effects
+from vocals.effects import Biquad, Compressor, EffectChain, Gain
+from vocals.multitrack import MultiTrackRecorder
+
+
+@pytest.fixture(params=["kernels", "numpy"])
+def impl(request, monkeypatch):
+    if request.param == "numpy":
+        monkeypatch.setattr(effects, "_kernels", None)
+    elif effects._kernels is None:
+        pytest.skip("kernels extension not built")
+    return request.param
+
+
+def _tone(freq, samplerate=8000, seconds=1.0, channels=1):
+    t = np.arange(int(samplerate * seconds)) / samplerate
+    tone = np.sin(2 * np.pi * freq * t).astype(np.float32)
+    return np.repeat(tone[:, None], channels, axis=1)
+
+
+def _rms(samples):
+    return float(np.sqrt(np.mean(np.square(samples[len(samples) // 2 :]))))
+
+
+def test_lowpass_attenuates_high_frequencies(impl):
+    low = Biquad("lowpass", 500, samplerate=8000)
+    assert _rms(low.process(_tone(100))) == pytest.approx(0.707, rel=0.05)
+    low.reset()
+    assert _rms(low.process(_tone(3000))) < 0.05
+
+
+def test_peaking_and_shelf_gain_at_center(impl):
+    peak = Biquad("peaking", 1000, samplerate=8000, q=1.0, gain_db=6.0)
+    assert _rms(peak.process(_tone(1000))) == pytest.approx(0.707 * 2, rel=0.02)
+    shelf = Biquad("highshelf", 1000, samplerate=8000, gain_db=-6.0)
+    assert _rms(shelf.process(_tone(3500))) == pytest.approx(0.707 / 2, rel=0.05)
+
+
+def test_blocks_match_a_single_pass(impl):
+    samples = np.random.default_rng(0).standard_normal((1000, 2)).astype(np.float32)
+    whole = EffectChain([Biquad("highpass", 200, 8000), Compressor(samplerate=8000)])
+    expected = whole.process(samples.copy())
+    blocked = EffectChain(
+        [Biquad("highpass", 200, 8000), Compressor(samplerate=8000)], blocksize=64
+    )
+    assert np.allclose(blocked.render(samples), expected, atol=1e-5)
+
+
+def test_compressor_reduces_loud_signals(impl):
+    comp = Compressor(threshold_db=-20, ratio=4, attack=0.001, samplerate=8000)
+    loud = comp.process(_tone(200) * 1.0)
+    # 20 dB over the threshold comes out 5 dB over it
+    assert np.abs(loud[4000:]).max() == pytest.approx(10 ** (-15 / 20), rel=0.1)
+    comp.reset()
+    quiet = 0.01 * _tone(200)
+    assert np.allclose(comp.process(quiet.copy()), quiet)
+    with pytest.raises(ValueError):
+        Compressor(ratio=0.5)
+
+
+def test_biquad_rejects_invalid_settings():
+    with pytest.raises(ValueError):
+        Biquad("bandstop", 1000)
+    with pytest.raises(ValueError):
+        Biquad("lowpass", 30000, samplerate=44100)
+
+
+def test_track_effects_apply_when_mixing():
+    rec = MultiTrackRecorder(num_tracks=2, samplerate=10)
+    rec.tracks[0] = np.ones((10, 1), dtype=np.float32)
+    rec.tracks[1] = np.ones((10, 1), dtype=np.float32)
+    rec.set_effects(0, EffectChain([Gain(-6.0206)]))
+    assert np.allclose(rec.mix_tracks()[:, 0], 1.5, atol=1e-4)
+    assert np.allclose(rec.tracks[0], 1)
+
+
+def test_frozen_track_renders_once_until_edited():
+    class Counting(Gain):
+        renders = 0
+
+        def reset(self):
+            Counting.renders += 1
+
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=10)
+    rec.tracks[0] = np.ones((20, 1), dtype=np.float32)
+    rec.set_effects(0, EffectChain([Counting(6.0206)]))
+    rec.freeze_track(0)
+    assert Counting.renders == 1
+    rec.mix_tracks()
+    rec.seek(0)
+    rec.mix_tracks()
+    assert Counting.renders == 1
+    assert np.allclose(rec.mix_tracks(), 2, atol=1e-3)
+
+    rec.select_range(0, 1)
+    rec.cut()
+    mix = rec.mix_tracks()
+    assert Counting.renders == 2 and len(mix) == 10
+    rec.unfreeze_track(0)
+    rec.mix_tracks()
+    assert Counting.renders == 3
+
+
+def test_record_multi_monitors_through_the_chain():
+    from vocals.backend import VirtualBackend
+
+    backend = VirtualBackend(source=np.full((40, 1), 0.5), samplerate=10, blocksize=4)
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=10, channels=2, backend=backend)
+    rec.set_effects(0, EffectChain([Gain(6.0206)]))
+    rec.set_pan(0, -1)
+    rec.record_multi([0], duration=2, monitor=True)
+    # the dry input is recorded, the processed one is heard on the left
+    assert np.allclose(rec.tracks[0], 0.5)
+    heard = backend.captured()[:20]
+    assert np.allclose(heard[:, 0], 1, atol=1e-3)
+    assert np.allclose(heard[:, 1], 0)
+
+
+def test_effects_must_implement_process():
+    class Incomplete(effects.Effect):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from vocals.features import FeatureIndex, take_features
+from vocals.multitrack import MultiTrackRecorder
+
+SR = 44100
+
+
+def _tone(freq, seconds=0.5, amp=0.5):
+    t = np.arange(int(SR * seconds)) / SR
+    return (amp * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_take_features():
+    tone = _tone(440)
+    tone[:5] = 1.0
+    feats = take_features(tone, samplerate=SR)
+    assert len(feats.rms) == len(feats.pitch)
+    assert feats.clipped == 5
+    assert feats.tuning < 40
+    assert np.nanmedian(feats.pitch) == pytest.approx(440, rel=0.02)
+
+
+def test_rank_by_tuning_and_clipping():
+    index = FeatureIndex(samplerate=SR)
+    sharp = _tone(110 * 2 ** (40 / 1200))
+    in_tune = _tone(110)
+    clipped = np.clip(_tone(110, amp=2.0), -1, 1)
+    for i, take in enumerate([sharp, in_tune, clipped]):
+        index.add("r", str(i), take)
+    assert index.rank("r", by="tuning")[-1] == 0
+    assert index.rank("r", by="clipped")[-1] == 2
+
+
+def test_recorder_closest_take():
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=SR)
+    rec.tracks[0] = _tone(330)[:, None]
+    rec.select_range(0, 0.5)
+    for freq in (220, 330, 440):
+        rec.take_library.add(rec.selection, _tone(freq)[:, None])
+    assert rec.closest_takes()[0] == 1
+    assert sorted(rec.rank_takes()) == [0, 1, 2]
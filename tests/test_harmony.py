@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from vocals import harmony, utils
+from vocals.multitrack import MultiTrackRecorder
+
+SAMPLERATE = 22050
+
+
+def _voice(note, seconds=1.0):
+    freq = utils.note_to_freq(note)
+    t = np.arange(int(SAMPLERATE * seconds)) / SAMPLERATE
+    harmonics = [0.5 / h * np.sin(2 * np.pi * freq * h * t) for h in (1, 2, 3)]
+    return np.sum(harmonics, axis=0).astype(np.float32)
+
+
+def _session(*voices):
+    return [np.concatenate([_voice(n) for n in notes]) for notes in voices]
+
+
+def test_chroma_of_all_tracks():
+    tracks = [_voice("A4"), _voice("C4", 0.5)]
+    features = harmony.chroma(tracks, SAMPLERATE, frame_size=2048, hop=1024)
+    assert features.shape == (2, 20, 12)
+    assert np.all(features[0].argmax(axis=1) == 9)
+    assert np.all(features[1, :9].argmax(axis=1) == 0)
+    assert np.all(features[1, 10:] == 0)
+    assert harmony.chroma([np.zeros(10)], SAMPLERATE).shape == (1, 0, 12)
+
+
+def test_chord_timeline():
+    tracks = _session(["C4", "A3"], ["E4", "C4"], ["G4", "E4"])
+    segments = harmony.analyse(tracks, SAMPLERATE)
+    assert [s.chord for s in segments] == ["C", "Am"]
+    assert segments[0].notes == ("C", "E", "G")
+    assert segments[1].intervals == (0, 3, 7)
+    assert harmony.INTERVAL_NAMES[segments[1].intervals[1]] == "minor third"
+    assert segments[0].start == 0 and segments[1].start == pytest.approx(1, abs=0.1)
+    assert segments[-1].end == pytest.approx(2, abs=0.2)
+
+
+def test_silent_tracks_and_unclear_chords():
+    tracks = _session(["C4", "C4"], ["E4", "C#4"])
+    tracks.append(np.zeros(len(tracks[0]), dtype=np.float32))
+    segments = harmony.analyse(tracks, SAMPLERATE)
+    assert segments[0].notes == ("C", "E", None)
+    assert segments[0].intervals == (0, 4, None)
+    assert segments[-1].chord is None and segments[-1].intervals[1] == 1
+
+
+def test_recorder_harmony():
+    rec = MultiTrackRecorder(num_tracks=3, samplerate=SAMPLERATE)
+    for t, note in enumerate(["D4", "F#4", "A4"]):
+        rec.tracks[t] = _voice(note)[:, None]
+    assert [s.chord for s in rec.harmony()] == ["D"]
+    assert rec.harmony([0, 2])[0].intervals == (0, 7)
+    with pytest.raises(ValueError):
+        rec.harmony([3])
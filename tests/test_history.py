@@ -0,0 +1,140 @@
+import numpy as np
+
+from vocals.history import EditHistory, Splice
+from vocals.multitrack import MultiTrackRecorder
+
+
+def _recorder(**kwargs):
+    rec = MultiTrackRecorder(num_tracks=2, samplerate=1, **kwargs)
+    rec.tracks[0] = np.array([1, 2, 3, 4], dtype=np.float32)[:, None]
+    rec.tracks[1] = np.array([5, 6], dtype=np.float32)[:, None]
+    return rec
+
+
+def test_undo_redo_cut_paste():
+    rec = _recorder()
+    rec.select_range(1, 3, track_index=0)
+    rec.cut()
+    rec.position = 1
+    rec.paste(track_index=1)
+    assert np.allclose(rec.tracks[1][:, 0], [5, 2, 3, 6])
+
+    assert rec.undo()
+    assert np.allclose(rec.tracks[1][:, 0], [5, 6])
+    assert rec.undo()
+    assert np.allclose(rec.tracks[0][:, 0], [1, 2, 3, 4])
+    assert not rec.undo()
+
+    assert rec.redo()
+    assert np.allclose(rec.tracks[0][:, 0], [1, 4])
+    assert rec.redo()
+    assert np.allclose(rec.tracks[1][:, 0], [5, 2, 3, 6])
+    assert not rec.redo()
+
+
+def test_move_is_a_single_step():
+    rec = _recorder()
+    rec.select_range(1, 3, track_index=0)
+    rec.move(to_track_index=1, position_seconds=2)
+    rec.undo()
+    assert np.allclose(rec.tracks[0][:, 0], [1, 2, 3, 4])
+    assert np.allclose(rec.tracks[1][:, 0], [5, 6])
+
+
+def test_undo_apply_take_and_import(tmp_path):
+    rec = _recorder()
+    rec.take_library.add((0, 1, 3), np.array([9, 9], dtype=np.float32))
+    rec.selection = (0, 1, 3)
+    rec.apply_take(0)
+    assert np.allclose(rec.tracks[0][:, 0], [1, 9, 9, 4])
+    rec.undo()
+    assert np.allclose(rec.tracks[0][:, 0], [1, 2, 3, 4])
+
+    rec.export_audio(str(tmp_path / "t.wav"), track_indices=[1])
+    rec.import_audio(str(tmp_path / "t.wav"), track_index=0)
+    assert len(rec.tracks[0]) == 2
+    rec.undo()
+    assert np.allclose(rec.tracks[0][:, 0], [1, 2, 3, 4])
+
+
+def test_new_edit_clears_redo():
+    rec = _recorder()
+    rec.select_range(0, 1, track_index=0)
+    rec.cut()
+    rec.undo()
+    rec.select_range(0, 1, track_index=1)
+    rec.cut()
+    assert not rec.history.can_redo
+
+
+def test_history_evicts_oldest_entries():
+    history = EditHistory(max_bytes=32)
+    data = np.zeros(2, dtype=np.float32)
+    for i in range(4):
+        history.record(Splice(0, i, data, data))
+    assert history.nbytes <= 32
+    assert history.pop_undo()[0].start == 3
+    assert history.pop_undo()[0].start == 2
+    assert history.pop_undo() is None
+
+
+def test_undo_removes_padding_added_by_edits():
+    rec = _recorder()
+    rec.clipboard = np.array([7], dtype=np.float32)
+    rec.position = 5
+    rec.paste(track_index=1)
+    assert np.allclose(rec.tracks[1][:, 0], [5, 6, 0, 0, 0, 7])
+    rec.undo()
+    assert np.allclose(rec.tracks[1][:, 0], [5, 6])
+    rec.redo()
+    assert np.allclose(rec.tracks[1][:, 0], [5, 6, 0, 0, 0, 7])
+
+
+def test_recorded_views_are_not_kept_whole(monkeypatch):
+    class StereoSD:
+        def rec(self, frames, samplerate=44100, channels=1, dtype="float32"):
+            return np.ones((frames, 2), dtype=np.float32)
+
+        def wait(self):
+            pass
+
+    monkeypatch.setattr("vocals.multitrack.sd", StereoSD())
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=100)
+    rec.record(duration=1)
+    inserted = rec.history._undo[-1][-1].inserted
+    assert inserted.base is None and rec.history.nbytes == 100 * 4
+    rec.undo()
+    assert len(rec.tracks[0]) == 0
+
+
+def test_undo_record_past_end_restores_length(monkeypatch):
+    class SD:
+        def rec(self, frames, samplerate=44100, channels=1, dtype="float32"):
+            return np.ones((frames, channels), dtype=np.float32)
+
+        def wait(self):
+            pass
+
+    monkeypatch.setattr("vocals.multitrack.sd", SD())
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=4)
+    rec.tracks[0] = np.array([1, 2], dtype=np.float32)[:, None]
+    rec.position = 1
+    rec.record(duration=1)
+    assert np.allclose(rec.tracks[0][:, 0], [1, 1, 1, 1, 1])
+    rec.undo()
+    assert np.allclose(rec.tracks[0][:, 0], [1, 2])
+    rec.position = 4
+    rec.record(duration=1)
+    assert np.allclose(rec.tracks[0][:, 0], [1, 2, 0, 0, 1, 1, 1, 1])
+    rec.undo()
+    assert np.allclose(rec.tracks[0][:, 0], [1, 2])
+
+
+def test_sparse_silence_is_not_kept_in_history():
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=10, sparse_silence=True)
+    rec.tracks[0] = np.zeros((100, 1), dtype=np.float32)
+    rec.select_range(2, 5)
+    rec.cut()
+    assert rec.history.nbytes == 0
+    rec.undo()
+    assert len(rec.tracks[0]) == 100
@@ -34,11 +34,11 @@ def test_record_and_play(monkeypatch):
     monkeypatch.setattr("vocals.multitrack.sd", sd_dummy)
     rec = MultiTrackRecorder(num_tracks=1, samplerate=4)
     rec.record(duration=1)
-    assert np.allclose(rec.tracks[0], sd_dummy.data)
+    assert np.allclose(rec.tracks[0][:, 0], sd_dummy.data)
     rec.seek(0)
     rec.play()
     assert sd_dummy.play_called
-    assert np.allclose(sd_dummy.play_data, sd_dummy.data)
+    assert np.allclose(sd_dummy.play_data[:, 0], sd_dummy.data)
 
 
 def test_record_with_metronome(monkeypatch):
@@ -61,22 +61,24 @@ def test_record_with_metronome(monkeypatch):
 
 def test_copy_paste_between_tracks():
     rec = MultiTrackRecorder(num_tracks=2, samplerate=1)
-    rec.tracks[0] = np.array([1, 2, 3, 4], dtype=np.float32)
+    rec.tracks[0] = np.array([1, 2, 3, 4], dtype=np.float32)[:, None]
     rec.select_range(1, 3, track_index=0)
     rec.copy()
     rec.position = 4
     rec.paste(track_index=0)
-    assert np.allclose(rec.tracks[0], np.array([1, 2, 3, 4, 2, 3], dtype=np.float32))
+    assert np.allclose(
+        rec.tracks[0][:, 0], np.array([1, 2, 3, 4, 2, 3], dtype=np.float32)
+    )
 
 
 def test_cut_move_to_other_track():
     rec = MultiTrackRecorder(num_tracks=2, samplerate=1)
-    rec.tracks[0] = np.array([1, 2, 3, 4], dtype=np.float32)
-    rec.tracks[1] = np.array([5, 6], dtype=np.float32)
+    rec.tracks[0] = np.array([1, 2, 3, 4], dtype=np.float32)[:, None]
+    rec.tracks[1] = np.array([5, 6], dtype=np.float32)[:, None]
     rec.select_range(1, 3, track_index=0)
     rec.move(to_track_index=1, position_seconds=2)
-    assert np.allclose(rec.tracks[0], np.array([1, 4], dtype=np.float32))
-    assert np.allclose(rec.tracks[1], np.array([5, 6, 2, 3], dtype=np.float32))
+    assert np.allclose(rec.tracks[0][:, 0], np.array([1, 4], dtype=np.float32))
+    assert np.allclose(rec.tracks[1][:, 0], np.array([5, 6, 2, 3], dtype=np.float32))
 
 
 def test_import_export_wav(tmp_path):
@@ -92,7 +94,7 @@ def test_import_export_wav(tmp_path):
 
     rec = MultiTrackRecorder(num_tracks=1, samplerate=44100)
     rec.import_audio(str(filename))
-    assert np.allclose(rec.tracks[0], data, atol=1e-4)
+    assert np.allclose(rec.tracks[0][:, 0], data, atol=1e-4)
 
     out = tmp_path / "mix.wav"
     rec.export_audio(str(out))
@@ -102,6 +104,27 @@ def test_import_export_wav(tmp_path):
     assert np.allclose(result, data, atol=1e-4)
 
 
+def test_export_clips_and_writes_24_bit(tmp_path):
+    import wave
+
+    rec = MultiTrackRecorder(num_tracks=2, samplerate=44100)
+    rec.tracks[0] = np.array([0.8, -0.8, 0.25], dtype=np.float32)[:, None]
+    rec.tracks[1] = np.array([0.8, -0.8, 0.25], dtype=np.float32)[:, None]
+    out = tmp_path / "mix.wav"
+    rec.export_audio(str(out))
+    with wave.open(str(out), "rb") as wf:
+        result = np.frombuffer(wf.readframes(3), dtype="<i2")
+    # the sum exceeds full scale and is clipped instead of wrapping around
+    assert list(result) == [32767, -32767, 16384]
+
+    out = tmp_path / "mix24.wav"
+    rec.export_audio(str(out), track_indices=[0], bits=24)
+    with wave.open(str(out), "rb") as wf:
+        assert wf.getsampwidth() == 3
+    rec.import_audio(str(out), track_index=1)
+    assert np.allclose(rec.tracks[1], rec.tracks[0], atol=1e-6)
+
+
 def test_playback_during_record(monkeypatch):
     # track 0 provides playback material while recording track 1
     record_data = np.array([10, 11, 12, 13], dtype=np.float32)
@@ -109,12 +132,12 @@ def test_playback_during_record(monkeypatch):
     monkeypatch.setattr("vocals.multitrack.sd", sd_dummy)
 
     rec = MultiTrackRecorder(num_tracks=2, samplerate=4)
-    rec.tracks[0] = np.array([1, 2, 3, 4], dtype=np.float32)
+    rec.tracks[0] = np.array([1, 2, 3, 4], dtype=np.float32)[:, None]
     rec.select_track(1)
     rec.record(duration=1, play_tracks=[0])
 
-    assert np.allclose(rec.tracks[1], record_data)
-    assert np.allclose(sd_dummy.play_data[:, 0], rec.tracks[0])
+    assert np.allclose(rec.tracks[1][:, 0], record_data)
+    assert np.allclose(sd_dummy.play_data[:, 0], rec.tracks[0][:, 0])
 
 
 def test_countdown_with_playback(monkeypatch):
@@ -131,13 +154,13 @@ def test_countdown_with_playback(monkeypatch):
     )
 
     rec = MultiTrackRecorder(num_tracks=2, samplerate=4)
-    rec.tracks[0] = np.array([1, 1, 1, 1], dtype=np.float32)
+    rec.tracks[0] = np.array([1, 1, 1, 1], dtype=np.float32)[:, None]
     rec.select_track(1)
     rec.record(duration=1, countdown=2, play_tracks=[0])
 
     assert sleeps == [1, 1]
     assert beeps == [880, 660]
-    assert np.allclose(sd_dummy.play_data[:, 0], rec.tracks[0])
+    assert np.allclose(sd_dummy.play_data[:, 0], rec.tracks[0][:, 0])
 
 
 def test_pitch_range_method():
@@ -165,3 +188,275 @@ def test_reference_beep(monkeypatch):
     rec = MultiTrackRecorder(num_tracks=1, samplerate=4)
     rec.record(duration=1, reference_freq=330.0)
     assert beeps[-1] == 330.0
+
+
+class DuplexSD:
+    """Fake ``sounddevice`` running a duplex callback over ``data`` in blocks."""
+
+    class CallbackStop(Exception):
+        pass
+
+    def __init__(self, data, blocksize):
+        self.data = data
+        self.blocksize = blocksize
+        self.output = []
+
+    def Stream(
+        self, samplerate, blocksize, channels, dtype, callback, finished_callback
+    ):
+        sd = self
+
+        class Stream:
+            def __enter__(self):
+                for i in range(0, len(sd.data), sd.blocksize):
+                    block = sd.data[i : i + sd.blocksize].reshape(-1, channels)
+                    out = np.full((len(block), channels), np.nan, dtype=np.float32)
+                    try:
+                        callback(block, out, len(block), None, None)
+                    except sd.CallbackStop:
+                        sd.output.append(out)
+                        break
+                    sd.output.append(out)
+                finished_callback()
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+        return Stream()
+
+
+def test_loop_record_gapless_passes(monkeypatch):
+    sd_dummy = DuplexSD(np.arange(20, dtype=np.float32), blocksize=3)
+    monkeypatch.setattr("vocals.multitrack.sd", sd_dummy)
+    rec = MultiTrackRecorder(num_tracks=2, samplerate=1)
+    rec.tracks[0] = np.array([1, 2, 3, 4], dtype=np.float32)[:, None]
+    rec.select_range(0, 4, track_index=1)
+
+    assert rec.loop_record(passes=3, play_tracks=[0]) == [0, 1, 2]
+    takes = rec.list_takes()
+    assert [list(t) for t in takes] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9, 10, 11]]
+    out = np.concatenate(sd_dummy.output)[:, 0]
+    assert np.allclose(out[:12], [1, 2, 3, 4] * 3)
+    assert np.allclose(rec.tracks[1][:, 0], 0)
+
+
+def test_loop_record_stops_at_end_of_pass(monkeypatch):
+    import threading
+
+    stop = threading.Event()
+    stop.set()
+    sd_dummy = DuplexSD(np.arange(20, dtype=np.float32), blocksize=3)
+    monkeypatch.setattr("vocals.multitrack.sd", sd_dummy)
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=1)
+    rec.select_range(0, 4)
+    assert rec.loop_record(passes=10, stop=stop) == [0]
+    assert [list(t) for t in rec.list_takes()] == [[0, 1, 2, 3]]
+    last = sd_dummy.output[-1]
+    assert np.allclose(last[1:], 0)
+
+
+def test_loop_record_buffers_fit_the_take_budget(monkeypatch):
+    sd_dummy = DuplexSD(np.arange(20, dtype=np.float32), blocksize=3)
+    monkeypatch.setattr("vocals.multitrack.sd", sd_dummy)
+    # room for no buffer at all, so only the minimum of two is reserved and
+    # a stream that never yields to the main thread stops after them
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=1, take_budget=8)
+    rec.select_range(0, 4)
+    assert rec.loop_record(passes=4) == [0, 1]
+    assert rec.take_library.reserved_bytes == 0
+    assert rec.take_library.resident_bytes == 16
+
+
+def test_loop_record_rejects_empty_selection(monkeypatch):
+    monkeypatch.setattr("vocals.multitrack.sd", DuplexSD(np.zeros(4), 2))
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=1)
+    rec.select_range(0.2, 0.5)  # rounds to zero frames
+    with pytest.raises(ValueError):
+        rec.loop_record(passes=2)
+
+
+def test_stereo_tracks_keep_both_channels(monkeypatch):
+    data = np.arange(8, dtype=np.float32).reshape(4, 2)
+    monkeypatch.setattr("vocals.multitrack.sd", DummySD(data))
+    rec = MultiTrackRecorder(num_tracks=2, samplerate=4, channels=2)
+    rec.record(duration=1)
+    assert rec.tracks[0].shape == (4, 2)
+    assert np.array_equal(rec.tracks[0], data)
+
+    rec.tracks[1] = np.ones((4, 1), dtype=np.float32)
+    rec.set_pan(1, -0.5)
+    mix = rec.mix_tracks()
+    assert mix.shape == (4, 2)
+    # the mono track is upmixed and panned by broadcasting
+    assert np.allclose(mix, data + [1.0, 0.5])
+    with pytest.raises(ValueError):
+        rec.set_pan(1, 2)
+
+
+def test_mono_clipboard_is_upmixed_into_stereo_track():
+    rec = MultiTrackRecorder(num_tracks=2, samplerate=1, channels=2)
+    rec.tracks[0] = np.array([[1], [2], [3]], dtype=np.float32)
+    rec.tracks[1] = np.zeros((2, 2), dtype=np.float32)
+    rec.select_range(0, 2, track_index=0)
+    rec.copy()
+    rec.position = 2
+    rec.paste(track_index=1)
+    assert np.array_equal(rec.tracks[1], [[0, 0], [0, 0], [1, 1], [2, 2]])
+
+
+def test_wav_channel_layout_is_preserved(tmp_path):
+    import wave
+
+    rec = MultiTrackRecorder(num_tracks=2, samplerate=8000, channels=2)
+    stereo = np.array([[0.5, -0.5], [0.25, 0.0]], dtype=np.float32)
+    rec.tracks[0] = stereo
+    out = tmp_path / "stereo.wav"
+    rec.export_audio(str(out), track_indices=[0])
+    with wave.open(str(out), "rb") as wf:
+        assert wf.getnchannels() == 2
+    rec.import_audio(str(out), track_index=1)
+    assert np.allclose(rec.tracks[1], stereo, atol=1e-4)
+
+    mono = tmp_path / "mono.wav"
+    with wave.open(str(mono), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(8000)
+        wf.writeframes(np.array([16384, -16384], dtype="<i2").tobytes())
+    rec.import_audio(str(mono), track_index=1)
+    assert rec.tracks[1].shape == (2, 1)
+    rec.undo()
+    assert np.allclose(rec.tracks[1], stereo, atol=1e-4)
+
+
+def test_record_multi_routes_inputs_to_tracks():
+    from vocals.backend import VirtualBackend
+
+    source = np.stack([np.arange(40), -np.arange(40), np.full(40, 9)], axis=1)
+    backend = VirtualBackend(source=source, samplerate=10, blocksize=3)
+    rec = MultiTrackRecorder(num_tracks=3, samplerate=10, backend=backend)
+    rec.tracks[2] = np.full((5, 1), 7, dtype=np.float32)
+    rec.position = 2
+    assert rec.record_multi([1, None, 0], duration=2, play_tracks=[2]) == [0, 0, 0]
+    assert np.array_equal(rec.tracks[1][:, 0], np.r_[0, 0, np.arange(20)])
+    assert np.array_equal(rec.tracks[0][:, 0], np.r_[0, 0, np.full(20, 9)])
+    assert np.allclose(backend.captured()[:3, 0], 7)
+    assert rec.position == 22
+    rec.undo()
+    assert len(rec.tracks[0]) == 0 and len(rec.tracks[1]) == 0
+
+
+def test_record_multi_counts_overflows_per_channel():
+    from vocals.backend import VirtualBackend
+
+    class Starved(VirtualBackend):
+        # the whole recording arrives before the recorder can drain it
+        def sleep(self, msec):
+            super().sleep(1000)
+
+    backend = Starved(source=np.ones((100, 2)), samplerate=100, blocksize=10)
+    rec = MultiTrackRecorder(num_tracks=2, samplerate=100, backend=backend)
+    overflows = rec.record_multi([0, 1], duration=1, buffer_seconds=0.5)
+    assert overflows == [50, 50] and rec.input_overflows == overflows
+    assert np.count_nonzero(rec.tracks[0]) == 50
+    with pytest.raises(ValueError):
+        rec.record_multi([0, 0], duration=1)
+
+
+class LoopbackSD(DummySD):
+    """Fake ``sounddevice`` whose input hears the output ``delay`` frames late."""
+
+    def __init__(self, delay):
+        super().__init__(None)
+        self.delay = delay
+
+    def playrec(self, play_data, samplerate=44100, channels=1, dtype="float32"):
+        self.play(play_data, samplerate)
+        recorded = np.zeros_like(play_data)
+        recorded[self.delay :] = 0.5 * play_data[: len(play_data) - self.delay]
+        return recorded
+
+
+def test_calibrate_latency_aligns_takes_with_playback(monkeypatch):
+    sd_dummy = LoopbackSD(delay=37)
+    monkeypatch.setattr("vocals.multitrack.sd", sd_dummy)
+    rec = MultiTrackRecorder(num_tracks=2, samplerate=1000)
+    assert rec.calibrate_latency(duration=0.5, max_latency=0.1) == 37
+    assert rec.latency == 37
+
+    backing = np.sin(np.arange(1000) / 7).astype(np.float32)[:, None]
+    rec.tracks[0] = backing
+    rec.select_track(1)
+    rec.record(duration=1, play_tracks=[0])
+    assert len(sd_dummy.play_data) == 1037
+    assert np.allclose(rec.tracks[1], 0.5 * backing)
+
+
+def test_calibrate_latency_without_signal(monkeypatch):
+    sd_dummy = LoopbackSD(delay=0)
+    sd_dummy.playrec = lambda data, **kwargs: np.zeros_like(data)
+    monkeypatch.setattr("vocals.multitrack.sd", sd_dummy)
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=1000)
+    with pytest.raises(RuntimeError):
+        rec.calibrate_latency(duration=0.1)
+    assert rec.latency == 0
+
+
+def test_loop_record_compensates_latency(monkeypatch):
+    class LoopbackDuplex(DuplexSD):
+        # the input of each block is the output from ``delay`` frames before
+        def Stream(self, samplerate, blocksize, channels, dtype, callback, **kw):
+            sd = self
+            played = np.zeros((sd.delay + 100, channels), dtype=np.float32)
+
+            class Stream:
+                def __enter__(self):
+                    for i in range(0, 100, sd.blocksize):
+                        block = played[i : i + sd.blocksize]
+                        out = np.full_like(block, np.nan)
+                        try:
+                            callback(block, out, len(block), None, None)
+                        except sd.CallbackStop:
+                            break
+                        finally:
+                            played[sd.delay + i : sd.delay + i + len(out)] = out
+                    kw["finished_callback"]()
+                    return self
+
+                def __exit__(self, *exc):
+                    return False
+
+            return Stream()
+
+    sd_dummy = LoopbackDuplex(None, blocksize=2)
+    sd_dummy.delay = 3
+    monkeypatch.setattr("vocals.multitrack.sd", sd_dummy)
+    rec = MultiTrackRecorder(num_tracks=2, samplerate=1)
+    rec.latency = 3
+    rec.tracks[0] = np.array([1, 2, 3, 4, 5], dtype=np.float32)[:, None]
+    rec.select_range(0, 5, track_index=1)
+    # every pass hears exactly the backing, so they are stored as one take
+    assert rec.loop_record(passes=3, play_tracks=[0]) == [0, 0, 0]
+    assert [list(t) for t in rec.list_takes()] == [[1, 2, 3, 4, 5]]
+
+
+def test_trim_silence_zeroes_gaps_and_cuts_the_tail():
+    samplerate = 1000
+    rng = np.random.default_rng(0)
+    track = (1e-5 * rng.standard_normal((5000, 1))).astype(np.float32)
+    tone = np.sin(np.arange(1024) / 3)[:, None]
+    track[1024:2048] += tone[:1024]
+    track[3072:3584] += tone[:512]
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=samplerate)
+    rec.tracks[0] = track.copy()
+
+    trimmed = rec.trim_silence(min_silence=0.5)
+    # detection works on whole frames of 1024 samples
+    assert trimmed == [(0, 1024), (2048, 3072), (4096, 5000)]
+    result = rec.tracks[0]
+    assert len(result) == 4096
+    assert not result[:1024].any() and not result[2048:3072].any()
+    assert np.array_equal(result[1024:2048], track[1024:2048])
+    rec.undo()
+    assert np.array_equal(rec.tracks[0], track)
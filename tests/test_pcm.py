@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from vocals import pcm
+
+
+@pytest.fixture(params=["kernels", "numpy"])
+def impl(request, monkeypatch):
+    if request.param == "numpy":
+        monkeypatch.setattr(pcm, "_kernels", None)
+    elif pcm._kernels is None:
+        pytest.skip("kernels extension not built")
+    return request.param
+
+
+@pytest.mark.parametrize("bits", [16, 24, 32])
+def test_round_trip(impl, bits):
+    samples = np.linspace(-1, 1, 101, dtype=np.float32)
+    data = pcm.encode(samples, bits=bits)
+    assert data.dtype == np.uint8 and len(data) == 101 * bits // 8
+    decoded = pcm.decode(data, bits=bits)
+    assert np.allclose(decoded, samples, atol=2.0 ** -(bits - 1))
+
+
+def test_int16_layout_and_clipping(impl):
+    samples = np.array([0.5, 1.5, -2.0, np.nan], dtype=np.float32)
+    out = bytearray(8)
+    assert pcm.encode_into(samples, out) == 2
+    assert list(np.frombuffer(bytes(out), "<i2")) == [16384, 32767, -32767, 0]
+    wrapped = pcm.encode(np.array([1.5], dtype=np.float32), clip=False)
+    assert np.frombuffer(wrapped.tobytes(), "<i2")[0] == 49150 - 65536
+
+
+def test_int24_sign_extension(impl):
+    data = bytes([0xFF, 0xFF, 0xFF, 0x00, 0x00, 0x80, 0xFF, 0xFF, 0x7F])
+    decoded = pcm.decode(data, bits=24)
+    scale = 2**23 - 1
+    assert np.allclose(decoded, [-1 / scale, -(2**23) / scale, 1.0])
+
+
+def test_dither_averages_to_the_signal(impl):
+    level = 0.3 / 32767
+    samples = np.full(20000, level, dtype=np.float32)
+    plain = np.frombuffer(pcm.encode(samples).tobytes(), "<i2")
+    dithered = np.frombuffer(pcm.encode(samples, dither=True).tobytes(), "<i2")
+    assert np.all(plain == 0)
+    assert set(np.unique(dithered)) <= {-1, 0, 1, 2}
+    assert abs(dithered.mean() - 0.3) < 0.05
+
+
+def test_interleave_into_caller_buffers(impl):
+    planar = np.arange(6, dtype=np.float32).reshape(2, 3)
+    out = np.empty((3, 2), dtype=np.float32)
+    assert pcm.interleave(planar, out) is out
+    assert np.array_equal(out, [[0, 3], [1, 4], [2, 5]])
+    assert np.array_equal(pcm.deinterleave(out), planar)
+
+
+def test_kernels_match_numpy(monkeypatch):
+    if pcm._kernels is None:
+        pytest.skip("kernels extension not built")
+    rng = np.random.default_rng(0)
+    samples = rng.uniform(-1.2, 1.2, 1000).astype(np.float32)
+    fast = {bits: pcm.encode(samples, bits=bits) for bits in (16, 24, 32)}
+    monkeypatch.setattr(pcm, "_kernels", None)
+    for bits, data in fast.items():
+        assert np.array_equal(data, pcm.encode(samples, bits=bits))
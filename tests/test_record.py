@@ -1,5 +1,6 @@
 import importlib
 import logging
+import subprocess
 import sys
 import types
 
@@ -117,3 +118,47 @@ def test_cli_list_devices(monkeypatch, capsys):
     record.main()
     output = capsys.readouterr().out
     assert "mic" in output and "speaker" in output
+
+
+def test_cli_stats(monkeypatch, capsys):
+    sd_stub = types.SimpleNamespace(query_devices=lambda: [])
+    monkeypatch.setitem(sys.modules, "sounddevice", sd_stub)
+    record = importlib.import_module("vocals.record")
+    record = importlib.reload(record)
+
+    def fake_record(*args, stats=None, **kwargs):
+        stats.callback(0.001, 256)
+
+    monkeypatch.setattr(record, "record_to_file", fake_record)
+    monkeypatch.setattr(sys, "argv", ["vocals.record", "dummy.wav", "--stats"])
+    record.main()
+    output = capsys.readouterr().out
+    assert "callbacks: 1" in output and "block sizes: 256 x1" in output
+
+
+def _loaded_after(code):
+    check = "import sys; print(sorted({'numpy', 'sounddevice'} & set(sys.modules)))"
+    out = subprocess.run(
+        [sys.executable, "-c", f"{code}\n{check}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return out.strip().splitlines()[-1]
+
+
+def test_startup_does_not_load_numpy_or_sounddevice():
+    assert _loaded_after("import vocals, vocals.record, vocals.warmup") == "[]"
+    code = "import sys; sys.argv = ['record', '--version']\nimport vocals.record\n"
+    code += "try:\n    vocals.record.main()\nexcept SystemExit:\n    pass"
+    assert _loaded_after(code) == "[]"
+
+
+def test_package_attributes_load_on_access():
+    import vocals
+
+    assert "MultiTrackRecorder" in dir(vocals)
+    assert vocals.note_to_freq("A4") == 440.0
+    assert vocals.MultiTrackRecorder.__module__ == "vocals.multitrack"
+    with pytest.raises(AttributeError):
+        vocals.missing
@@ -11,3 +11,12 @@ def test_write_read():
     assert len(out) == 5 * 4
     result = np.frombuffer(out, dtype=np.float32)
     assert np.allclose(result, data)
+
+
+def test_size_and_capacity():
+    rb = ringbuffer.RingBuffer(4)
+    assert rb.capacity() == 4 and rb.size() == 0
+    assert rb.write(np.ones(6, dtype=np.float32)) == 4
+    assert rb.size() == 4
+    rb.read(3)
+    assert rb.size() == 1
@@ -0,0 +1,92 @@
+import importlib
+import sys
+import types
+
+import numpy as np
+
+from vocals.backend import CallbackFlags, VirtualBackend
+from vocals.multitrack import MultiTrackRecorder
+from vocals.stats import Stats, timed
+
+
+def test_callback_histogram_and_flags():
+    stats = Stats()
+    stats.callback(0.0000005, 64)
+    stats.callback(0.003, 64, CallbackFlags(xrun=True))
+    stats.callback(100.0, 128)
+    assert stats.callbacks == 3
+    assert stats.histogram[0] == 1
+    assert stats.histogram[(3000).bit_length()] == 1
+    assert stats.histogram[-1] == 1
+    assert stats.block_sizes == {64: 2, 128: 1}
+    assert stats.overflows == 1 and stats.underruns == 1
+    assert stats.callback_max == 100.0
+
+
+def test_timers_and_report():
+    stats = Stats()
+    with timed(stats, "mix"):
+        pass
+    with stats.timer("mix"):
+        pass
+    with timed(None, "mix"):
+        pass
+    snap = stats.snapshot()
+    assert snap["timings"]["mix"]["calls"] == 2
+    assert "mix: 2 calls" in stats.report()
+    stats.reset()
+    assert stats.snapshot()["timings"] == {}
+
+
+def test_record_to_file_collects_stats(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "sounddevice", types.SimpleNamespace())
+    record = importlib.import_module("vocals.record")
+    backend = VirtualBackend(source=np.ones(400), samplerate=100, blocksize=10)
+    backend.xruns = {3}
+    stats = Stats()
+    record.record_to_file(
+        str(tmp_path / "out.wav"),
+        duration=2,
+        samplerate=100,
+        show_range=True,
+        backend=backend,
+        stats=stats,
+    )
+    assert stats.callbacks == 20
+    assert stats.block_sizes == {10: 20}
+    assert stats.overflows == 1 and stats.underruns == 1
+    assert stats.ring_capacity == 100 and stats.ring_max == 10
+    assert set(stats.timings) == {"write", "pitch"}
+
+
+def test_recorder_times_mixing():
+    rec = MultiTrackRecorder(num_tracks=2, samplerate=10)
+    rec.tracks[0] = np.ones(10, dtype=np.float32)[:, None]
+    rec.mix_tracks()
+    rec.stats = Stats()
+    rec.mix_tracks()
+    rec.pitch_range(0)
+    assert rec.stats.timings["mix"][0] == 1
+    assert rec.stats.timings["pitch"][0] == 1
+
+
+def test_recorder_reports_stream_callbacks_and_xruns():
+    # 200 frames in blocks of 16 are 13 blocks recording and 13 playing
+    backend = VirtualBackend(
+        np.full(400, 0.5), samplerate=100, blocksize=16, xruns={2, 3, 20}
+    )
+    rec = MultiTrackRecorder(num_tracks=2, samplerate=100, backend=backend)
+    rec.tracks[1] = np.full((200, 1), 0.25, dtype=np.float32)
+    rec.select_range(0, 2)
+    rec.stats = Stats()
+    rec.record_take(play_tracks=[1])
+    # the two xrun blocks deliver silence
+    assert rec.tracks[0].shape == (200, 1)
+    assert np.count_nonzero(rec.tracks[0] == 0.5) == 200 - 2 * 16
+    assert np.allclose(backend.captured()[:200], 0.25)
+    assert rec.stats.callbacks == 13 and rec.stats.block_sizes == {16: 13}
+    assert rec.stats.overflows == rec.stats.underruns == 2
+    rec.seek(0)
+    rec.play()
+    assert rec.stats.callbacks == 26
+    assert rec.stats.overflows == rec.stats.underruns == backend.xrun_count == 3
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from vocals.multitrack import MultiTrackRecorder
+from vocals.takes import TakeStore
+
+
+def test_identical_takes_are_stored_once():
+    store = TakeStore()
+    take = np.arange(8, dtype=np.float32)
+    assert store.add("a", take) == 0
+    assert store.add("a", take.copy()) == 0
+    assert store.add("b", take) == 0
+    assert store.count("a") == 1
+    assert store.resident_bytes == take.nbytes
+    assert store.take("a", 0) is store.take("b", 0)
+
+
+def test_takes_spill_and_page_back(tmp_path):
+    spill = tmp_path / "spill.bin"
+    store = TakeStore(memory_budget=64, spill_path=str(spill))
+    takes = [np.full(10, i, dtype=np.float32) for i in range(4)]
+    for take in takes:
+        store.add("region", take)
+    assert store.resident_bytes <= 64
+    assert store.resident_bytes == 40
+    assert spill.exists()
+
+    loaded = store.takes("region")
+    assert len(loaded) == 4
+    for expected, got in zip(takes, loaded):
+        assert np.array_equal(expected, got)
+    with pytest.raises(ValueError):
+        store.take("region", 4)
+    store.close()
+
+
+def test_store_reads_like_a_dict_of_lazy_lists():
+    store = TakeStore(memory_budget=40)
+    for i in range(3):
+        store.add("region", np.full(10, i, dtype=np.float32))
+    takes = store["region"]
+    assert store.resident_bytes == 40
+    assert len(takes) == 3
+    assert [float(t[0]) for t in takes] == [0, 1, 2]
+    assert float(takes[-1][0]) == 2
+    assert store.resident_bytes == 40
+    assert store.get("other") is None
+    with pytest.raises(KeyError):
+        store["other"]
+
+
+def test_remove_compacts_the_spill_file(tmp_path):
+    spill = tmp_path / "spill.bin"
+    store = TakeStore(memory_budget=40, spill_path=str(spill))
+    takes = [np.full(10, i, dtype=np.float32) for i in range(5)]
+    for take in takes:
+        store.add("a", take)
+    store.add("b", takes[0])
+    store._spill.flush()
+    assert spill.stat().st_size == 4 * 40
+
+    store.remove("a", 0)
+    assert store.count("a") == 4 and store.take("b", 0)[0] == 0
+    store.remove("a", 0)
+    store.remove("a", 0)
+    assert store._dead_bytes == 80
+    store.remove("a", 0)
+    # takes 0 and 4 are the only data left in the spill file
+    assert store._dead_bytes == 0
+    assert spill.stat().st_size == 2 * 40
+    assert [float(t[0]) for t in store["a"]] == [4]
+    assert float(store.take("b", 0)[0]) == 0
+    store.remove("a")
+    assert "a" not in store and len(store) == 1
+    store.close()
+
+
+def test_recorder_library_uses_store():
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=1, take_budget=8)
+    rec.tracks[0] = np.array([1, 2, 3, 4], dtype=np.float32)[:, None]
+    rec.select_range(1, 3)
+    rec.add_selection_to_library()
+    rec.add_selection_to_library()
+    rec.tracks[0][1:3, 0] = [7, 8]
+    rec.add_selection_to_library()
+    rec.tracks[0][1:3, 0] = [5, 6]
+    rec.add_selection_to_library()
+    assert len(rec.list_takes()) == 3
+
+    rec.apply_take(0)
+    assert np.allclose(rec.tracks[0][:, 0], [1, 2, 3, 4])
+    rec.apply_take(1)
+    assert np.allclose(rec.tracks[0][:, 0], [1, 7, 8, 4])
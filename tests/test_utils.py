@@ -31,3 +31,57 @@ def test_note_to_freq():
 def test_freq_to_note():
     assert utils.freq_to_note(440.0) == "A4"
     assert utils.freq_to_note(261.63) == "C4"
+
+
+def test_pitch_contour_matches_estimate_pitch():
+    samplerate = 8000
+    t = np.linspace(0, 1, samplerate, False)
+    samples = np.sin(2 * np.pi * 300 * t).astype(np.float32)
+    samples[4000:] = 0
+    contour = utils.pitch_contour(samples, samplerate=samplerate, frame_size=512)
+    frames = utils.frame_signal(samples, 512, 256)
+    assert len(contour) == len(frames)
+    for frame, pitch in zip(frames, contour):
+        expected = utils.estimate_pitch(frame, samplerate)
+        if expected is None:
+            assert np.isnan(pitch)
+        else:
+            assert pitch == pytest.approx(expected)
+
+
+def test_estimate_latency():
+    rng = np.random.default_rng(1)
+    played = rng.standard_normal(500).astype(np.float32)
+    recorded = np.zeros((700, 2), dtype=np.float32)
+    recorded[123:623] = -0.1 * played[:, None]
+    recorded += 0.01 * rng.standard_normal(recorded.shape).astype(np.float32)
+    assert utils.estimate_latency(played, recorded, max_lag=200) == 123
+    assert utils.estimate_latency(played, np.zeros(700), max_lag=200) is None
+
+
+def test_detect_voice_merges_short_pauses():
+    samplerate = 1000
+    samples = np.zeros(6000, dtype=np.float32)
+    samples[1000:2000] = 0.5
+    samples[2100:3000] = 0.5
+    samples[4000:5000] = 0.5
+    segments = utils.detect_voice(samples, samplerate, frame_size=100, min_silence=0.25)
+    assert segments == [
+        (0, 1000, False),
+        (1000, 3000, True),
+        (3000, 4000, False),
+        (4000, 5000, True),
+        (5000, 6000, False),
+    ]
+    assert utils.detect_voice(np.zeros(0), samplerate) == []
+
+
+def test_pitch_range_skips_silence():
+    samplerate = 8000
+    t = np.arange(samplerate) / samplerate
+    samples = np.zeros(3 * samplerate, dtype=np.float32)
+    samples[samplerate : 2 * samplerate] = np.sin(2 * np.pi * 200 * t)
+    low, high = utils.pitch_range(samples, samplerate=samplerate, frame_size=512)
+    assert low == pytest.approx(200, rel=0.05)
+    assert high == pytest.approx(200, rel=0.05)
+    assert utils.pitch_range(np.zeros(8000), samplerate=samplerate) is None
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from vocals import utils, vocoder
+from vocals.multitrack import MultiTrackRecorder
+
+SAMPLERATE = 8000
+
+
+def _tone(freq, seconds=1.0):
+    t = np.arange(int(SAMPLERATE * seconds)) / SAMPLERATE
+    return (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_stft_round_trip():
+    samples = np.random.default_rng(0).standard_normal((5000, 2)).astype(np.float32)
+    spectrum = vocoder.stft(samples, frame_size=512, hop=128)
+    assert spectrum.shape[1:] == (2, 257)
+    restored = vocoder.istft(spectrum, frame_size=512, hop=128, length=len(samples))
+    assert np.allclose(restored, samples, atol=1e-5)
+    with pytest.raises(ValueError):
+        vocoder.stft(samples, frame_size=500, hop=128)
+
+
+def test_unit_rate_is_identity_in_any_chunking():
+    samples = np.random.default_rng(1).standard_normal(7000).astype(np.float32)
+    for chunk in (1, 7, 256):
+        out = vocoder.time_stretch(samples, 1.0, frame_size=512, hop=128, chunk=chunk)
+        assert np.allclose(out, samples, atol=1e-5)
+
+
+@pytest.mark.parametrize("rate", [0.5, 1.5])
+def test_time_stretch_keeps_pitch(rate):
+    out = vocoder.time_stretch(_tone(300, 2.0), rate, chunk=16)
+    assert len(out) == round(2 * SAMPLERATE / rate)
+    low, high = utils.pitch_range(out, samplerate=SAMPLERATE)
+    assert low == pytest.approx(300, rel=0.03) and high == pytest.approx(300, rel=0.03)
+
+
+def _rms_db(samples):
+    middle = samples[len(samples) // 4 : 3 * len(samples) // 4]
+    return 10 * np.log10(np.mean(np.square(middle, dtype=np.float64)))
+
+
+@pytest.mark.parametrize("rate", [0.5, 0.8, 0.999, 2.0])
+def test_time_stretch_keeps_level(rate):
+    tone = _tone(220, seconds=2)
+    out = vocoder.time_stretch(tone, rate)
+    assert _rms_db(out) == pytest.approx(_rms_db(tone), abs=1.0)
+
+
+@pytest.mark.parametrize("semitones", [-12, -5, 3, 7, 12])
+def test_pitch_shift_keeps_level(semitones):
+    tone = _tone(220, seconds=2)
+    out = vocoder.pitch_shift(tone, semitones)
+    assert _rms_db(out) == pytest.approx(_rms_db(tone), abs=1.0)
+
+
+def test_blocks_are_streamed():
+    blocks = list(vocoder.stretch_blocks(_tone(300, 2.0), 0.5, chunk=8))
+    assert len(blocks) > 1
+    assert sum(len(b) for b in blocks) == 4 * SAMPLERATE
+    assert max(len(b) for b in blocks) <= 8 * 512
+
+
+def test_pitch_shift_keeps_length():
+    stereo = np.stack([_tone(300, 2.0), _tone(200, 2.0)], axis=1)
+    out = vocoder.pitch_shift(stereo, 12, chunk=16)
+    assert out.shape == stereo.shape and out.dtype == np.float32
+    low, _ = utils.pitch_range(out[:, 0], samplerate=SAMPLERATE)
+    assert low == pytest.approx(600, rel=0.05)
+    low, _ = utils.pitch_range(out[:, 1], samplerate=SAMPLERATE)
+    assert low == pytest.approx(400, rel=0.05)
+
+
+def test_recorder_edits_selection():
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=SAMPLERATE)
+    rec.tracks[0] = np.concatenate([_tone(300, 2.0), np.ones(100, np.float32)])[:, None]
+    rec.select_range(0, 2)
+    rec.time_stretch(2.0)
+    assert rec.selection == (0, 0, SAMPLERATE)
+    assert len(rec.tracks[0]) == SAMPLERATE + 100
+    assert np.allclose(rec.tracks[0][-100:], 1)
+
+    rec.pitch_shift(-12)
+    assert len(rec.tracks[0]) == SAMPLERATE + 100
+    low, _ = rec.pitch_range()
+    assert low == pytest.approx(150, rel=0.05)
+    rec.undo()
+    rec.undo()
+    assert len(rec.tracks[0]) == 2 * SAMPLERATE + 100
+    with pytest.raises(ValueError):
+        rec.time_stretch(0)
+
+
+def test_empty_input_gives_empty_output():
+    for samples in (np.zeros(0, np.float32), np.zeros((0, 2), np.float32)):
+        assert vocoder.time_stretch(samples, 0.5).shape == samples.shape
+        assert vocoder.pitch_shift(samples, 3).shape == samples.shape
+    assert vocoder.time_stretch(np.ones((1, 2), np.float32), 3).shape == (0, 2)
+    with pytest.raises(ValueError):
+        vocoder.time_stretch(np.zeros(0, np.float32), 0)
+
+    rec = MultiTrackRecorder(num_tracks=1, samplerate=SAMPLERATE)
+    rec.tracks[0] = np.ones((100, 1), dtype=np.float32)
+    rec.selection = (0, 10, 10)
+    rec.time_stretch(0.5)
+    rec.pitch_shift(2)
+    assert np.array_equal(rec.tracks[0], np.ones((100, 1)))
+    assert rec.selection == (0, 10, 10)
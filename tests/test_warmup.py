@@ -1,15 +1,68 @@
 import numpy as np
+import pytest
 
 from vocals import warmup
+from vocals.backend import VirtualBackend
+from vocals.warmup import Exercise
 
 
-def test_warmup_beeps(monkeypatch):
-    calls = []
-    monkeypatch.setattr(
-        "vocals.warmup.utils.beep",
-        lambda freq, duration=0.5, samplerate=44100: calls.append(freq),
-    )
-    warmup.warmup(start_freq=100, steps=3, duration=0.1)
+def _frequency(samples, samplerate):
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples)), 8 * len(samples)))
+    return np.argmax(spectrum) * samplerate / (8 * len(samples))
+
+
+def test_notes_follow_the_pattern_up_and_down():
     semitone = 2 ** (1 / 12)
-    expected = [100, 100 * semitone, 100 * (semitone**2), 100 * semitone, 100]
-    assert [round(f, 3) for f in calls] == [round(f, 3) for f in expected]
+    freqs = warmup.notes(Exercise((0, 1, 2), root=100))
+    expected = [100, 100 * semitone, 100 * semitone**2, 100 * semitone, 100]
+    assert freqs == pytest.approx(expected)
+    assert warmup.notes(Exercise((0, None, 4), root=100, up_down=False))[1] is None
+    assert warmup.scale("minor").pattern[2] == 3
+    assert warmup.arpeggio("major", up_down=False).up_down is False
+    with pytest.raises(ValueError):
+        warmup.scale("lydian")
+
+
+def test_render_is_phase_continuous():
+    samplerate = 8000
+    exercise = warmup.arpeggio("major", root=220, note_duration=0.25)
+    out = warmup.render(exercise, samplerate)
+    assert out.dtype == np.float32 and len(out) == 7 * 2000
+    # a jump between notes would exceed the largest step of the sine itself
+    top = 440 * 2 * np.pi / samplerate
+    assert np.abs(np.diff(out)).max() <= top + 1e-4
+    for i, f in enumerate(warmup.notes(exercise)):
+        note = out[i * 2000 + 200 : (i + 1) * 2000 - 200]
+        assert _frequency(note, samplerate) == pytest.approx(f, rel=0.01)
+
+
+def test_render_fades_around_rests():
+    exercise = Exercise((0, None, 0), root=100, note_duration=0.1, up_down=False)
+    out = warmup.render(exercise, samplerate=1000)
+    assert out[0] == 0 and np.abs(out[:10]).max() < np.abs(out[10:90]).max()
+    assert np.all(out[100:200] == 0)
+    assert np.abs(out[95:100]).max() <= 0.5 and np.abs(out[200:205]).max() <= 0.5
+
+
+def test_render_is_cached():
+    exercise = Exercise([0, 2, 4], note_duration=0.05)
+    first = warmup.render(exercise, 8000)
+    assert warmup.render(exercise._replace(pattern=(0, 2, 4)), 8000) is first
+    assert warmup.render(exercise, 16000) is not first
+    with pytest.raises(ValueError):
+        first[0] = 1
+
+
+def test_warmup_plays_through_one_stream():
+    class Counting(VirtualBackend):
+        plays = 0
+
+        def play(self, data, samplerate=None, **kwargs):
+            Counting.plays += 1
+            super().play(data, samplerate, **kwargs)
+
+    backend = Counting(samplerate=8000)
+    warmup.warmup(start_freq=100, steps=3, duration=0.1, backend=backend)
+    assert Counting.plays == 1
+    expected = warmup.render(Exercise((0, 1, 2), 100, 0.1), 44100)
+    assert np.allclose(backend.captured()[: len(expected), 0], expected)